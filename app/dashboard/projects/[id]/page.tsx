@@ -48,11 +48,11 @@ export default async function ProjectPage({ params: { id } }: { params: { id: st
   const project = await res.json()
 
   // Fetch latest NDVI result for this project
-  const ndviRes = await fetch(`http://localhost:8000/projects/${projectId}/ndvi`, {
+  const ndviRes = await fetch(`http://localhost:8000/projects/${projectId}/ndvi?limit=1`, {
     next: { revalidate: 10 },
   })
 
-  const ndviData: NDVIResult[] = ndviRes.ok ? await ndviRes.json() : []
+  const ndviData: NDVIResult[] = ndviRes.ok ? (await ndviRes.json()).items : []
   const latestNDVI = ndviData.length > 0 ? ndviData[0] : null
 
   return (
@@ -4,6 +4,7 @@ import DashboardShell from "@/components/dashboard/dashboard-shell"
 import { Button } from "@/components/ui/button"
 import { PlusCircle } from "lucide-react"
 import Link from "next/link"
+import { fetchAllPages } from "@/lib/pagination"
 
 export const metadata: Metadata = {
   title: "Projects | Farmers NDVI",
@@ -11,15 +12,7 @@ export const metadata: Metadata = {
 }
 
 async function getProjects() {
-  const res = await fetch("http://localhost:8000/projects", {
-    next: { revalidate: 10 },
-  })
-
-  if (!res.ok) {
-    throw new Error("Failed to fetch projects")
-  }
-
-  return res.json()
+  return fetchAllPages<any>("http://localhost:8000/projects", { next: { revalidate: 10 } })
 }
 
 export default async function ProjectsPage() {
@@ -0,0 +1,36 @@
+"""Add composite (timestamp, id) indexes for keyset pagination
+
+Revision ID: 0f4d9b2c7e61
+Revises: 6c1e7a3f9d28
+Create Date: 2026-10-18 16:48:03.215877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f4d9b2c7e61'
+down_revision: Union[str, None] = '6c1e7a3f9d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_ndvi_results_project_timestamp_id', 'ndvi_results',
+                    ['project_id', sa.text('timestamp DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_ndvi_results_timestamp_id', 'ndvi_results',
+                    [sa.text('timestamp DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_projects_created_at_id', 'projects',
+                    [sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_uploaded_files_uploaded_at_id', 'uploaded_files',
+                    [sa.text('uploaded_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_uploaded_files_uploaded_at_id', table_name='uploaded_files')
+    op.drop_index('ix_projects_created_at_id', table_name='projects')
+    op.drop_index('ix_ndvi_results_timestamp_id', table_name='ndvi_results')
+    op.drop_index('ix_ndvi_results_project_timestamp_id', table_name='ndvi_results')
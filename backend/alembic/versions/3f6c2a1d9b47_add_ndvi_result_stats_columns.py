@@ -0,0 +1,38 @@
+"""Add NDVI distribution and health-class stats to ndvi_results
+
+Revision ID: 3f6c2a1d9b47
+Revises: 90999e6f2e3b
+Create Date: 2026-10-18 09:12:04.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c2a1d9b47'
+down_revision: Union[str, None] = '90999e6f2e3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ndvi_results', sa.Column('ndvi_std', sa.Float(), nullable=True))
+    op.add_column('ndvi_results', sa.Column('ndvi_p2', sa.Float(), nullable=True))
+    op.add_column('ndvi_results', sa.Column('ndvi_median', sa.Float(), nullable=True))
+    op.add_column('ndvi_results', sa.Column('ndvi_p98', sa.Float(), nullable=True))
+    op.add_column('ndvi_results', sa.Column('healthy_percentage', sa.Float(), nullable=True))
+    op.add_column('ndvi_results', sa.Column('stressed_percentage', sa.Float(), nullable=True))
+    op.add_column('ndvi_results', sa.Column('unhealthy_percentage', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ndvi_results', 'unhealthy_percentage')
+    op.drop_column('ndvi_results', 'stressed_percentage')
+    op.drop_column('ndvi_results', 'healthy_percentage')
+    op.drop_column('ndvi_results', 'ndvi_p98')
+    op.drop_column('ndvi_results', 'ndvi_median')
+    op.drop_column('ndvi_results', 'ndvi_p2')
+    op.drop_column('ndvi_results', 'ndvi_std')
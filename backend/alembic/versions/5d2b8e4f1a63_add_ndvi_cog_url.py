@@ -0,0 +1,26 @@
+"""Add ndvi_cog_url to ndvi_results
+
+Revision ID: 5d2b8e4f1a63
+Revises: c7e915b0a4d2
+Create Date: 2026-10-18 13:02:11.204318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2b8e4f1a63'
+down_revision: Union[str, None] = 'c7e915b0a4d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ndvi_results', sa.Column('ndvi_cog_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ndvi_results', 'ndvi_cog_url')
@@ -0,0 +1,43 @@
+"""Declare SRID 4326 on ndvi_results.raster_extent and add a GiST index
+
+Revision ID: 6c1e7a3f9d28
+Revises: b3f8d1e6a972
+Create Date: 2026-10-18 16:05:22.740115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import geoalchemy2
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1e7a3f9d28'
+down_revision: Union[str, None] = 'b3f8d1e6a972'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Older rows stored the extent in the raster's own CRS (e.g. UTM metres) while
+    # labelling it 4326; those can't be read as lon/lat, so they are cleared
+    op.execute(
+        "UPDATE ndvi_results SET raster_extent = NULL WHERE raster_extent IS NOT NULL AND ("
+        "ST_XMin(raster_extent) < -180 OR ST_XMax(raster_extent) > 180 OR "
+        "ST_YMin(raster_extent) < -90 OR ST_YMax(raster_extent) > 90)"
+    )
+    op.alter_column('ndvi_results', 'raster_extent',
+               existing_type=geoalchemy2.types.Geometry(geometry_type='POLYGON', from_text='ST_GeomFromEWKT', name='geometry'),
+               type_=geoalchemy2.types.Geometry(geometry_type='POLYGON', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'),
+               existing_nullable=True,
+               postgresql_using='ST_SetSRID(raster_extent, 4326)')
+    op.execute("CREATE INDEX IF NOT EXISTS idx_ndvi_results_raster_extent ON ndvi_results USING gist (raster_extent)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_ndvi_results_raster_extent")
+    op.alter_column('ndvi_results', 'raster_extent',
+               existing_type=geoalchemy2.types.Geometry(geometry_type='POLYGON', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'),
+               type_=geoalchemy2.types.Geometry(geometry_type='POLYGON', from_text='ST_GeomFromEWKT', name='geometry'),
+               existing_nullable=True,
+               postgresql_using='ST_SetSRID(raster_extent, 0)')
@@ -0,0 +1,32 @@
+"""Add keyset pagination indexes for project jobs and fields
+
+Revision ID: 7b2d4e9a1c53
+Revises: d6b3f0a8c4e9
+Create Date: 2026-10-18 21:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2d4e9a1c53'
+down_revision: Union[str, None] = 'd6b3f0a8c4e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fields created before the default was applied have no created_at; keyset cursors need one
+    op.execute("UPDATE fields SET created_at = now() WHERE created_at IS NULL")
+    op.create_index('ix_processing_jobs_project_created_at_id', 'processing_jobs',
+                    ['project_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_fields_project_created_at_id', 'fields',
+                    ['project_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fields_project_created_at_id', table_name='fields')
+    op.drop_index('ix_processing_jobs_project_created_at_id', table_name='processing_jobs')
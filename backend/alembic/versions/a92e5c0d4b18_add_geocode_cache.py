@@ -0,0 +1,34 @@
+"""Add geocode_cache table
+
+Revision ID: a92e5c0d4b18
+Revises: 0f4d9b2c7e61
+Create Date: 2026-10-18 17:21:36.604482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a92e5c0d4b18'
+down_revision: Union[str, None] = '0f4d9b2c7e61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('geocode_cache',
+    sa.Column('location_key', sa.String(), nullable=False),
+    sa.Column('query', sa.String(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('provider', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('location_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('geocode_cache')
@@ -0,0 +1,70 @@
+"""Add fields and field_stats tables
+
+Revision ID: b3f8d1e6a972
+Revises: e4a9c2d7b315
+Create Date: 2026-10-18 15:42:10.318604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f8d1e6a972'
+down_revision: Union[str, None] = 'e4a9c2d7b315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('fields',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('boundary', geoalchemy2.types.Geometry(geometry_type='MULTIPOLYGON', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_fields_id'), 'fields', ['id'], unique=False)
+    op.create_index(op.f('ix_fields_project_id'), 'fields', ['project_id'], unique=False)
+    op.create_index('idx_fields_boundary', 'fields', ['boundary'], unique=False, postgresql_using='gist')
+
+    op.create_table('field_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('field_id', sa.Integer(), nullable=False),
+    sa.Column('result_id', sa.Integer(), nullable=False),
+    sa.Column('ndvi_min', sa.Float(), nullable=True),
+    sa.Column('ndvi_max', sa.Float(), nullable=True),
+    sa.Column('ndvi_mean', sa.Float(), nullable=True),
+    sa.Column('ndvi_std', sa.Float(), nullable=True),
+    sa.Column('ndvi_p2', sa.Float(), nullable=True),
+    sa.Column('ndvi_median', sa.Float(), nullable=True),
+    sa.Column('ndvi_p98', sa.Float(), nullable=True),
+    sa.Column('healthy_percentage', sa.Float(), nullable=True),
+    sa.Column('stressed_percentage', sa.Float(), nullable=True),
+    sa.Column('unhealthy_percentage', sa.Float(), nullable=True),
+    sa.Column('pixel_count', sa.BigInteger(), nullable=True),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['field_id'], ['fields.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['result_id'], ['ndvi_results.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('field_id', 'result_id', name='uq_field_stats_field_result')
+    )
+    op.create_index(op.f('ix_field_stats_id'), 'field_stats', ['id'], unique=False)
+    op.create_index(op.f('ix_field_stats_field_id'), 'field_stats', ['field_id'], unique=False)
+    op.create_index(op.f('ix_field_stats_result_id'), 'field_stats', ['result_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_field_stats_result_id'), table_name='field_stats')
+    op.drop_index(op.f('ix_field_stats_field_id'), table_name='field_stats')
+    op.drop_index(op.f('ix_field_stats_id'), table_name='field_stats')
+    op.drop_table('field_stats')
+    op.drop_index('idx_fields_boundary', table_name='fields', postgresql_using='gist')
+    op.drop_index(op.f('ix_fields_project_id'), table_name='fields')
+    op.drop_index(op.f('ix_fields_id'), table_name='fields')
+    op.drop_table('fields')
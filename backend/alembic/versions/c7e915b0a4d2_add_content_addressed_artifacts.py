@@ -0,0 +1,47 @@
+"""Add content hashes to ndvi_results and the stored_artifacts table
+
+Revision ID: c7e915b0a4d2
+Revises: 8a41d7c3e2f5
+Create Date: 2026-10-18 11:20:37.550913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e915b0a4d2'
+down_revision: Union[str, None] = '8a41d7c3e2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ndvi_results', sa.Column('content_hash', sa.String(), nullable=True))
+    op.add_column('ndvi_results', sa.Column('pipeline_version', sa.String(), nullable=True))
+    op.create_index(op.f('ix_ndvi_results_content_hash'), 'ndvi_results', ['content_hash'], unique=False)
+
+    op.create_table('stored_artifacts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('s3_key', sa.String(), nullable=False),
+    sa.Column('s3_url', sa.String(), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash', 'kind', name='uq_stored_artifacts_hash_kind')
+    )
+    op.create_index(op.f('ix_stored_artifacts_id'), 'stored_artifacts', ['id'], unique=False)
+    op.create_index(op.f('ix_stored_artifacts_content_hash'), 'stored_artifacts', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_stored_artifacts_content_hash'), table_name='stored_artifacts')
+    op.drop_index(op.f('ix_stored_artifacts_id'), table_name='stored_artifacts')
+    op.drop_table('stored_artifacts')
+    op.drop_index(op.f('ix_ndvi_results_content_hash'), table_name='ndvi_results')
+    op.drop_column('ndvi_results', 'pipeline_version')
+    op.drop_column('ndvi_results', 'content_hash')
@@ -0,0 +1,48 @@
+"""Add ndvi_insights table
+
+Revision ID: d6b3f0a8c4e9
+Revises: a92e5c0d4b18
+Create Date: 2026-10-18 17:58:14.092631
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b3f0a8c4e9'
+down_revision: Union[str, None] = 'a92e5c0d4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ndvi_insights',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('result_id', sa.Integer(), nullable=False),
+    sa.Column('image_key', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.String(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['result_id'], ['ndvi_results.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('result_id')
+    )
+    op.create_index(op.f('ix_ndvi_insights_id'), 'ndvi_insights', ['id'], unique=False)
+    op.create_index(op.f('ix_ndvi_insights_status'), 'ndvi_insights', ['status'], unique=False)
+    op.create_index(op.f('ix_ndvi_insights_created_at'), 'ndvi_insights', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ndvi_insights_created_at'), table_name='ndvi_insights')
+    op.drop_index(op.f('ix_ndvi_insights_status'), table_name='ndvi_insights')
+    op.drop_index(op.f('ix_ndvi_insights_id'), table_name='ndvi_insights')
+    op.drop_table('ndvi_insights')
@@ -0,0 +1,28 @@
+"""Add heartbeat_at to processing_jobs for lease renewal
+
+Revision ID: e2c7a95b3d10
+Revises: 7b2d4e9a1c53
+Create Date: 2026-10-18 23:05:12.904317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c7a95b3d10'
+down_revision: Union[str, None] = '7b2d4e9a1c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('processing_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    # Jobs already running keep the lease they were claimed with
+    op.execute("UPDATE processing_jobs SET heartbeat_at = started_at WHERE status = 'running'")
+
+
+def downgrade() -> None:
+    op.drop_column('processing_jobs', 'heartbeat_at')
@@ -0,0 +1,28 @@
+"""Add preview thumbnail urls to ndvi_results
+
+Revision ID: e4a9c2d7b315
+Revises: 5d2b8e4f1a63
+Create Date: 2026-10-18 14:26:48.913027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c2d7b315'
+down_revision: Union[str, None] = '5d2b8e4f1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ndvi_results', sa.Column('thumbnail_url', sa.String(), nullable=True))
+    op.add_column('ndvi_results', sa.Column('ndvi_thumbnail_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ndvi_results', 'ndvi_thumbnail_url')
+    op.drop_column('ndvi_results', 'thumbnail_url')
@@ -0,0 +1,26 @@
+"""Add retry_at to ndvi_insights for backed-off retries
+
+Revision ID: f5a8d3c61e27
+Revises: e2c7a95b3d10
+Create Date: 2026-10-18 23:31:47.215608
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a8d3c61e27'
+down_revision: Union[str, None] = 'e2c7a95b3d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ndvi_insights', sa.Column('retry_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ndvi_insights', 'retry_at')
@@ -0,0 +1,96 @@
+# backend/artifact_store.py
+import hashlib
+import os
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.models import NDVIResult, StoredArtifact
+
+
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_key(prefix: str, content_hash: str, filename: str, version: Optional[str] = None) -> str:
+    """S3 key for content-addressed objects: identical bytes always map to the same key.
+
+    Objects derived from the input pass the pipeline `version` as well, so a
+    new pipeline writes new keys instead of changing the pixels behind older rows.
+    """
+    if version is None:
+        return f"{prefix}/{content_hash}/{os.path.basename(filename)}"
+    version_tag = hashlib.sha256(version.encode()).hexdigest()[:12]
+    return f"{prefix}/{content_hash}/{version_tag}/{os.path.basename(filename)}"
+
+
+def get_artifact(db: Session, content_hash: str, kind: str) -> Optional[StoredArtifact]:
+    return (
+        db.query(StoredArtifact)
+        .filter(StoredArtifact.content_hash == content_hash, StoredArtifact.kind == kind)
+        .first()
+    )
+
+
+def record_artifact(db: Session, content_hash: str, kind: str, s3_key: str, s3_url: str,
+                    size_bytes: int) -> StoredArtifact:
+    """Insert the artifact row; if a concurrent upload got there first, return theirs."""
+    artifact = StoredArtifact(
+        content_hash=content_hash,
+        kind=kind,
+        s3_key=s3_key,
+        s3_url=s3_url,
+        size_bytes=size_bytes,
+        created_at=datetime.utcnow(),
+    )
+    db.add(artifact)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return get_artifact(db, content_hash, kind)
+    db.refresh(artifact)
+    return artifact
+
+
+def find_cached_result(db: Session, content_hash: str, pipeline_version: str) -> Optional[NDVIResult]:
+    """Latest NDVI result computed from identical input bytes with the same pipeline settings."""
+    return (
+        db.query(NDVIResult)
+        .filter(
+            NDVIResult.content_hash == content_hash,
+            NDVIResult.pipeline_version == pipeline_version,
+        )
+        .order_by(NDVIResult.timestamp.desc())
+        .first()
+    )
+
+
+# Everything derived from the input bytes; project, filename and timestamp are per upload
+_DERIVED_COLUMNS = (
+    "s3_url", "original_url", "thumbnail_url", "ndvi_thumbnail_url", "tiff_url", "ndvi_cog_url",
+    "ndvi_min", "ndvi_max", "ndvi_mean", "ndvi_std", "ndvi_p2", "ndvi_median", "ndvi_p98",
+    "healthy_percentage", "stressed_percentage", "unhealthy_percentage",
+    "raster_extent", "content_hash", "pipeline_version",
+)
+
+
+def clone_result(cached: NDVIResult, project_id: int, filename: str) -> NDVIResult:
+    """A new NDVIResult that reuses a cached result's artifacts and stats (metadata-only insert)."""
+    values = {column: getattr(cached, column) for column in _DERIVED_COLUMNS}
+    return NDVIResult(
+        filename=filename,
+        timestamp=datetime.utcnow(),
+        project_id=project_id,
+        **values,
+    )
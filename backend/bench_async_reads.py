@@ -0,0 +1,150 @@
+# backend/bench_async_reads.py
+"""Dashboard read throughput in one worker: sync Session handlers vs the async routes.
+
+Both variants serve the same pages in-process (ASGI transport, no sockets):
+  sync   `def` handlers on get_db, the way the list/detail routes were
+         written before: each request takes a threadpool thread for its
+         whole DB round-trip
+  async  the real ndvi_routes / image_routes handlers on get_async_db
+         (asyncpg on Postgres, aiosqlite on SQLite)
+--requests GETs are spread over /ndvi-data, /projects, /projects/{id}
+and /projects/{id}/ndvi with --concurrency in flight.
+
+The gain comes from not parking a thread per in-flight query, so it shows
+against a networked Postgres; on local SQLite, aiosqlite's own thread
+hop makes the async variant no faster. Reads existing rows, so point
+DATABASE_URL at a seeded database.
+Run from the repo root:  python -m backend.bench_async_reads --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Optional
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal, async_engine, engine, get_db
+from backend.image_routes import router as image_router
+from backend.models import NDVIResult, Project
+from backend.ndvi_routes import router as ndvi_router, serialize_ndvi_summary
+from backend.pagination import DEFAULT_PAGE_SIZE, page, paginate
+
+
+BASE_URL = "http://dashboard"
+
+
+def sync_app():
+    app = FastAPI()
+
+    @app.get("/ndvi-data")
+    def get_ndvi_data(cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE),
+                      db: Session = Depends(get_db)):
+        results, next_cursor = paginate(db.query(NDVIResult), NDVIResult.timestamp, NDVIResult.id, cursor, limit)
+        return page([serialize_ndvi_summary(r) for r in results], next_cursor)
+
+    @app.get("/projects")
+    def list_projects(cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE),
+                      db: Session = Depends(get_db)):
+        projects, next_cursor = paginate(db.query(Project), Project.created_at, Project.id, cursor, limit)
+        return page([{"id": p.id, "name": p.name, "created_at": p.created_at.isoformat()} for p in projects],
+                    next_cursor)
+
+    @app.get("/projects/{project_id}")
+    def get_project(project_id: int, db: Session = Depends(get_db)):
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        latest = (
+            db.query(NDVIResult).filter(NDVIResult.project_id == project_id)
+            .order_by(NDVIResult.timestamp.desc()).first()
+        )
+        return {"id": project.id, "name": project.name, "latest": latest.id if latest else None}
+
+    @app.get("/projects/{project_id}/ndvi")
+    def get_project_ndvi_results(project_id: int, cursor: Optional[str] = None,
+                                 limit: int = Query(DEFAULT_PAGE_SIZE), db: Session = Depends(get_db)):
+        results, next_cursor = paginate(
+            db.query(NDVIResult).filter(NDVIResult.project_id == project_id),
+            NDVIResult.timestamp, NDVIResult.id, cursor, limit
+        )
+        return page([serialize_ndvi_summary(r) for r in results], next_cursor)
+
+    return app
+
+
+def async_app():
+    app = FastAPI()
+    app.include_router(ndvi_router)
+    app.include_router(image_router)
+    return app
+
+
+def dashboard_paths(project_ids, count):
+    templates = ["/ndvi-data", "/projects", "/projects/{id}", "/projects/{id}/ndvi"]
+    return [
+        templates[i % len(templates)].format(id=project_ids[i % len(project_ids)])
+        for i in range(count)
+    ]
+
+
+async def measure(name, app, paths, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE_URL, timeout=None) as client:
+        async def call(path):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        # One warm-up pass so both variants start with open connections
+        await asyncio.gather(*(call(path) for path in paths[:concurrency]))
+        latencies.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(call(path) for path in paths))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{name:<6} {len(paths) / elapsed:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f} ms"
+          f"  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} ms")
+
+
+async def run(requests, concurrency):
+    db = SessionLocal()
+    try:
+        project_ids = [row.id for row in db.query(Project.id).limit(50)]
+    finally:
+        db.close()
+    if not project_ids:
+        raise SystemExit("No projects in the database; seed it first")
+
+    paths = dashboard_paths(project_ids, requests)
+    print(f"{requests} requests, {concurrency} concurrent, {len(project_ids)} projects")
+    try:
+        await measure("sync", sync_app(), paths, concurrency)
+        await measure("async", async_app(), paths, concurrency)
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    try:
+        asyncio.run(run(args.requests, args.concurrency))
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
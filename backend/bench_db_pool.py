@@ -0,0 +1,137 @@
+# backend/bench_db_pool.py
+"""Connection-pool load test: concurrent dashboard reads through the shared session dependencies.
+
+Serves the NDVI, project-image and job routers in-process (ASGI transport,
+no sockets) on the configured engine and fires --requests GETs at the list
+and detail endpoints with --concurrency in flight, a share of them hitting
+missing projects so the error path (404 before the session closes) is
+covered too. Reports throughput and latency plus the pool metrics /metrics
+exposes for both engines (the async list/detail handlers use
+get_async_db, the rest get_db), and fails if any connection of either pool
+is still checked out afterwards (a leak) or checkouts and checkins don't
+balance.
+
+Size the pools with DB_POOL_SIZE / DB_MAX_OVERFLOW, DB_ASYNC_POOL_SIZE /
+DB_ASYNC_MAX_OVERFLOW and DB_POOL_TIMEOUT; with concurrency above a pool's
+total the wait_seconds figures show requests queueing for a connection. Reads existing rows, so point DATABASE_URL at a seeded
+database.
+Run from the repo root:  python -m backend.bench_db_pool --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from backend.database import SessionLocal, async_engine, async_pool_metrics, engine, pool_metrics
+from backend.image_routes import router as image_router
+from backend.job_routes import router as job_router
+from backend.models import Project
+from backend.ndvi_routes import router as ndvi_router
+
+
+BASE_URL = "http://dashboard"
+MISSING_PROJECT_ID = 2 ** 31 - 1
+
+
+def bench_app():
+    app = FastAPI()
+    app.include_router(ndvi_router)
+    app.include_router(image_router)
+    app.include_router(job_router)
+    return app
+
+
+def dashboard_paths(project_ids, count, missing_share):
+    # The calls one dashboard view makes, round-robin over the projects
+    per_project = ["/projects/{id}", "/projects/{id}/ndvi", "/projects/{id}/timeline", "/projects/{id}/jobs"]
+    shared = ["/projects", "/ndvi-data", "/project-images/"]
+    missing_every = int(1 / missing_share) if missing_share > 0 else 0
+    paths = []
+    for i in range(count):
+        if missing_every and i % missing_every == 0:
+            paths.append(f"/projects/{MISSING_PROJECT_ID}")
+        elif project_ids and i % 2:
+            template = per_project[(i // 2) % len(per_project)]
+            paths.append(template.format(id=project_ids[i % len(project_ids)]))
+        else:
+            paths.append(shared[i % len(shared)])
+    return paths
+
+
+async def run(requests, concurrency, missing_share):
+    db = SessionLocal()
+    try:
+        project_ids = [row.id for row in db.query(Project.id).limit(50)]
+    finally:
+        db.close()
+
+    paths = dashboard_paths(project_ids, requests, missing_share)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=bench_app()), base_url=BASE_URL,
+                                 timeout=None) as client:
+        async def call(path):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        pools = {"sync": pool_metrics, "async": async_pool_metrics}
+        before = {name: metrics.snapshot() for name, metrics in pools.items()}
+        started = time.perf_counter()
+        await asyncio.gather(*(call(path) for path in paths))
+        elapsed = time.perf_counter() - started
+
+    after = {name: metrics.snapshot() for name, metrics in pools.items()}
+    latencies.sort()
+    print(f"{requests} requests, {concurrency} concurrent, {len(project_ids)} projects")
+    print(f"statuses {statuses}")
+    print(f"{requests / elapsed:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f} ms"
+          f"  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} ms")
+    print("pools:", json.dumps(after, indent=2))
+
+    leaks = []
+    for name in pools:
+        checkouts = after[name]["checkouts"] - before[name]["checkouts"]
+        checkins = after[name]["checkins"] - before[name]["checkins"]
+        leaked = after[name]["checked_out"] or 0
+        print(f"{name}: checkouts {checkouts}, checkins {checkins}, still checked out {leaked}")
+        if leaked or checkouts != checkins:
+            leaks.append(name)
+    if leaks:
+        raise SystemExit(f"connection leak in the {', '.join(leaks)} pool: not every connection went back")
+    print("no leaked connections")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--missing-share", type=float, default=0.05,
+                        help="fraction of requests for a project that doesn't exist")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    async def bench():
+        try:
+            await run(args.requests, args.concurrency, args.missing_share)
+        finally:
+            # Async connections belong to this event loop, so close them before it ends
+            await async_engine.dispose()
+
+    try:
+        asyncio.run(bench())
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
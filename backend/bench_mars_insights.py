@@ -0,0 +1,84 @@
+# backend/bench_mars_insights.py
+"""MARS calls and wall time per upload: old thread-per-file client vs InsightsService.
+
+Serves backend.fake_mars_server in-process (ASGI transport, no sockets) and simulates uploads of
+--files images whose insight payloads repeat (--distinct different
+image_keys, the same project coordinates), issued concurrently like
+process_upload_batch does. The same upload is then repeated to show cache hits.
+  legacy   threads.create + runs.create + runs.join for every file
+  service  InsightsService (cache + in-flight dedup, one runs.wait per payload)
+  batched  InsightsService with MARS_BATCH_INPUT_KEY set (one run per batch)
+
+Run from the repo root:  python -m backend.bench_mars_insights --files 16 --distinct 8
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from langgraph_sdk.client import LangGraphClient
+
+from backend import fake_mars_server
+from backend.mars_client import InsightsService
+
+
+BASE_URL = "http://fake-mars"
+
+
+def fake_http_client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_mars_server.app), base_url=BASE_URL)
+
+
+def fake_client():
+    return LangGraphClient(fake_http_client())
+
+
+async def legacy_insights(client, payload):
+    # The pre-service flow: a new thread and a blocking join per file
+    thread = await client.threads.create()
+    run = await client.runs.create(thread["thread_id"], "advisor", input=payload)
+    return await client.runs.join(thread["thread_id"], run["run_id"])
+
+
+def upload_payloads(files, distinct):
+    coordinates = {"latitude": -0.3031, "longitude": 36.08}
+    return [{"image_key": f"previews/image_{i % distinct}.jpg", "coordinates": coordinates, "user_id": "demo_user"}
+            for i in range(files)]
+
+
+async def measure(name, call, payloads):
+    async with fake_http_client() as http:
+        await http.post("/stats/reset")
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call(payload) for payload in payloads))
+        elapsed = time.perf_counter() - started
+        requests = (await http.get("/stats")).json()["requests"]
+    assert all(results)
+    print(f"{name:<16} {requests:4d} requests  {elapsed * 1000:8.1f} ms")
+
+
+async def run(files, distinct):
+    payloads = upload_payloads(files, distinct)
+    legacy_client = fake_client()
+    service = InsightsService(client=fake_client())
+    batched = InsightsService(client=fake_client(), batch_input_key=fake_mars_server.FAKE_MARS_BATCH_KEY)
+
+    print(f"{files} files, {distinct} distinct payloads, {fake_mars_server.FAKE_MARS_LATENCY_MS:.0f} ms per run")
+    await measure("legacy", lambda p: legacy_insights(legacy_client, p), payloads)
+    await measure("service", service.get, payloads)
+    await measure("service (again)", service.get, payloads)
+    await measure("batched", batched.get, payloads)
+    print("service stats:", service.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--distinct", type=int, default=8)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.files, args.distinct))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# backend/bench_ndvi_kernels.py
+"""Micro-benchmark of the registered NDVI kernels on synthetic rasters.
+
+Run from the repo root:  python -m backend.bench_ndvi_kernels --sizes 1024 4096
+"""
+import argparse
+import time
+import numpy as np
+from backend.ndvi_kernels import available_kernels, get_kernel
+
+
+def synthetic_bands(size, dtype="uint16", seed=0):
+    rng = np.random.default_rng(seed)
+    nir = rng.integers(0, 4096, (size, size)).astype(dtype)
+    red = rng.integers(0, 4096, (size, size)).astype(dtype)
+    return nir, red
+
+
+def time_kernel(kernel, nir, red, repeats):
+    out = np.empty(nir.shape, dtype=np.float32)
+    kernel(nir, red, out=out)  # warm-up (and JIT compile for numba)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        kernel(nir, red, out=out)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 4096])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--dtype", default="uint16")
+    args = parser.parse_args()
+
+    reference_kernel = get_kernel("numpy")
+    print(f"{'kernel':<10} {'size':>6} {'seconds':>10} {'MP/s':>10} {'max |err|':>10}")
+    for size in args.sizes:
+        nir, red = synthetic_bands(size, args.dtype)
+        reference = reference_kernel(nir, red)
+        megapixels = size * size / 1e6
+        for name in available_kernels():
+            kernel = get_kernel(name)
+            seconds = time_kernel(kernel, nir, red, args.repeats)
+            error = float(np.max(np.abs(kernel(nir, red) - reference)))
+            print(f"{name:<10} {size:>6} {seconds:>10.4f} {megapixels / seconds:>10.1f} {error:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
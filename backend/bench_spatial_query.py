@@ -0,0 +1,104 @@
+# backend/bench_spatial_query.py
+"""Spatial search latency with and without the GiST index on raster_extent.
+
+Seeds a scratch copy of ndvi_results' spatial columns (default 100k rows of
+small lon/lat footprints spread over Kenya), then runs the same bbox, point
+and polygon queries the search endpoints issue, under EXPLAIN ANALYZE:
+once with index scans allowed and once with them disabled (sequential scan).
+The scratch table is dropped afterwards; the real tables are not touched.
+
+Needs a PostGIS database in DATABASE_URL.
+Run from the repo root:  python -m backend.bench_spatial_query --rows 100000
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import text
+
+from backend.database import engine
+
+
+TABLE = "bench_ndvi_extents"
+
+# Same predicate/order/limit shape as spatial_search.search_results
+QUERIES = {
+    "bbox": (
+        f"SELECT id FROM {TABLE} "
+        "WHERE ST_Intersects(raster_extent, ST_MakeEnvelope(36.80, -1.30, 36.85, -1.25, 4326)) "
+        "ORDER BY timestamp DESC, id DESC LIMIT 100"
+    ),
+    "point": (
+        f"SELECT id FROM {TABLE} "
+        "WHERE ST_Intersects(raster_extent, ST_SetSRID(ST_MakePoint(36.82, -1.28), 4326)) "
+        "ORDER BY timestamp DESC, id DESC LIMIT 100"
+    ),
+    "field": (
+        f"SELECT id FROM {TABLE} "
+        "WHERE ST_Intersects(raster_extent, ST_Buffer(ST_SetSRID(ST_MakePoint(36.82, -1.28), 4326), 0.01)) "
+        "ORDER BY timestamp DESC, id DESC LIMIT 100"
+    ),
+}
+
+
+def seed(conn, rows):
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    conn.execute(text(
+        f"CREATE TABLE {TABLE} (id serial PRIMARY KEY, project_id integer, timestamp timestamp, "
+        "raster_extent geometry(POLYGON, 4326))"
+    ))
+    # Flight footprints of roughly 100–500 m, scattered over 34–42°E, 4°S–4°N
+    conn.execute(text(
+        f"INSERT INTO {TABLE} (project_id, timestamp, raster_extent) "
+        "SELECT (random() * 1000)::int, now() - random() * interval '730 days', "
+        "ST_MakeEnvelope(x, y, x + w, y + w, 4326) "
+        "FROM (SELECT 34 + random() * 8 AS x, -4 + random() * 8 AS y, 0.001 + random() * 0.004 AS w "
+        "      FROM generate_series(1, :rows)) AS s"
+    ), {"rows": rows})
+    conn.execute(text(f"CREATE INDEX idx_{TABLE}_raster_extent ON {TABLE} USING gist (raster_extent)"))
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def plan_nodes(plan):
+    nodes = [plan["Node Type"] + (f" on {plan['Index Name']}" if "Index Name" in plan else "")]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def explain(conn, sql, use_index):
+    setting = "on" if use_index else "off"
+    conn.execute(text(f"SET enable_indexscan = {setting}"))
+    conn.execute(text(f"SET enable_bitmapscan = {setting}"))
+    conn.execute(text(sql))  # warm the cache
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Execution Time"], plan_nodes(plan[0]["Plan"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        seed(conn, args.rows)
+        conn.commit()
+        print(f"Seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        try:
+            for name, sql in QUERIES.items():
+                for use_index in (True, False):
+                    ms, nodes = explain(conn, sql, use_index)
+                    label = "gist" if use_index else "seq "
+                    print(f"{name:<6} {label} {ms:8.2f} ms  {' > '.join(nodes)}")
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
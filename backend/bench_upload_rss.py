@@ -0,0 +1,109 @@
+# backend/bench_upload_rss.py
+"""Peak RSS of upload ingestion against upload size.
+
+Each (mode, size) runs in a fresh interpreter so its peak RSS is isolated:
+  buffered  the old path, f.write(await file.read())
+  spool     chunked spool_upload with SHA-256 while writing
+  s3        upload_fileobj streamed into a multipart upload (needs a bucket,
+            e.g. AWS_S3_ENDPOINT_URL pointing at MinIO)
+
+Run from the repo root:  python -m backend.bench_upload_rss --sizes-mb 64 256 1024
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from starlette.datastructures import UploadFile
+
+MB = 1024 * 1024
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_source(path, size_mb):
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(MB))
+
+
+def load_mode(mode):
+    """Import what a mode needs up front so imports don't count towards its RSS."""
+    if mode == "spool":
+        from backend.ndvi_service import spool_upload
+        return spool_upload
+    if mode == "s3":
+        from backend.s3_utils import upload_manager
+        return upload_manager
+    if mode == "buffered":
+        return None
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+async def ingest(mode, target, source_path, directory):
+    with open(source_path, "rb") as source:
+        file = UploadFile(file=source, filename="bench.tif")
+        if mode == "buffered":
+            temp_filename = os.path.join(directory, f"temp_{uuid4().hex}.tif")
+            with open(temp_filename, "wb") as f:
+                f.write(await file.read())
+            os.remove(temp_filename)
+        elif mode == "spool":
+            temp_filename = await target(file, directory=directory, digest=hashlib.sha256())
+            os.remove(temp_filename)
+        else:
+            target.upload_fileobj(file.file, f"bench/{uuid4().hex}.tif")
+
+
+def run_child(mode, source_path, directory):
+    target = load_mode(mode)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    asyncio.run(ingest(mode, target, source_path, directory))
+    seconds = time.perf_counter() - start
+    print(json.dumps({"baseline_mb": baseline, "peak_mb": peak_rss_mb(), "seconds": seconds}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--modes", nargs="+", default=["buffered", "spool"])
+    parser.add_argument("--dir", default=tempfile.gettempdir())
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "SOURCE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.child[1], args.dir)
+        return
+
+    print(f"{'mode':<10} {'size MB':>8} {'peak RSS MB':>12} {'added MB':>9} {'MB/s':>8}")
+    for size_mb in args.sizes_mb:
+        source_path = os.path.join(args.dir, f"bench_upload_{size_mb}mb.bin")
+        make_source(source_path, size_mb)
+        try:
+            for mode in args.modes:
+                output = subprocess.run(
+                    [sys.executable, "-m", "backend.bench_upload_rss", "--dir", args.dir,
+                     "--child", mode, source_path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                added = result["peak_mb"] - result["baseline_mb"]
+                print(f"{mode:<10} {size_mb:>8} {result['peak_mb']:>12.1f} {added:>9.1f} "
+                      f"{size_mb / result['seconds']:>8.1f}")
+        finally:
+            os.remove(source_path)
+
+
+if __name__ == "__main__":
+    main()
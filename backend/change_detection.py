@@ -0,0 +1,158 @@
+# backend/change_detection.py
+import os
+
+import numpy as np
+import rasterio
+from rasterio.transform import Affine
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+
+from backend.cog_writer import COGWriter
+from backend.coregistration import alignment_cache, estimate_alignment
+from backend.ndvi_processor import DEFAULT_TILE_SIZE, iter_tile_windows
+from backend.ndvi_stats import NDVIStatsAccumulator
+
+
+# |ΔNDVI| at or above this counts as declined / improved
+CHANGE_THRESHOLD = float(os.getenv("NDVI_CHANGE_THRESHOLD", "0.1"))
+# Slope is reported as NDVI change per this many days
+SLOPE_PERIOD_DAYS = 30
+# Long side of the decimated reads used to estimate the shift between dates
+ALIGN_PREVIEW_SIDE = 2048
+CHANGE_BANDS = ("delta", f"slope_per_{SLOPE_PERIOD_DAYS}d")
+
+
+def _warp_to_grid(src, reference, transform=None):
+    """`src` warped onto the reference grid, optionally offset by an alignment."""
+    return WarpedVRT(
+        src,
+        crs=reference.crs,
+        transform=transform or reference.transform,
+        width=reference.width,
+        height=reference.height,
+        resampling=Resampling.bilinear,
+        src_nodata=src.nodata,
+        nodata=src.nodata,
+    )
+
+
+def _read_values(dataset, scale, **read_options):
+    data = dataset.read(1, out_dtype="float32", **read_options)
+    if dataset.nodata is not None:
+        data[data == dataset.nodata] = np.nan
+    if scale != 1.0:
+        data *= np.float32(scale)
+    return data
+
+
+def _estimate_offset(reference_dataset, target_vrt, reference_scale, target_scale, cache_key):
+    """Whole-raster shift (rows, cols) of the target relative to the reference, from decimated reads."""
+    alignment = alignment_cache.get(cache_key)
+    if alignment is None:
+        factor = max(1.0, max(reference_dataset.height, reference_dataset.width) / ALIGN_PREVIEW_SIDE)
+        out_shape = (max(1, int(reference_dataset.height / factor)), max(1, int(reference_dataset.width / factor)))
+        reference = _read_values(reference_dataset, reference_scale, out_shape=out_shape)
+        target = _read_values(target_vrt, target_scale, out_shape=out_shape)
+        alignment = estimate_alignment(reference, target)
+        alignment.dy *= factor
+        alignment.dx *= factor
+        alignment_cache.put(cache_key, alignment)
+    return alignment
+
+
+def _slope(stack, days):
+    """Per-pixel least-squares NDVI slope over `days`, ignoring NaN dates; NaN where < 2 dates are valid."""
+    valid = np.isfinite(stack)
+    t = np.where(valid, days[:, None, None], 0.0)
+    y = np.where(valid, stack, 0.0)
+    n = valid.sum(axis=0)
+    sum_t = t.sum(axis=0)
+    sum_y = y.sum(axis=0)
+    denominator = n * (t * t).sum(axis=0) - sum_t * sum_t
+    numerator = n * (t * y).sum(axis=0) - sum_t * sum_y
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = numerator / denominator
+    slope[(n < 2) | (denominator <= 0)] = np.nan
+    return slope.astype("float32")
+
+
+def compute_ndvi_change(sources, output_path, tile_size=DEFAULT_TILE_SIZE):
+    """Per-pixel NDVI change across dates, written as a two-band COG (delta, slope).
+
+    `sources` are dicts with "path" (local NDVI COG), "timestamp" and "key"
+    (a stable id used to cache alignments), in any order. Every date is
+    warped onto the latest date's grid and shifted by its estimated
+    alignment; the change is then computed one window at a time, so memory
+    is bounded by dates × tile size. delta = latest − earliest.
+    """
+    if len(sources) < 2:
+        raise ValueError("Change detection needs at least two NDVI rasters")
+    sources = sorted(sources, key=lambda source: source["timestamp"])
+    start = sources[0]["timestamp"]
+    days = np.array([(source["timestamp"] - start).total_seconds() / 86400.0 for source in sources])
+    days_per_period = days / SLOPE_PERIOD_DAYS
+
+    delta_stats = NDVIStatsAccumulator(value_range=(-2.0, 2.0), stressed_threshold=-CHANGE_THRESHOLD,
+                                       healthy_threshold=CHANGE_THRESHOLD)
+    slope_stats = NDVIStatsAccumulator(value_range=(-1.0, 1.0))
+    opened = []
+    alignments = []
+    try:
+        with rasterio.open(sources[-1]["path"]) as reference:
+            reference_scale = reference.scales[0] if reference.scales else 1.0
+            for source in sources[:-1]:
+                src = rasterio.open(source["path"])
+                scale = src.scales[0] if src.scales else 1.0
+                vrt = _warp_to_grid(src, reference)
+                opened.append((src, vrt, scale))
+
+                alignment = _estimate_offset(
+                    reference, vrt, reference_scale, scale, f"change:{sources[-1]['key']}:{source['key']}"
+                )
+                if alignment.reliable and not alignment.is_identity:
+                    vrt.close()
+                    shifted = reference.transform * Affine.translation(-alignment.dx, -alignment.dy)
+                    vrt = _warp_to_grid(src, reference, transform=shifted)
+                    opened[-1] = (src, vrt, scale)
+                alignments.append({"dy": alignment.dy, "dx": alignment.dx, "reliable": alignment.reliable})
+
+            # The latest date defines the grid, so it is read as is
+            opened.append((None, reference, reference_scale))
+            alignments.append({"dy": 0.0, "dx": 0.0, "reliable": True})
+
+            with COGWriter(output_path, reference.width, reference.height, reference.crs, reference.transform,
+                           count=len(CHANGE_BANDS), encoding="float32", descriptions=list(CHANGE_BANDS)) as dst:
+                for window in iter_tile_windows(reference.width, reference.height, tile_size):
+                    stack = np.stack([_read_values(vrt, scale, window=window) for _, vrt, scale in opened])
+                    delta = stack[-1] - stack[0]
+                    slope = _slope(stack, days_per_period)
+                    delta_stats.update(delta)
+                    slope_stats.update(slope)
+                    dst.write(delta, 1, window=window)
+                    dst.write(slope, 2, window=window)
+    finally:
+        for src, vrt, _ in opened:
+            if src is not None:
+                vrt.close()
+                src.close()
+
+    delta_summary = delta_stats.result()
+    return {
+        "path": output_path,
+        "bands": list(CHANGE_BANDS),
+        "dates": [source["timestamp"].isoformat() for source in sources],
+        "alignments": alignments,
+        "stats": {
+            "delta": {
+                **{key: delta_summary[key] for key in ("min", "max", "mean", "std", "count", "percentiles")},
+                "declined_percentage": delta_summary["unhealthy_percentage"],
+                "stable_percentage": delta_summary["stressed_percentage"],
+                "improved_percentage": delta_summary["healthy_percentage"],
+                "threshold": CHANGE_THRESHOLD,
+            },
+            "slope": {
+                key: value for key, value in slope_stats.result().items()
+                if key in ("min", "max", "mean", "std", "count", "percentiles")
+            },
+        },
+    }
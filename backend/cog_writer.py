@@ -0,0 +1,121 @@
+# backend/cog_writer.py
+import os
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.shutil import copy as rio_copy
+
+
+COG_TILE_SIZE = 512
+COG_COMPRESS = os.getenv("NDVI_COG_COMPRESS", "deflate")
+# "float32" keeps full precision; "int16" stores round(value * 10000) with a scale
+# factor in the metadata, roughly halving the file for NDVI-range data
+COG_ENCODING = os.getenv("NDVI_COG_ENCODING", "float32")
+COG_OVERVIEW_RESAMPLING = Resampling.average
+
+FLOAT32_NODATA = -9999
+INT16_SCALE = 10000
+INT16_NODATA = -32768
+
+_ENCODINGS = {
+    "float32": {"dtype": "float32", "nodata": FLOAT32_NODATA, "predictor": 3},
+    "int16": {"dtype": "int16", "nodata": INT16_NODATA, "predictor": 2},
+}
+
+
+def overview_factors(width, height, tile_size=COG_TILE_SIZE):
+    """Power-of-two decimation factors until the smallest overview fits in one tile."""
+    factors = []
+    factor = 2
+    while max(width, height) / (factor // 2) > tile_size:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+class COGWriter:
+    """Tile-by-tile writer that produces a Cloud-Optimized GeoTIFF.
+
+    Tiles go into a tiled, compressed staging GTiff; on close the overview
+    pyramid is built from that file while it is still open and GDAL's COG
+    driver only reorders the existing tiles and overviews into COG layout.
+    Values are float32 arrays; NaN/inf become nodata in either encoding.
+    """
+
+    def __init__(self, path, width, height, crs, transform, count=1, encoding=COG_ENCODING,
+                 compress=COG_COMPRESS, tile_size=COG_TILE_SIZE, descriptions=None):
+        if encoding not in _ENCODINGS:
+            raise ValueError(f"Unknown COG encoding: {encoding}")
+        self.path = path
+        self.encoding = encoding
+        self.compress = compress
+        self.tile_size = tile_size
+        self.descriptions = descriptions or []
+        self.staging_path = path + ".staging.tif"
+        settings = _ENCODINGS[encoding]
+        self.nodata = settings["nodata"]
+        self.profile = {
+            "driver": "GTiff",
+            "width": width,
+            "height": height,
+            "count": count,
+            "crs": crs,
+            "transform": transform,
+            "dtype": settings["dtype"],
+            "nodata": settings["nodata"],
+            "tiled": True,
+            "blockxsize": tile_size,
+            "blockysize": tile_size,
+            "compress": compress,
+            "predictor": settings["predictor"],
+            "BIGTIFF": "IF_SAFER",
+        }
+        self._dst = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._dst = rasterio.open(self.staging_path, "w", **self.profile)
+        for index, description in enumerate(self.descriptions, start=1):
+            self._dst.set_band_description(index, description)
+        if self.encoding == "int16":
+            self._dst.scales = (1.0 / INT16_SCALE,) * self.profile["count"]
+        return self
+
+    def encode(self, values):
+        finite = np.isfinite(values)
+        if self.encoding == "int16":
+            scaled = np.clip(np.rint(values * INT16_SCALE), INT16_NODATA + 1, np.iinfo(np.int16).max)
+            return np.where(finite, scaled, self.nodata).astype("int16")
+        return np.where(finite, values, self.nodata).astype("float32")
+
+    def write(self, values, band=1, window=None):
+        self._dst.write(self.encode(values), band, window=window)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                factors = overview_factors(self.profile["width"], self.profile["height"], self.tile_size)
+                if factors:
+                    self._dst.build_overviews(factors, COG_OVERVIEW_RESAMPLING)
+            self._dst.close()
+            if exc_type is None:
+                rio_copy(
+                    self.staging_path, self.path, driver="COG",
+                    compress=self.compress, predictor="YES", blocksize=self.tile_size,
+                    overviews="FORCE_USE_EXISTING", BIGTIFF="IF_SAFER",
+                )
+        finally:
+            if os.path.exists(self.staging_path):
+                os.remove(self.staging_path)
+        return False
+
+
+def read_values(src, band=1, **read_options):
+    """Read a band written by COGWriter back as float32 with nodata as NaN."""
+    data = src.read(band, out_dtype="float32", **read_options)
+    if src.nodata is not None:
+        data[data == src.nodata] = np.nan
+    scale = src.scales[band - 1] if src.scales else 1.0
+    if scale != 1.0:
+        data *= np.float32(scale)
+    return data
@@ -0,0 +1,263 @@
+# backend/coregistration.py
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+import numpy as np
+from skimage.filters import window
+from skimage.registration import phase_cross_correlation
+
+
+# Coarsest pyramid level is the first one whose long side is at most this
+PYRAMID_MIN_SIDE = int(os.getenv("ALIGN_PYRAMID_MIN_SIDE", "256"))
+# Finer levels only correlate a central window of this size around the current estimate
+ALIGN_WINDOW = int(os.getenv("ALIGN_WINDOW", "1024"))
+ALIGN_UPSAMPLE = int(os.getenv("ALIGN_UPSAMPLE", "10"))
+# Shifts larger than this fraction of the image are treated as a failed match
+MAX_SHIFT_FRACTION = float(os.getenv("ALIGN_MAX_SHIFT_FRACTION", "0.25"))
+ALIGNMENT_CACHE_DIR = os.getenv("ALIGNMENT_CACHE_DIR", "alignment_cache")
+ALIGNMENT_CACHE_SIZE = int(os.getenv("ALIGNMENT_CACHE_SIZE", "1024"))
+
+
+@dataclass
+class Alignment:
+    """Translation (rows, cols) that moves the target onto the reference grid."""
+    dy: float = 0.0
+    dx: float = 0.0
+    error: float = 0.0
+    reliable: bool = True
+
+    @property
+    def is_identity(self):
+        return abs(self.dy) < 0.01 and abs(self.dx) < 0.01
+
+
+class AlignmentCache:
+    """Estimated transforms per (reference, target) key: in-process LRU over JSON files on disk.
+
+    The disk copy is shared by every raster worker process and survives restarts.
+    It holds at most `capacity` files too: reads refresh a file's mtime and
+    each put deletes the least recently used files beyond the cap.
+    """
+
+    def __init__(self, directory=ALIGNMENT_CACHE_DIR, capacity=ALIGNMENT_CACHE_SIZE):
+        self.directory = directory
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{hashlib.sha1(key.encode()).hexdigest()}.json")
+
+    def get(self, key):
+        with self._lock:
+            alignment = self._entries.get(key)
+            if alignment is not None:
+                self._entries.move_to_end(key)
+                return alignment
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                alignment = Alignment(**json.load(f))
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self._remember(key, alignment)
+        return alignment
+
+    def put(self, key, alignment):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(asdict(alignment), f)
+        os.replace(temp_path, path)
+        self._remember(key, alignment)
+        self._prune_disk(keep=path)
+
+    def _prune_disk(self, keep):
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".json") or path == keep:
+                continue
+            try:
+                files.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+        files.sort()
+        # `keep` (the entry just written) takes one of the `capacity` slots
+        for _, path in files[:max(len(files) + 1 - self.capacity, 0)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key, alignment):
+        with self._lock:
+            self._entries[key] = alignment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+
+alignment_cache = AlignmentCache()
+
+
+def band_fingerprint(band):
+    """Content key for a registration band, used when the caller has no better cache key."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{band.shape}{band.dtype}".encode())
+    digest.update(np.ascontiguousarray(band))
+    return digest.hexdigest()
+
+
+def _downsample(band):
+    """2×2 block mean (odd edges dropped)."""
+    height, width = (band.shape[0] // 2) * 2, (band.shape[1] // 2) * 2
+    trimmed = band[:height, :width]
+    return 0.25 * (trimmed[0::2, 0::2] + trimmed[1::2, 0::2] + trimmed[0::2, 1::2] + trimmed[1::2, 1::2])
+
+
+def build_pyramid(band, min_side=PYRAMID_MIN_SIDE):
+    """Full resolution first, each further level half the size, down to `min_side`."""
+    levels = [np.nan_to_num(band.astype("float32", copy=False))]
+    while max(levels[-1].shape) > min_side and min(levels[-1].shape) >= 32:
+        levels.append(_downsample(levels[-1]))
+    return levels
+
+
+def _overlap(length, offset, size):
+    """Centred reference slice of at most `size` whose target slice (shifted by `offset`) stays in bounds."""
+    start, stop = max(0, offset), min(length, length + offset)
+    span = min(size, stop - start)
+    if span < 16:
+        return None
+    start += (stop - start - span) // 2
+    return slice(start, start + span), slice(start - offset, start - offset + span)
+
+
+@functools.lru_cache(maxsize=32)
+def _hann(shape):
+    return window("hann", shape).astype("float32")
+
+
+def _prepare(patch):
+    # Mean removal + Hann taper: smooth field imagery has little high-frequency
+    # content, and unwindowed edges otherwise dominate the correlation peak
+    return (patch - patch.mean()) * _hann(patch.shape)
+
+
+def _residual_shift(reference, target, offset, upsample_factor=1):
+    """Shift still needed after moving `target` by the integer `offset`, measured on a central window."""
+    rows = _overlap(reference.shape[0], offset[0], ALIGN_WINDOW)
+    cols = _overlap(reference.shape[1], offset[1], ALIGN_WINDOW)
+    if rows is None or cols is None:
+        return None
+    shift, error, _ = phase_cross_correlation(
+        _prepare(reference[rows[0], cols[0]]), _prepare(target[rows[1], cols[1]]),
+        upsample_factor=upsample_factor, normalization=None,
+    )
+    return shift, float(error)
+
+
+def estimate_alignment(reference, target):
+    """Coarse-to-fine phase correlation between two 2D bands of the same shape."""
+    reference_levels = build_pyramid(reference)
+    target_levels = build_pyramid(target)
+    coarsest = min(len(reference_levels), len(target_levels)) - 1
+
+    shift = np.zeros(2)
+    error = 0.0
+    for level in range(coarsest, -1, -1):
+        scale = 2 ** level
+        offset = np.rint(shift / scale).astype(int)
+        upsample = ALIGN_UPSAMPLE if level == 0 else 1
+        residual = _residual_shift(reference_levels[level], target_levels[level], offset, upsample)
+        if residual is None:
+            return Alignment(reliable=False)
+        level_shift, error = residual
+        shift = (offset + level_shift) * scale
+
+    limit = MAX_SHIFT_FRACTION * np.array(reference.shape)
+    if np.any(np.abs(shift) > limit):
+        print(f"Co-registration shift {shift.tolist()} exceeds {MAX_SHIFT_FRACTION:.0%} of the image; ignoring it")
+        return Alignment(error=error, reliable=False)
+    return Alignment(dy=float(shift[0]), dx=float(shift[1]), error=error)
+
+
+def _match_shape(image, shape):
+    """Crop or NaN-pad the trailing (H, W) axes to `shape`."""
+    if image.shape[-2:] == tuple(shape):
+        return image
+    out = np.full(image.shape[:-2] + tuple(shape), np.nan, dtype="float32")
+    height, width = min(shape[0], image.shape[-2]), min(shape[1], image.shape[-1])
+    out[..., :height, :width] = image[..., :height, :width]
+    return out
+
+
+def apply_alignment(image, alignment):
+    """Move a (bands, H, W) or 2D image by the alignment; uncovered pixels become NaN (float32 output).
+
+    The whole-pixel part is a window copy; only a sub-pixel remainder is interpolated.
+    """
+    data = image.astype("float32", copy=False)
+    if alignment.is_identity:
+        return data
+    whole = np.rint([alignment.dy, alignment.dx]).astype(int)
+    fraction = np.array([alignment.dy, alignment.dx]) - whole
+
+    out = np.full(data.shape, np.nan, dtype="float32")
+    height, width = data.shape[-2:]
+    rows = _overlap(height, whole[0], height)
+    cols = _overlap(width, whole[1], width)
+    if rows is None or cols is None:
+        return out
+    out[..., rows[0], cols[0]] = data[..., rows[1], cols[1]]
+
+    # Separable linear interpolation, in place along rows then columns
+    for axis, amount in ((-2, fraction[0]), (-1, fraction[1])):
+        if abs(amount) >= 0.01:
+            _shift_fraction_inplace(out, amount, axis)
+    return out
+
+
+def _shift_fraction_inplace(data, amount, axis):
+    """data[i] = (1 - |f|) * data[i] + |f| * data[i - sign(f)] along `axis`; the vacated edge becomes NaN."""
+    weight = np.float32(abs(amount))
+    moved = np.moveaxis(data, axis, 0)
+    neighbour = np.full_like(moved, np.nan)
+    if amount > 0:
+        neighbour[1:] = moved[:-1]
+    else:
+        neighbour[:-1] = moved[1:]
+    moved *= 1 - weight
+    neighbour *= weight
+    moved += neighbour
+
+
+def align_to_reference(reference, target, band_index=None, cache_key=None, cache=alignment_cache):
+    """Register `target` onto `reference` (same band layout) and return the aligned target as float32.
+
+    Registration uses `band_index` of (bands, H, W) stacks, or the 2D arrays
+    themselves. The estimated transform is cached under `cache_key`
+    (default: a fingerprint of both registration bands).
+    """
+    reference_band = reference if reference.ndim == 2 else reference[band_index or 0]
+    target = _match_shape(target, reference.shape[-2:])
+    target_band = target if target.ndim == 2 else target[band_index or 0]
+
+    key = cache_key or f"{band_fingerprint(reference_band)}:{band_fingerprint(target_band)}"
+    alignment = cache.get(key) if cache is not None else None
+    if alignment is None:
+        alignment = estimate_alignment(reference_band, target_band)
+        if cache is not None:
+            cache.put(key, alignment)
+
+    if not alignment.reliable:
+        return target.astype("float32", copy=False)
+    return apply_alignment(target, alignment)
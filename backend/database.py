@@ -1,14 +1,209 @@
 # backend/database.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
 import os
+import threading
+import time
+
 from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Drivers the async engine swaps in for DATABASE_URL's (override with ASYNC_DATABASE_URL)
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+# Each worker process has two pools: the sync engine's (DB_POOL_SIZE +
+# DB_MAX_OVERFLOW) and the async engine's (DB_ASYNC_POOL_SIZE +
+# DB_ASYNC_MAX_OVERFLOW). Size their sum against the server's
+# max_connections / workers; the defaults add up to 20 per process.
+# Blocking queries run on the IO_WORKERS threads, so keep the sync total at
+# least that. Async handlers only hold a connection for their short reads,
+# so a few connections serve many concurrent requests.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "6"))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "4"))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "0"))
+# Seconds to wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections older than this are replaced (stay under server/LB idle timeouts)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Counters for one engine's connection pool, read by /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.pool = None
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def attach(self, engine):
+        # Pool events are registered on the sync engine behind an AsyncEngine
+        engine = getattr(engine, "sync_engine", engine)
+        self.pool = engine.pool
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def snapshot(self):
+        pool = self.pool
+        queue_pool = isinstance(pool, QueuePool)
+        with self._lock:
+            return {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "size": pool.size() if queue_pool else None,
+                "max_overflow": pool._max_overflow if queue_pool else None,
+                "checked_out": pool.checkedout() if queue_pool else None,
+                "checked_in": pool.checkedin() if queue_pool else None,
+                "overflow": max(pool.overflow(), 0) if queue_pool else None,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """The same checkout timing for the async engine's pool."""
+
+
+def _pool_options(url, poolclass, pool_size, max_overflow):
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if not (url.startswith("sqlite") and ":memory:" in url):
+        options.update(
+            poolclass=poolclass,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def _instrument(engine, metrics):
+    if metrics is not None:
+        pool = getattr(engine, "sync_engine", engine).pool
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.metrics = metrics
+        metrics.attach(engine)
+    return engine
+
+
+def create_db_engine(url=DATABASE_URL, metrics=None, **overrides):
+    """The one way to build an engine: pool sizing, recycling and pre-ping from DB_POOL_* settings.
+
+    Pool events feed `metrics` (a PoolMetrics) when given. In-memory SQLite
+    keeps SQLAlchemy's own single-connection pool.
+    """
+    options = _pool_options(url, InstrumentedQueuePool, DB_POOL_SIZE, DB_MAX_OVERFLOW)
+    options.update(overrides)
+    return _instrument(create_engine(url, **options), metrics)
+
+
+def async_database_url(url):
+    """`url` with its driver replaced by the asyncio one (asyncpg for Postgres, aiosqlite for SQLite)."""
+    driver = ASYNC_DRIVERS.get(make_url(url).get_backend_name())
+    if driver is None:
+        return url
+    return driver + url[url.index("://"):]
+
+
+def create_async_db_engine(url=None, metrics=None, **overrides):
+    """AsyncEngine with its own pool, sized by DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW (timeout, recycle
+    and pre-ping shared with the sync engine)."""
+    url = url or os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+    options = _pool_options(url, InstrumentedAsyncQueuePool, DB_ASYNC_POOL_SIZE, DB_ASYNC_MAX_OVERFLOW)
+    options.update(overrides)
+    return _instrument(create_async_engine(url, **options), metrics)
+
+
+pool_metrics = PoolMetrics()
+engine = create_db_engine(DATABASE_URL, metrics=pool_metrics)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async handlers read through this engine, so DB round-trips don't tie up a thread each
+async_pool_metrics = PoolMetrics()
+async_engine = create_async_db_engine(metrics=async_pool_metrics)
+# Objects stay readable after commit; async sessions can't lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
+
+
+def get_db():
+    """Request-scoped session; the connection goes back to the pool when the request ends."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Request-scoped AsyncSession for async def handlers."""
+    async with AsyncSessionLocal() as db:
+        yield db
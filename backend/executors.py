@@ -0,0 +1,193 @@
+# backend/executors.py
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+RASTER_WORKERS = int(os.getenv("RASTER_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+RASTER_QUEUE_DEPTH = int(os.getenv("RASTER_QUEUE_DEPTH", str(RASTER_WORKERS * 2)))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+IO_QUEUE_DEPTH = int(os.getenv("IO_QUEUE_DEPTH", "64"))
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "8"))
+S3_UPLOAD_QUEUE_DEPTH = int(os.getenv("S3_UPLOAD_QUEUE_DEPTH", str(S3_UPLOAD_WORKERS * 4)))
+
+# How long a request waits for a free slot before we answer 503
+EXECUTOR_WAIT_TIMEOUT = float(os.getenv("EXECUTOR_WAIT_TIMEOUT", "30"))
+
+# GDAL and fork don't mix well; spawn gives every raster worker a clean interpreter
+RASTER_START_METHOD = os.getenv("RASTER_START_METHOD", "spawn")
+
+
+class ExecutorBusy(Exception):
+    """Raised when an executor's queue stays full for longer than its wait timeout."""
+
+
+class ExecutorRestarted(ExecutorBusy):
+    """Raised for a call lost because a worker died; the pool has been replaced, so a retry can succeed."""
+
+
+class BoundedExecutor:
+    """An executor with a cap on in-flight work, awaitable from the event loop.
+
+    At most `queue_depth` calls are submitted at once (running or queued in
+    the pool). Further callers wait asynchronously for a slot and get
+    ExecutorBusy after `wait_timeout`, so a burst of uploads applies
+    backpressure instead of piling unbounded work onto the pool. Synchronous
+    callers use submit(), which shares the pool and the in-flight count but
+    not the cap.
+    """
+
+    def __init__(self, name, executor_factory, max_workers, queue_depth, wait_timeout=EXECUTOR_WAIT_TIMEOUT):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_depth = max(queue_depth, max_workers)
+        self.wait_timeout = wait_timeout
+        self._executor_factory = executor_factory
+        self._executor = None
+        self._slots = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily so importing this module never starts worker processes
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._executor_factory(self.max_workers)
+            return self._executor
+
+    def _discard_broken(self, executor):
+        # A dead worker leaves the pool broken for good; the next call gets a fresh one
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        print(f"{self.name} executor is broken, restarting it")
+        executor.shutdown(wait=False)
+
+    def _started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def _finished(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _get_slots(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.queue_depth)
+        return self._slots
+
+    async def run(self, func, *args, **kwargs):
+        slots = self._get_slots()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise ExecutorBusy(f"{self.name} executor is at capacity ({self.queue_depth} in flight)")
+        finally:
+            self._waiting -= 1
+
+        self._started()
+        executor = self._get_executor()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        except BrokenExecutor as e:
+            self._discard_broken(executor)
+            raise ExecutorRestarted(f"{self.name} executor lost a worker; retry the request") from e
+        finally:
+            self._finished()
+            slots.release()
+
+    def submit(self, func, *args, **kwargs):
+        """Submit from synchronous code; returns a concurrent.futures.Future.
+
+        A future that fails because the pool broke still raises the pool's own
+        error, but the pool is replaced for the next submit.
+        """
+        self._started()
+        executor = self._get_executor()
+        try:
+            future = executor.submit(func, *args, **kwargs)
+        except BrokenExecutor as e:
+            self._finished()
+            self._discard_broken(executor)
+            raise ExecutorRestarted(f"{self.name} executor lost a worker; retry the request") from e
+        except BaseException:
+            self._finished()
+            raise
+
+        def done(future):
+            self._finished()
+            if not future.cancelled() and isinstance(future.exception(), BrokenExecutor):
+                self._discard_broken(executor)
+
+        future.add_done_callback(done)
+        return future
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+        }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def _process_pool(max_workers):
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(RASTER_START_METHOD),
+    )
+
+
+def _thread_pool(max_workers):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="io")
+
+
+def _s3_thread_pool(max_workers):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-upload")
+
+
+# CPU-bound raster work (decode, filter, NDVI, previews) runs in worker processes
+raster_executor = BoundedExecutor("raster", _process_pool, RASTER_WORKERS, RASTER_QUEUE_DEPTH)
+
+# Blocking S3 and database calls run on threads
+io_executor = BoundedExecutor("io", _thread_pool, IO_WORKERS, IO_QUEUE_DEPTH)
+
+# Whole-file S3 uploads; kept apart from io so multipart transfers can't starve DB calls
+s3_executor = BoundedExecutor("s3", _s3_thread_pool, S3_UPLOAD_WORKERS, S3_UPLOAD_QUEUE_DEPTH)
+
+
+async def run_raster(func, *args, **kwargs):
+    """Run a picklable, module-level function in the raster process pool."""
+    return await raster_executor.run(func, *args, **kwargs)
+
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking call (boto3, SQLAlchemy) on the I/O thread pool."""
+    return await io_executor.run(func, *args, **kwargs)
+
+
+def executor_stats():
+    return {
+        "raster": raster_executor.stats(),
+        "io": io_executor.stats(),
+        "s3": s3_executor.stats(),
+    }
+
+
+def shutdown_executors():
+    raster_executor.shutdown()
+    io_executor.shutdown()
+    s3_executor.shutdown()
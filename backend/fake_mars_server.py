@@ -0,0 +1,89 @@
+# backend/fake_mars_server.py
+"""Stand-in for the MARS LangGraph deployment, for local runs and benchmarks.
+
+Implements the few LangGraph API routes the client uses: stateless
+/runs/wait, plus threads/runs/join for the old thread-per-call flow. It
+answers with a canned advisory after FAKE_MARS_LATENCY_MS, fails a
+FAKE_MARS_FAILURE_RATE fraction of calls with a 503, and counts every
+request at GET /stats.
+
+A list input under FAKE_MARS_BATCH_KEY (default "images") is treated as a
+batch: the reply carries one result per item under the same key.
+
+Run with:  uvicorn backend.fake_mars_server:app --port 8123
+and point the app at it with MARS_URL=http://127.0.0.1:8123
+"""
+import asyncio
+import os
+import random
+from collections import Counter
+from uuid import uuid4
+
+from fastapi import FastAPI, HTTPException, Request
+
+
+FAKE_MARS_LATENCY_MS = float(os.getenv("FAKE_MARS_LATENCY_MS", "200"))
+FAKE_MARS_FAILURE_RATE = float(os.getenv("FAKE_MARS_FAILURE_RATE", "0"))
+FAKE_MARS_BATCH_KEY = os.getenv("FAKE_MARS_BATCH_KEY", "images")
+
+app = FastAPI()
+calls = Counter()
+_runs = {}
+
+
+def advise(payload: dict) -> dict:
+    coordinates = payload.get("coordinates") or {}
+    return {
+        "image_key": payload.get("image_key"),
+        "coordinates": coordinates,
+        "advice": f"Scout the low-NDVI patches in {payload.get('image_key')}",
+    }
+
+
+async def _graph(graph_input: dict) -> dict:
+    await asyncio.sleep(FAKE_MARS_LATENCY_MS / 1000.0)
+    if random.random() < FAKE_MARS_FAILURE_RATE:
+        raise HTTPException(status_code=503, detail="fake MARS is overloaded")
+    items = graph_input.get(FAKE_MARS_BATCH_KEY)
+    if isinstance(items, list):
+        return {FAKE_MARS_BATCH_KEY: [advise(item) for item in items]}
+    return advise(graph_input)
+
+
+@app.post("/runs/wait")
+async def stateless_wait(request: Request):
+    calls["runs/wait"] += 1
+    body = await request.json()
+    return await _graph(body.get("input") or {})
+
+
+@app.post("/threads")
+async def create_thread():
+    calls["threads"] += 1
+    return {"thread_id": uuid4().hex}
+
+
+@app.post("/threads/{thread_id}/runs")
+async def create_run(thread_id: str, request: Request):
+    calls["threads/runs"] += 1
+    body = await request.json()
+    run_id = uuid4().hex
+    _runs[run_id] = asyncio.ensure_future(_graph(body.get("input") or {}))
+    return {"run_id": run_id, "thread_id": thread_id}
+
+
+@app.get("/threads/{thread_id}/runs/{run_id}/join")
+async def join_run(thread_id: str, run_id: str):
+    calls["threads/runs/join"] += 1
+    return await _runs.pop(run_id)
+
+
+@app.get("/stats")
+def stats():
+    return {"requests": sum(calls.values()), **calls}
+
+
+@app.post("/stats/reset")
+def reset_stats():
+    calls.clear()
+    return {"requests": 0}
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Optional
+from backend.database import get_async_db, get_db
+from backend.models import Field, NDVIResult, Project
+from backend.executors import ExecutorBusy, run_io
+from backend.field_stats import create_field, get_result_field_stats, serialize_field
+from backend.ndvi_routes import serialize_ndvi_summary
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page, paginate_query
+from backend.schemas import FieldCreate
+from backend.spatial_search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, field_geometry, search_results
+
+router = APIRouter()
+
+
+@router.post("/projects/{project_id}/fields", status_code=201)
+def add_field(project_id: int, field: FieldCreate, db: Session = Depends(get_db)):
+    """Store a field boundary (GeoJSON Polygon or MultiPolygon in EPSG:4326) for the project."""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    try:
+        return serialize_field(create_field(db, project_id, field.name, field.boundary))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/projects/{project_id}/fields")
+async def list_fields(
+    project_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    fields, next_cursor = await paginate_query(
+        db, select(Field).where(Field.project_id == project_id), Field.created_at, Field.id, cursor, limit
+    )
+    return page([serialize_field(field) for field in fields], next_cursor)
+
+
+@router.get("/projects/{project_id}/fields/{field_id}/ndvi")
+def list_field_ndvi_results(
+    project_id: int,
+    field_id: int,
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: Session = Depends(get_db)
+):
+    """The project's NDVI results that intersect the field boundary, newest first."""
+    field = db.query(Field).filter(Field.id == field_id, Field.project_id == project_id).first()
+    if not field:
+        raise HTTPException(status_code=404, detail="Field not found")
+    return [serialize_ndvi_summary(r) for r in search_results(db, field_geometry(field_id), project_id, limit)]
+
+
+@router.get("/ndvi/{result_id}/field-stats")
+async def get_field_stats(result_id: int, db: Session = Depends(get_db)):
+    """Per-field NDVI statistics for a result; fields without stored stats are computed once and saved."""
+    result = await run_io(lambda: db.query(NDVIResult).filter(NDVIResult.id == result_id).first())
+    if not result:
+        raise HTTPException(status_code=404, detail="NDVI result not found")
+    if not result.ndvi_cog_url:
+        # Without a raster every field would read as "no overlap"
+        raise HTTPException(status_code=409, detail="No NDVI raster stored for this result; field stats unavailable")
+
+    try:
+        fields = await get_result_field_stats(db, result)
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"result_id": result.id, "fields": fields}
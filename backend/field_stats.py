@@ -0,0 +1,104 @@
+# backend/field_stats.py
+from typing import List, Optional
+
+from geoalchemy2.shape import from_shape, to_shape
+from shapely.geometry import MultiPolygon, mapping, shape
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.executors import run_io, run_raster
+from backend.models import Field, FieldStats, NDVIResult
+from backend.ndvi_stats import stats_columns
+from backend.tile_server import with_local_sources
+from backend.zonal_stats import compute_zonal_stats
+
+
+def parse_boundary(geojson: dict) -> MultiPolygon:
+    """GeoJSON Polygon/MultiPolygon (EPSG:4326) as a valid MultiPolygon; ValueError otherwise."""
+    try:
+        geometry = shape(geojson)
+    except Exception as e:
+        raise ValueError(f"Invalid GeoJSON geometry: {e}")
+    if geometry.geom_type == "Polygon":
+        geometry = MultiPolygon([geometry])
+    if geometry.geom_type != "MultiPolygon":
+        raise ValueError("Field boundary must be a Polygon or MultiPolygon")
+    if geometry.is_empty or not geometry.is_valid:
+        raise ValueError("Field boundary is empty or self-intersecting")
+    return geometry
+
+
+def create_field(db: Session, project_id: int, name: str, geojson: dict) -> Field:
+    field = Field(project_id=project_id, name=name, boundary=from_shape(parse_boundary(geojson), srid=4326))
+    db.add(field)
+    db.commit()
+    db.refresh(field)
+    return field
+
+
+def serialize_field(field: Field) -> dict:
+    return {
+        "id": field.id,
+        "project_id": field.project_id,
+        "name": field.name,
+        "boundary": mapping(to_shape(field.boundary)),
+        "created_at": field.created_at.isoformat() if field.created_at else None,
+    }
+
+
+def serialize_field_stats(field: Field, stats: Optional[FieldStats]) -> dict:
+    row = {"field_id": field.id, "name": field.name}
+    if stats is None:
+        return {**row, "pixel_count": 0}
+    return {
+        **row,
+        "pixel_count": stats.pixel_count,
+        "ndvi_min": stats.ndvi_min,
+        "ndvi_max": stats.ndvi_max,
+        "ndvi_mean": stats.ndvi_mean,
+        "ndvi_std": stats.ndvi_std,
+        "ndvi_p2": stats.ndvi_p2,
+        "ndvi_median": stats.ndvi_median,
+        "ndvi_p98": stats.ndvi_p98,
+        "healthy_percentage": stats.healthy_percentage,
+        "stressed_percentage": stats.stressed_percentage,
+        "unhealthy_percentage": stats.unhealthy_percentage,
+        "computed_at": stats.computed_at.isoformat() if stats.computed_at else None,
+    }
+
+
+def _load_field_stats(db: Session, result: NDVIResult):
+    fields = db.query(Field).filter(Field.project_id == result.project_id).order_by(Field.id).all()
+    stored = db.query(FieldStats).filter(FieldStats.result_id == result.id).all()
+    return fields, {stats.field_id: stats for stats in stored}
+
+
+def _save_field_stats(db: Session, result_id: int, computed: dict) -> None:
+    for field_id, stats in computed.items():
+        db.add(FieldStats(field_id=field_id, result_id=result_id, pixel_count=stats["count"], **stats_columns(stats)))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request stored the same (field, result) pairs first; theirs are identical
+        db.rollback()
+
+
+async def get_result_field_stats(db: Session, result: NDVIResult) -> List[dict]:
+    """Stats of every field in the result's project, computing only the ones not yet stored.
+
+    All missing fields are rasterized together and measured in one pass over
+    the NDVI COG, then persisted so later requests are a plain table read.
+    The session is closed before the raster work so its connection isn't
+    held through the download and zonal pass.
+    """
+    fields, stored = await run_io(_load_field_stats, db, result)
+    missing = [field for field in fields if field.id not in stored]
+    if missing and result.ndvi_cog_url:
+        zones = {field.id: mapping(to_shape(field.boundary)) for field in missing}
+        await run_io(db.close)
+        computed = await with_local_sources(
+            [result.ndvi_cog_url], lambda paths: run_raster(compute_zonal_stats, paths[0], zones)
+        )
+        await run_io(_save_field_stats, db, result.id, computed)
+        fields, stored = await run_io(_load_field_stats, db, result)
+    return [serialize_field_stats(field, stored.get(field.id)) for field in fields]
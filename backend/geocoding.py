@@ -0,0 +1,149 @@
+# backend/geocoding.py
+"""Location → coordinates, looked up once per distinct location.
+
+Lookup order: in-process LRU → geocode_cache table → geocoder backend.
+Keys are normalized location strings, so "Nakuru, Kenya" and
+" nakuru,  KENYA " share an entry. "No match" answers are cached too;
+backend errors are not. The backend is OpenCage by default and can be
+swapped for the offline stub (GEOCODER=offline, or set_geocoder) so tests
+and local runs never call the external API.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.models import GeocodeCacheEntry
+
+
+GEOCODER = os.getenv("GEOCODER", "opencage")
+GEOCODE_MEMORY_CACHE_SIZE = int(os.getenv("GEOCODE_MEMORY_CACHE_SIZE", "4096"))
+
+_WHITESPACE = re.compile(r"\s+")
+_SEPARATOR_SPACES = re.compile(r"\s*,\s*")
+
+
+class GeocoderUnavailable(Exception):
+    """The backend can't answer right now (not configured, or the provider failed)."""
+
+
+def normalize_location(location: str) -> str:
+    key = _WHITESPACE.sub(" ", location.strip().casefold())
+    return _SEPARATOR_SPACES.sub(", ", key).strip(" ,")
+
+
+class OpenCageGeocoder:
+    name = "opencage"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.getenv("OPENCAGE_API_KEY")
+        self._client = None
+
+    def lookup(self, location: str):
+        """(latitude, longitude) of the best match, or None if there is none."""
+        if not self.api_key:
+            raise GeocoderUnavailable("OpenCage API key not configured")
+        if self._client is None:
+            from opencage.geocoder import OpenCageGeocode
+            self._client = OpenCageGeocode(self.api_key)
+        try:
+            results = self._client.geocode(location)
+        except Exception as e:
+            raise GeocoderUnavailable(str(e))
+        if not results:
+            return None
+        return results[0]["geometry"]["lat"], results[0]["geometry"]["lng"]
+
+
+class OfflineGeocoder:
+    """Answers from a fixed {location: (lat, lng)} table; never touches the network."""
+    name = "offline"
+
+    def __init__(self, places: Optional[dict] = None):
+        self.places = {normalize_location(location): coords for location, coords in (places or {}).items()}
+        self.lookups = 0
+
+    def lookup(self, location: str):
+        self.lookups += 1
+        return self.places.get(normalize_location(location))
+
+
+def _default_geocoder():
+    return OfflineGeocoder() if GEOCODER == "offline" else OpenCageGeocoder()
+
+
+def _coords(latitude, longitude) -> dict:
+    return {"latitude": latitude, "longitude": longitude}
+
+
+class GeocodingService:
+    def __init__(self, geocoder=None, capacity: int = GEOCODE_MEMORY_CACHE_SIZE):
+        self.geocoder = geocoder or _default_geocoder()
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, coords):
+        with self._lock:
+            self._entries[key] = coords
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def _recall(self, key):
+        with self._lock:
+            coords = self._entries.get(key)
+            if coords is not None:
+                self._entries.move_to_end(key)
+            return coords
+
+    def clear_memory(self):
+        with self._lock:
+            self._entries.clear()
+
+    def geocode(self, db: Session, location: str) -> dict:
+        """{"latitude", "longitude"} for the location (both None if nothing matched).
+
+        Blocking (database and possibly the provider), so call it through run_io
+        from async code. Raises GeocoderUnavailable if the provider has to be
+        asked and can't answer.
+        """
+        key = normalize_location(location)
+        coords = self._recall(key)
+        if coords is not None:
+            return dict(coords)
+
+        entry = db.query(GeocodeCacheEntry).filter(GeocodeCacheEntry.location_key == key).first()
+        if entry is None:
+            match = self.geocoder.lookup(location)
+            entry = GeocodeCacheEntry(
+                location_key=key,
+                query=location,
+                latitude=match[0] if match else None,
+                longitude=match[1] if match else None,
+                provider=self.geocoder.name,
+            )
+            db.add(entry)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Someone else cached the same location first; use theirs
+                db.rollback()
+                entry = db.query(GeocodeCacheEntry).filter(GeocodeCacheEntry.location_key == key).first()
+
+        coords = _coords(entry.latitude, entry.longitude)
+        self._remember(key, coords)
+        return dict(coords)
+
+
+geocoding_service = GeocodingService()
+
+
+def set_geocoder(geocoder) -> None:
+    """Swap the backend (e.g. an OfflineGeocoder in tests); the in-process cache is dropped."""
+    geocoding_service.geocoder = geocoder
+    geocoding_service.clear_memory()
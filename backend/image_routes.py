@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from backend.file_upload import get_db
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from backend.database import get_async_db
 from backend.models import UploadedFile  # or ImageMetadata depending on your table
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page, paginate_query
 
 router = APIRouter()
 
 @router.get("/project-images/")
-def get_project_images(db: Session = Depends(get_db)):
-    images = db.query(UploadedFile).all()
-    return [
+async def get_project_images(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    images, next_cursor = await paginate_query(
+        db, select(UploadedFile), UploadedFile.uploaded_at, UploadedFile.id, cursor, limit
+    )
+    return page([
         {
             "id": img.id,
             "filename": img.filename,
@@ -16,4 +25,4 @@ def get_project_images(db: Session = Depends(get_db)):
             "upload_time": img.uploaded_at
         }
         for img in images
-    ]
+    ], next_cursor)
@@ -0,0 +1,279 @@
+# backend/insights.py
+"""AI insights for stored NDVI results, computed after the result is committed.
+
+Uploads only queue a pending ndvi_insights row; enrichment workers claim
+rows the same way job workers claim processing_jobs (a conditional UPDATE,
+with a lease so rows of a crashed worker are picked up again), resolve the
+project's coordinates, call MARS and store the answer. Workers run as
+asyncio tasks inside the API process (INSIGHT_WORKERS > 0) or standalone:
+python -m backend.insights
+"""
+import asyncio
+import os
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal
+from backend.executors import run_io
+from backend.geocoding import GeocoderUnavailable, geocoding_service
+from backend.mars_client import run_mars_insights
+from backend.models import NDVIInsight, NDVIResult, Project
+
+
+INSIGHT_WORKERS = int(os.getenv("INSIGHT_WORKERS", "2"))
+INSIGHT_POLL_INTERVAL = float(os.getenv("INSIGHT_POLL_INTERVAL", "2"))
+INSIGHT_LEASE_SECONDS = int(os.getenv("INSIGHT_LEASE_SECONDS", "600"))
+INSIGHT_MAX_ATTEMPTS = int(os.getenv("INSIGHT_MAX_ATTEMPTS", "3"))
+# A failed attempt goes back to pending and waits this long, doubling per attempt, before its retry
+INSIGHT_RETRY_BACKOFF = float(os.getenv("INSIGHT_RETRY_BACKOFF", "60"))
+# Longest a GET /ndvi/{id}/insights?wait= request is held open
+INSIGHT_MAX_WAIT = float(os.getenv("INSIGHT_MAX_WAIT", "30"))
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+_wakeup = None
+_worker_tasks = []
+_stop = None
+# result_id -> [Event set when this process finishes that result's insights, number of waiters]
+_finished_events = {}
+
+
+def _claimable(now):
+    stale_before = now - timedelta(seconds=INSIGHT_LEASE_SECONDS)
+    return or_(
+        and_(NDVIInsight.status == "pending", or_(NDVIInsight.retry_at.is_(None), NDVIInsight.retry_at <= now)),
+        and_(NDVIInsight.status == "running", NDVIInsight.started_at < stale_before),
+    )
+
+
+def queue_insight(db: Session, result_id: int, image_key: str) -> NDVIInsight:
+    """Pending insights row for the result (the existing one if it was already queued)."""
+    insight = NDVIInsight(
+        result_id=result_id, image_key=image_key, status="pending", attempts=0, created_at=datetime.utcnow()
+    )
+    db.add(insight)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return db.query(NDVIInsight).filter(NDVIInsight.result_id == result_id).first()
+    db.refresh(insight)
+    return insight
+
+
+def notify_insight_workers():
+    """Wake idle in-process workers instead of waiting for the next poll."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def claim_next_insight(db: Session, worker_id: str) -> Optional[NDVIInsight]:
+    now = datetime.utcnow()
+    candidate = (
+        db.query(NDVIInsight.id)
+        .filter(_claimable(now))
+        .order_by(NDVIInsight.created_at)
+        .first()
+    )
+    if candidate is None:
+        return None
+
+    claimed = (
+        db.query(NDVIInsight)
+        .filter(NDVIInsight.id == candidate.id, _claimable(now))
+        .update(
+            {
+                NDVIInsight.status: "running",
+                NDVIInsight.worker_id: worker_id,
+                NDVIInsight.started_at: now,
+                NDVIInsight.attempts: NDVIInsight.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not claimed:
+        return None
+    return db.get(NDVIInsight, candidate.id)
+
+
+def project_coordinates(db: Session, project_id: int) -> dict:
+    """Stored project coordinates, else the (cached) geocode of its location, else 0/0."""
+    coords = {"latitude": 0, "longitude": 0}
+    project = db.get(Project, project_id)
+    if project is None:
+        return coords
+    if project.latitude is not None and project.longitude is not None:
+        return {"latitude": project.latitude, "longitude": project.longitude}
+    if project.location:
+        try:
+            coords = geocoding_service.geocode(db, project.location)
+        except GeocoderUnavailable as e:
+            print("Geocode error:", str(e))
+    return coords
+
+
+def _build_payload(db: Session, insight: NDVIInsight) -> dict:
+    result = db.get(NDVIResult, insight.result_id)
+    return {
+        "image_key": insight.image_key,
+        "coordinates": project_coordinates(db, result.project_id) if result else {"latitude": 0, "longitude": 0},
+        "user_id": "demo_user",
+    }
+
+
+def finish_insight(db: Session, insight: NDVIInsight, status: str, payload=None, result=None, error=None):
+    insight.status = status
+    insight.payload = payload
+    insight.result = result
+    insight.error = error
+    insight.retry_at = None
+    insight.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def retry_insight(db: Session, insight: NDVIInsight, payload=None, error=None):
+    """Put a failed attempt back to pending, claimable again after an exponential backoff."""
+    delay = INSIGHT_RETRY_BACKOFF * 2 ** max(insight.attempts - 1, 0)
+    insight.status = "pending"
+    insight.payload = payload
+    insight.error = error
+    insight.retry_at = datetime.utcnow() + timedelta(seconds=delay)
+    db.commit()
+
+
+def _mark_finished(result_id: int):
+    entry = _finished_events.pop(result_id, None)
+    if entry is not None:
+        entry[0].set()
+
+
+async def run_insight(db: Session, insight: NDVIInsight):
+    if insight.attempts > INSIGHT_MAX_ATTEMPTS:
+        await run_io(finish_insight, db, insight, "failed", error=f"Gave up after {insight.attempts - 1} attempts")
+        _mark_finished(insight.result_id)
+        return
+
+    payload = None
+    try:
+        payload = await run_io(_build_payload, db, insight)
+        # Don't hold the connection while MARS answers; finish_insight updates the row by key
+        await run_io(db.rollback)
+        ai_result = await run_mars_insights(payload)
+    except Exception as e:
+        traceback.print_exc()
+        await run_io(db.rollback)
+        if insight.attempts < INSIGHT_MAX_ATTEMPTS:
+            # MARS retries cover short blips; longer outages get another attempt later
+            await run_io(retry_insight, db, insight, payload=payload, error=str(e))
+            return
+        await run_io(finish_insight, db, insight, "failed", payload=payload, error=str(e))
+    else:
+        await run_io(finish_insight, db, insight, "succeeded", payload=payload, result=ai_result)
+    _mark_finished(insight.result_id)
+
+
+async def worker_loop(worker_id: str, stop: asyncio.Event):
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+
+    while not stop.is_set():
+        # Cleared before claiming so a queue during the claim still wakes us
+        _wakeup.clear()
+        db = SessionLocal()
+        try:
+            insight = await run_io(claim_next_insight, db, worker_id)
+            if insight is not None:
+                await run_insight(db, insight)
+                continue
+        except Exception:
+            traceback.print_exc()
+        finally:
+            db.close()
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=INSIGHT_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_insight_workers(count: int = INSIGHT_WORKERS):
+    global _stop
+    _stop = asyncio.Event()
+    prefix = f"{os.getpid()}-insights"
+    for index in range(count):
+        _worker_tasks.append(asyncio.create_task(worker_loop(f"{prefix}-{index}", _stop)))
+
+
+async def stop_insight_workers():
+    if _stop is not None:
+        _stop.set()
+        notify_insight_workers()
+    if _worker_tasks:
+        await asyncio.gather(*_worker_tasks, return_exceptions=True)
+        _worker_tasks.clear()
+
+
+def get_insight(db: Session, result_id: int) -> Optional[NDVIInsight]:
+    db.expire_all()
+    return db.query(NDVIInsight).filter(NDVIInsight.result_id == result_id).first()
+
+
+async def wait_for_insight(db: Session, result_id: int, wait: float) -> Optional[NDVIInsight]:
+    """The result's insights row, long-polling up to `wait` seconds for it to finish.
+
+    Finishing in this process wakes the waiter immediately; rows finished
+    by another process are seen on the next poll. The session is closed
+    before every wait, so a long poll doesn't keep a pooled connection (and
+    an open transaction) checked out; loaded objects stay readable.
+    """
+    deadline = time.monotonic() + min(wait, INSIGHT_MAX_WAIT)
+    while True:
+        insight = await run_io(get_insight, db, result_id)
+        remaining = deadline - time.monotonic()
+        if insight is None or insight.status in FINISHED_STATUSES or remaining <= 0:
+            return insight
+        await run_io(db.close)
+        entry = _finished_events.setdefault(result_id, [asyncio.Event(), 0])
+        entry[1] += 1
+        try:
+            await asyncio.wait_for(entry[0].wait(), timeout=min(remaining, INSIGHT_POLL_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # The last waiter drops the Event, so rows finished elsewhere don't leave one behind
+            entry[1] -= 1
+            if entry[1] == 0 and _finished_events.get(result_id) is entry:
+                del _finished_events[result_id]
+
+
+def serialize_insight(insight: NDVIInsight) -> dict:
+    return {
+        "result_id": insight.result_id,
+        "status": insight.status,
+        "attempts": insight.attempts,
+        "insights": insight.result,
+        "error": insight.error,
+        "created_at": insight.created_at.isoformat() if insight.created_at else None,
+        "retry_at": insight.retry_at.isoformat() if insight.retry_at else None,
+        "finished_at": insight.finished_at.isoformat() if insight.finished_at else None,
+    }
+
+
+async def _run_standalone(count: int):
+    start_insight_workers(count)
+    try:
+        await asyncio.gather(*_worker_tasks)
+    finally:
+        await stop_insight_workers()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run_standalone(max(INSIGHT_WORKERS, 1)))
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from backend.database import get_async_db, get_db
+from backend.models import Project, ProcessingJob
+from backend.executors import run_io
+from backend.jobs import JOB_SPOOL_DIR, enqueue_job, notify_workers, serialize_job
+from backend.ndvi_service import is_supported_upload, remove_files, spool_upload
+from backend.ndvi_routes import parse_index_names
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page, paginate_query
+
+router = APIRouter()
+
+
+@router.post("/projects/{project_id}/ndvi-jobs", status_code=202)
+async def submit_ndvi_jobs(
+    project_id: int,
+    files: List[UploadFile] = File(...),
+    indices: Optional[str] = Query(None, description="Extra vegetation indices, e.g. NDRE,GNDVI,SAVI,EVI"),
+    db: Session = Depends(get_db)
+):
+    """Spool the uploads and queue one NDVI job per file; returns job ids immediately."""
+    project = await run_io(lambda: db.query(Project).filter(Project.id == project_id).first())
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    index_names = parse_index_names(indices)
+    jobs = []
+    for file in files:
+        if not is_supported_upload(file.filename):
+            jobs.append({"id": None, "filename": file.filename, "status": "rejected",
+                         "error": "Only .jpg, .jpeg, .tif and .tiff files are processed"})
+            continue
+
+        temp_filename = await spool_upload(file, directory=JOB_SPOOL_DIR)
+        try:
+            job = await run_io(enqueue_job, db, project_id, file.filename, temp_filename, index_names)
+        except Exception:
+            remove_files(temp_filename)
+            raise
+        jobs.append({"id": job.id, "filename": job.filename, "status": job.status})
+
+    notify_workers()
+    return {"jobs": jobs}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(ProcessingJob).filter(ProcessingJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
+
+
+@router.get("/projects/{project_id}/jobs")
+async def list_project_jobs(
+    project_id: int,
+    status: Optional[str] = Query(None, description="queued, running, succeeded, failed or skipped"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    statement = select(ProcessingJob).where(ProcessingJob.project_id == project_id)
+    if status:
+        statement = statement.where(ProcessingJob.status == status)
+    jobs, next_cursor = await paginate_query(
+        db, statement, ProcessingJob.created_at, ProcessingJob.id, cursor, limit
+    )
+    return page([serialize_job(job) for job in jobs], next_cursor)
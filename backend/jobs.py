@@ -0,0 +1,289 @@
+# backend/jobs.py
+"""Database-backed NDVI job queue.
+
+Jobs live in the processing_jobs table of the app database (Postgres in
+production, SQLite works too), so no external broker is needed. Workers
+run as asyncio tasks inside the API process (JOB_WORKERS > 0) or as
+standalone processes:  python -m backend.jobs
+"""
+import asyncio
+import os
+import traceback
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import uuid4
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal
+from backend.executors import run_io
+from backend.models import ProcessingJob
+from backend.ndvi_service import ProjectNotFound, process_uploaded_file, remove_files
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+# A running job whose worker hasn't renewed its lease within this time is handed to another worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+# How often a worker renews the lease of the job it is running
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "60"))
+# A failed job is queued again until it has been attempted this many times
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "job_spool")
+
+_wakeup = None
+_worker_tasks = []
+_stop = None
+
+
+def _claimable(now):
+    stale_before = now - timedelta(seconds=JOB_LEASE_SECONDS)
+    return or_(
+        ProcessingJob.status == "queued",
+        and_(ProcessingJob.status == "running", ProcessingJob.heartbeat_at < stale_before),
+    )
+
+
+def enqueue_job(db: Session, project_id: int, filename: str, input_path: str,
+                index_names: Optional[List[str]] = None) -> ProcessingJob:
+    job = ProcessingJob(
+        id=uuid4().hex,
+        project_id=project_id,
+        filename=filename,
+        input_path=input_path,
+        index_names=",".join(index_names) if index_names else None,
+        status="queued",
+        attempts=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def notify_workers():
+    """Wake idle in-process workers instead of waiting for the next poll."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[ProcessingJob]:
+    """Atomically move the oldest claimable job to running and return it.
+
+    The conditional UPDATE only succeeds for one worker, so this is safe
+    with many workers across processes on both Postgres and SQLite.
+    """
+    now = datetime.utcnow()
+    candidate = (
+        db.query(ProcessingJob.id)
+        .filter(_claimable(now))
+        .order_by(ProcessingJob.created_at)
+        .first()
+    )
+    if candidate is None:
+        return None
+
+    claimed = (
+        db.query(ProcessingJob)
+        .filter(ProcessingJob.id == candidate.id, _claimable(now))
+        .update(
+            {
+                ProcessingJob.status: "running",
+                ProcessingJob.worker_id: worker_id,
+                ProcessingJob.started_at: now,
+                ProcessingJob.heartbeat_at: now,
+                ProcessingJob.attempts: ProcessingJob.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not claimed:
+        return None
+    return db.get(ProcessingJob, candidate.id)
+
+
+def _update_owned(db: Session, job_id: str, worker_id: str, values: dict) -> bool:
+    # Only the worker holding the lease may touch a running job; a stale worker's update matches nothing
+    updated = (
+        db.query(ProcessingJob)
+        .filter(
+            ProcessingJob.id == job_id,
+            ProcessingJob.worker_id == worker_id,
+            ProcessingJob.status == "running",
+        )
+        .update(values, synchronize_session=False)
+    )
+    db.commit()
+    return bool(updated)
+
+
+def renew_lease(db: Session, job_id: str, worker_id: str) -> bool:
+    """Extend the lease of a running job; False once another worker has taken it over."""
+    return _update_owned(db, job_id, worker_id, {ProcessingJob.heartbeat_at: datetime.utcnow()})
+
+
+def finish_job(db: Session, job_id: str, worker_id: str, status: str, result=None, error=None,
+               timings=None) -> bool:
+    """Record the outcome of a job `worker_id` still holds; False if its lease was lost."""
+    return _update_owned(db, job_id, worker_id, {
+        ProcessingJob.status: status,
+        ProcessingJob.result: result,
+        ProcessingJob.result_id: result.get("id") if result else None,
+        ProcessingJob.error: error,
+        ProcessingJob.stage_timings: timings,
+        ProcessingJob.finished_at: datetime.utcnow(),
+    })
+
+
+def requeue_job(db: Session, job_id: str, worker_id: str, error=None, timings=None) -> bool:
+    """Put a failed attempt back in the queue, keeping its error until the next attempt finishes."""
+    return _update_owned(db, job_id, worker_id, {
+        ProcessingJob.status: "queued",
+        ProcessingJob.worker_id: None,
+        ProcessingJob.error: error,
+        ProcessingJob.stage_timings: timings,
+    })
+
+
+def _renew_lease_in_session(job_id: str, worker_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        return renew_lease(db, job_id, worker_id)
+    finally:
+        db.close()
+
+
+async def _keep_lease(job_id: str, worker_id: str):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            if not await run_io(_renew_lease_in_session, job_id, worker_id):
+                print(f"Job {job_id}: lease lost to another worker")
+                return
+        except Exception:
+            traceback.print_exc()
+
+
+async def run_job(db: Session, job: ProcessingJob):
+    timings = {}
+    job_id, worker_id, attempts = job.id, job.worker_id, job.attempts
+    input_path, project_id, filename = job.input_path, job.project_id, job.filename
+    index_names = job.index_names.split(",") if job.index_names else None
+    if attempts > JOB_MAX_ATTEMPTS:
+        # Its last attempt died without finishing (the lease ran out)
+        error = f"Gave up after {attempts - 1} attempts"
+        if await run_io(finish_job, db, job_id, worker_id, "failed", error=error):
+            remove_files(input_path)
+        return
+
+    # End the claim's read transaction so the connection isn't held while the file is processed
+    await run_io(db.rollback)
+
+    heartbeat = asyncio.create_task(_keep_lease(job_id, worker_id))
+    try:
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Spooled upload missing: {input_path}")
+        # The spooled input is kept until the job is finished for good, so a retry can read it
+        result = await process_uploaded_file(
+            project_id, filename, input_path, index_names, timings=timings, keep_input=True
+        )
+    except Exception as e:
+        traceback.print_exc()
+        heartbeat.cancel()
+        await run_io(db.rollback)
+        retryable = not isinstance(e, (FileNotFoundError, ProjectNotFound))
+        if retryable and attempts < JOB_MAX_ATTEMPTS:
+            await run_io(requeue_job, db, job_id, worker_id, error=str(e), timings=timings)
+        elif await run_io(finish_job, db, job_id, worker_id, "failed", error=str(e), timings=timings):
+            remove_files(input_path)
+        return
+    finally:
+        heartbeat.cancel()
+
+    status = "succeeded" if result is not None else "skipped"
+    if await run_io(finish_job, db, job_id, worker_id, status, result=result, timings=timings):
+        remove_files(input_path)
+
+
+async def worker_loop(worker_id: str, stop: asyncio.Event):
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+
+    while not stop.is_set():
+        # Cleared before claiming so an enqueue during the claim still wakes us
+        _wakeup.clear()
+        db = SessionLocal()
+        try:
+            job = await run_io(claim_next_job, db, worker_id)
+            if job is not None:
+                await run_job(db, job)
+                continue
+        except Exception:
+            traceback.print_exc()
+        finally:
+            db.close()
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_job_workers(count: int = JOB_WORKERS):
+    global _stop
+    os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+    _stop = asyncio.Event()
+    prefix = f"{os.getpid()}-{uuid4().hex[:6]}"
+    for index in range(count):
+        _worker_tasks.append(asyncio.create_task(worker_loop(f"{prefix}-{index}", _stop)))
+
+
+async def stop_job_workers():
+    if _stop is not None:
+        _stop.set()
+        notify_workers()
+    if _worker_tasks:
+        await asyncio.gather(*_worker_tasks, return_exceptions=True)
+        _worker_tasks.clear()
+
+
+def serialize_job(job: ProcessingJob) -> dict:
+    queue_wait = None
+    run_time = None
+    if job.started_at and job.created_at:
+        queue_wait = (job.started_at - job.created_at).total_seconds()
+    if job.finished_at and job.started_at:
+        run_time = (job.finished_at - job.started_at).total_seconds()
+
+    return {
+        "id": job.id,
+        "project_id": job.project_id,
+        "filename": job.filename,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "result_id": job.result_id,
+        "result": job.result,
+        "stage_timings": job.stage_timings or {},
+        "queue_wait_seconds": queue_wait,
+        "run_seconds": run_time,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+async def _run_standalone(count: int):
+    start_job_workers(count)
+    try:
+        await asyncio.gather(*_worker_tasks)
+    finally:
+        await stop_job_workers()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run_standalone(max(JOB_WORKERS, 1)))
@@ -1,45 +1,219 @@
-import os
+# backend/mars_client.py
+"""Client for the MARS advisor graph (LangGraph).
+
+`run_mars_insights(payload)` goes through one shared InsightsService:
+  - results are cached by a hash of the payload (same image_key and
+    coordinates → same answer), for MARS_CACHE_TTL seconds; answers carry
+    current weather, so the TTL is short and live callers pass
+    use_cache=False;
+  - concurrent calls with the same payload share one in-flight request;
+  - each run is a single stateless `runs.wait` call (no thread to create
+    and join);
+  - if the graph accepts a list input (MARS_BATCH_INPUT_KEY), calls that
+    arrive within MARS_BATCH_WINDOW_MS are sent as one run; if that run
+    fails, each payload is retried on its own so one bad payload only fails
+    its own caller;
+  - network errors, 429s and 5xx responses are retried with exponential
+    backoff plus jitter; anything else fails straight away.
+"""
 import asyncio
-from langgraph_sdk import get_client
-from tenacity import retry, stop_after_attempt, wait_fixed, RetryError
+import hashlib
+import json
 import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+from langgraph_sdk import get_client
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# Initialize LangGraph client
-client = get_client(
-    url="https://ht-vacant-providence-60-b70b203b735b596eac574071f7251ad0.us.langgraph.app",
-    api_key=os.getenv("LANGGRAPH_API_KEY"),
-)
 
+MARS_URL = os.getenv("MARS_URL", "https://ht-vacant-providence-60-b70b203b735b596eac574071f7251ad0.us.langgraph.app")
+MARS_GRAPH = os.getenv("MARS_GRAPH", "advisor")
+MARS_CACHE_SIZE = int(os.getenv("MARS_CACHE_SIZE", "1024"))
+# Answers include the current weather, so they are only reused briefly
+MARS_CACHE_TTL = float(os.getenv("MARS_CACHE_TTL", "900"))
+MARS_MAX_ATTEMPTS = int(os.getenv("MARS_MAX_ATTEMPTS", "4"))
+MARS_BACKOFF_INITIAL = float(os.getenv("MARS_BACKOFF_INITIAL", "1"))
+MARS_BACKOFF_MAX = float(os.getenv("MARS_BACKOFF_MAX", "30"))
+# Input key under which the graph accepts a list of payloads (and returns a list
+# of results under the same key); unset means one run per payload
+MARS_BATCH_INPUT_KEY = os.getenv("MARS_BATCH_INPUT_KEY") or None
+MARS_BATCH_WINDOW_MS = float(os.getenv("MARS_BATCH_WINDOW_MS", "50"))
+MARS_MAX_BATCH = int(os.getenv("MARS_MAX_BATCH", "8"))
+
+
+def payload_key(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _is_retryable(error: BaseException) -> bool:
+    # Client errors (bad payload, auth) and bugs won't succeed on a retry; rate limits, server errors and
+    # dropped connections may
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class InsightsService:
+    """Pass `client` (a LangGraphClient) to talk to something other than MARS_URL, e.g. the fake server."""
+
+    def __init__(self, url=MARS_URL, graph=MARS_GRAPH, api_key=None, client=None, cache_size=MARS_CACHE_SIZE,
+                 cache_ttl=MARS_CACHE_TTL, batch_input_key=MARS_BATCH_INPUT_KEY,
+                 batch_window_ms=MARS_BATCH_WINDOW_MS, max_batch=MARS_MAX_BATCH, max_attempts=MARS_MAX_ATTEMPTS):
+        self.url = url
+        self.graph = graph
+        self.api_key = api_key if api_key is not None else os.getenv("LANGGRAPH_API_KEY")
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.batch_input_key = batch_input_key
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+
+        self._client = client
+        self._cache = OrderedDict()
+        self._in_flight = {}
+        self._pending = []
+        self._flush_task = None
+        self.runs = 0
+        self.cache_hits = 0
+        self.deduplicated = 0
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-async def run_mars_insights(payload: dict):
-    try:
-        logger.info("Starting new MARS thread...")
-        thread = await client.threads.create()
-        graph_name = "advisor"
+    def _get_client(self):
+        if self._client is None:
+            self._client = get_client(url=self.url, api_key=self.api_key)
+        return self._client
 
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.cache_ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return result
+
+    def _remember(self, key, result):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = (time.monotonic(), result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def stats(self):
+        return {"runs": self.runs, "cache_hits": self.cache_hits, "deduplicated": self.deduplicated,
+                "cached": len(self._cache), "in_flight": len(self._in_flight)}
+
+    async def _with_retries(self, call):
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_exponential_jitter(initial=MARS_BACKOFF_INITIAL, max=MARS_BACKOFF_MAX),
+            retry=retry_if_exception(_is_retryable),
+            reraise=True,
+        ):
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    logger.info("Retrying MARS run (attempt %d)", attempt.retry_state.attempt_number)
+                self.runs += 1
+                return await call()
+
+    async def _run_one(self, payload):
         logger.info("Running graph with payload: %s", payload)
-        run = await client.runs.create(
-            thread["thread_id"],
-            graph_name,
-            input=payload,
+        return await self._with_retries(
+            lambda: self._get_client().runs.wait(None, self.graph, input=payload)
+        )
+
+    async def _run_batch(self, payloads):
+        logger.info("Running graph with a batch of %d payloads", len(payloads))
+        output = await self._with_retries(
+            lambda: self._get_client().runs.wait(None, self.graph, input={self.batch_input_key: payloads})
         )
+        results = output.get(self.batch_input_key) if isinstance(output, dict) else None
+        if not isinstance(results, list) or len(results) != len(payloads):
+            raise ValueError(f"MARS batch output has no list of {len(payloads)} results under '{self.batch_input_key}'")
+        return results
+
+    async def _flush(self):
+        await asyncio.sleep(self.batch_window)
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        self._flush_task = asyncio.ensure_future(self._flush()) if self._pending else None
+
+        payloads = [payload for payload, _ in batch]
+        if len(batch) > 1:
+            try:
+                results = await self._run_batch(payloads)
+            except Exception as e:
+                logger.warning("MARS batch of %d failed (%s); running each payload on its own", len(batch), e)
+                results = await asyncio.gather(*(self._run_one(payload) for payload in payloads),
+                                               return_exceptions=True)
+        else:
+            results = await asyncio.gather(self._run_one(payloads[0]), return_exceptions=True)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
 
-        logger.info("Waiting for run to complete...")
-        result = await client.runs.join(thread["thread_id"], run["run_id"])
+    async def _run(self, payload):
+        if not self.batch_input_key:
+            return await self._run_one(payload)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((payload, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+        return await future
 
-        # logger.info("Fetching final result...")
-        # result = await client.runs.get(thread["thread_id"], run["run_id"])
+    async def get(self, payload: dict, use_cache: bool = True):
+        """MARS result for the payload: cached, joined to an identical in-flight call, or a new run.
 
+        With `use_cache=False` the cache is neither read nor written; identical
+        in-flight calls are still shared.
+        """
+        key = payload_key(payload)
+        result = self._cached(key) if use_cache else None
+        if result is not None:
+            self.cache_hits += 1
+            return result
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(in_flight)
+
+        task = asyncio.ensure_future(self._run(payload))
+        self._in_flight[key] = task
+        try:
+            result = await asyncio.shield(task)
+        except Exception as e:
+            logger.error("Error running MARS insights: %s", str(e))
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+        if use_cache:
+            self._remember(key, result)
         logger.info("Successfully got MARS result.")
         return result
 
-    except Exception as e:
-        logger.error("Error running MARS insights: %s", str(e))
-        raise
+
+insights_service = InsightsService()
 
 
+async def run_mars_insights(payload: dict, service: Optional[InsightsService] = None, use_cache: bool = True):
+    return await (service or insights_service).get(payload, use_cache=use_cache)
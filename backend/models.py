@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Float, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Float, Integer, BigInteger, String, DateTime, ForeignKey, Index, JSON, UniqueConstraint
 from geoalchemy2 import Geometry
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -15,6 +15,9 @@ class UploadedFile(Base):
     s3_url = Column(String)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Keyset pagination: newest first by (uploaded_at, id)
+    __table_args__ = (Index("ix_uploaded_files_uploaded_at_id", uploaded_at.desc(), id.desc()),)
+
 
 class Project(Base):
     __tablename__ = "projects"
@@ -26,6 +29,9 @@ class Project(Base):
     longitude = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
     ndvi_results = relationship("NDVIResult", back_populates="project")
+    fields = relationship("Field", back_populates="project")
+
+    __table_args__ = (Index("ix_projects_created_at_id", created_at.desc(), id.desc()),)
 
 
 class NDVIResult(Base):
@@ -36,13 +42,147 @@ class NDVIResult(Base):
     s3_url = Column(String, nullable=False)             
     original_url = Column(String, nullable=False)       
     tiff_url = Column(String, nullable=True)             
+    thumbnail_url = Column(String, nullable=True)
+    ndvi_thumbnail_url = Column(String, nullable=True)
+    ndvi_cog_url = Column(String, nullable=True)  # tiled NDVI COG with overviews
 
     ndvi_min = Column(Float)
     ndvi_max = Column(Float)
     ndvi_mean = Column(Float)
+    ndvi_std = Column(Float)
+    ndvi_p2 = Column(Float)
+    ndvi_median = Column(Float)
+    ndvi_p98 = Column(Float)
+
+    healthy_percentage = Column(Float)
+    stressed_percentage = Column(Float)
+    unhealthy_percentage = Column(Float)
 
-    raster_extent = Column(Geometry("POLYGON"))
+    raster_extent = Column(Geometry("POLYGON", srid=4326))  # lon/lat footprint, GiST-indexed
     timestamp = Column(DateTime)
     project_id = Column(Integer, ForeignKey("projects.id"))
+
+    # SHA-256 of the uploaded bytes only; with a matching pipeline_version, identical re-uploads reuse this row's artifacts
+    content_hash = Column(String, nullable=True, index=True)
+    pipeline_version = Column(String, nullable=True)
     
-    project = relationship("Project", back_populates="ndvi_results")
\ No newline at end of file
+    project = relationship("Project", back_populates="ndvi_results")
+
+    __table_args__ = (
+        Index("ix_ndvi_results_project_timestamp_id", project_id, timestamp.desc(), id.desc()),
+        Index("ix_ndvi_results_timestamp_id", timestamp.desc(), id.desc()),
+    )
+
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+
+    id = Column(String, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    filename = Column(String, nullable=False)
+    input_path = Column(String, nullable=False)
+    index_names = Column(String, nullable=True)
+
+    # queued -> running -> succeeded | failed | skipped
+    status = Column(String, nullable=False, default="queued", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+
+    result_id = Column(Integer, ForeignKey("ndvi_results.id"), nullable=True)
+    result = Column(JSON, nullable=True)
+    stage_timings = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    # Renewed by the running worker; a job whose heartbeat is older than the lease is reclaimed
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_processing_jobs_project_created_at_id", project_id, created_at.desc(), id.desc()),)
+
+
+class StoredArtifact(Base):
+    __tablename__ = "stored_artifacts"
+    __table_args__ = (UniqueConstraint("content_hash", "kind", name="uq_stored_artifacts_hash_kind"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, nullable=False, index=True)
+    kind = Column(String, nullable=False)
+    s3_key = Column(String, nullable=False)
+    s3_url = Column(String, nullable=False)
+    size_bytes = Column(BigInteger)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Field(Base):
+    __tablename__ = "fields"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    boundary = Column(Geometry("MULTIPOLYGON", srid=4326), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    project = relationship("Project", back_populates="fields")
+
+    __table_args__ = (Index("ix_fields_project_created_at_id", project_id, created_at.desc(), id.desc()),)
+
+
+class FieldStats(Base):
+    """NDVI statistics of one field within one NDVI result, computed once and reused by dashboards."""
+    __tablename__ = "field_stats"
+    __table_args__ = (UniqueConstraint("field_id", "result_id", name="uq_field_stats_field_result"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    field_id = Column(Integer, ForeignKey("fields.id", ondelete="CASCADE"), nullable=False, index=True)
+    result_id = Column(Integer, ForeignKey("ndvi_results.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    ndvi_min = Column(Float)
+    ndvi_max = Column(Float)
+    ndvi_mean = Column(Float)
+    ndvi_std = Column(Float)
+    ndvi_p2 = Column(Float)
+    ndvi_median = Column(Float)
+    ndvi_p98 = Column(Float)
+
+    healthy_percentage = Column(Float)
+    stressed_percentage = Column(Float)
+    unhealthy_percentage = Column(Float)
+
+    pixel_count = Column(BigInteger)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class GeocodeCacheEntry(Base):
+    """Geocoder answer per normalized location string; NULL coordinates mean "no match"."""
+    __tablename__ = "geocode_cache"
+
+    location_key = Column(String, primary_key=True)
+    query = Column(String, nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    provider = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class NDVIInsight(Base):
+    """MARS advisory for an NDVI result, filled in by the enrichment workers after the upload returns."""
+    __tablename__ = "ndvi_insights"
+
+    id = Column(Integer, primary_key=True, index=True)
+    result_id = Column(Integer, ForeignKey("ndvi_results.id", ondelete="CASCADE"), nullable=False, unique=True)
+    image_key = Column(String, nullable=False)
+
+    # pending -> running -> succeeded | failed (or back to pending until retry_at while attempts remain)
+    status = Column(String, nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True)
+    payload = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    retry_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
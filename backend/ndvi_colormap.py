@@ -0,0 +1,47 @@
+# backend/ndvi_colormap.py
+import numpy as np
+from backend.ndvi_stats import HEALTHY_THRESHOLD, STRESSED_THRESHOLD
+
+
+# Red → yellow → green, with the yellow/green break on the health thresholds
+NDVI_COLOR_STOPS = (
+    (-1.0, (128, 0, 38)),
+    (0.0, (215, 48, 39)),
+    (STRESSED_THRESHOLD, (254, 224, 139)),
+    ((STRESSED_THRESHOLD + HEALTHY_THRESHOLD) / 2, (217, 239, 139)),
+    (HEALTHY_THRESHOLD, (102, 189, 99)),
+    (1.0, (0, 104, 55)),
+)
+
+LUT_SIZE = 256
+# Part of tile ETags and cache paths; bump when the stops change
+COLORMAP_VERSION = "rdylgn-1"
+
+
+def build_lut(stops=NDVI_COLOR_STOPS, size=LUT_SIZE):
+    """(size, 4) uint8 RGBA table spanning NDVI -1..1."""
+    positions = np.array([value for value, _ in stops])
+    colors = np.array([color for _, color in stops], dtype=np.float64)
+    samples = np.linspace(-1.0, 1.0, size)
+    lut = np.empty((size, 4), dtype=np.uint8)
+    for channel in range(3):
+        lut[:, channel] = np.rint(np.interp(samples, positions, colors[:, channel]))
+    lut[:, 3] = 255
+    return lut
+
+
+NDVI_LUT = build_lut()
+
+
+def colorize(values, vmin=-1.0, vmax=1.0, lut=NDVI_LUT):
+    """Map a float array to RGBA through the LUT; NaN pixels come out fully transparent.
+
+    vmin/vmax stretch the LUT over a narrower range than the full -1..1.
+    """
+    finite = np.isfinite(values)
+    span = max(vmax - vmin, 1e-6)
+    scaled = (np.where(finite, values, vmin) - vmin) * ((len(lut) - 1) / span)
+    indexes = np.clip(scaled, 0, len(lut) - 1).astype(np.intp)
+    rgba = lut[indexes]
+    rgba[~finite, 3] = 0
+    return rgba
@@ -0,0 +1,103 @@
+# backend/ndvi_kernels.py
+import os
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+NDVI_EPSILON = 1e-10
+
+# Kernel used when no name is passed; override with NDVI_KERNEL=numexpr|numba
+DEFAULT_KERNEL = os.getenv("NDVI_KERNEL", "numpy")
+
+_KERNELS = {}
+
+
+def register_kernel(name):
+    """Register an NDVI kernel: kernel(nir, red, out=None) -> float32 array."""
+    def decorator(func):
+        _KERNELS[name] = func
+        return func
+    return decorator
+
+
+def available_kernels():
+    return list(_KERNELS)
+
+
+def get_kernel(name=None):
+    """Look up a kernel by name, falling back to NumPy if the backend isn't installed."""
+    name = name or DEFAULT_KERNEL
+    if name not in _KERNELS:
+        print(f"NDVI kernel '{name}' unavailable, using numpy")
+        name = "numpy"
+    return _KERNELS[name]
+
+
+def _as_float32(band):
+    return band.astype(np.float32, copy=False)
+
+
+def _output_for(nir, out):
+    if out is None:
+        return np.empty(nir.shape, dtype=np.float32)
+    return out
+
+
+@register_kernel("numpy")
+def ndvi_numpy(nir, red, out=None):
+    """Pure NumPy float32 NDVI with a single temporary (the denominator).
+
+    `out` may alias `nir` to compute the result in place.
+    """
+    denominator = np.add(nir, red, dtype=np.float32)
+    denominator += np.float32(NDVI_EPSILON)
+    out = _output_for(nir, out)
+    np.subtract(nir, red, out=out, dtype=np.float32)
+    out /= denominator
+    return out
+
+
+if numexpr is not None:
+    @register_kernel("numexpr")
+    def ndvi_numexpr(nir, red, out=None):
+        """Multi-threaded, blocked evaluation with no full-size temporaries."""
+        out = _output_for(nir, out)
+        numexpr.evaluate(
+            "(nir - red) / (nir + red + eps)",
+            local_dict={
+                "nir": _as_float32(nir),
+                "red": _as_float32(red),
+                "eps": np.float32(NDVI_EPSILON),
+            },
+            out=out,
+            casting="same_kind",
+        )
+        return out
+
+
+if numba is not None:
+    # No fastmath: its nnan/ninf flags would let LLVM assume away the NaN/inf nodata pixels carry
+    @numba.njit(parallel=True, cache=True)
+    def _ndvi_numba_2d(nir, red, out):
+        eps = np.float32(NDVI_EPSILON)
+        for row in numba.prange(nir.shape[0]):
+            for col in range(nir.shape[1]):
+                n = np.float32(nir[row, col])
+                r = np.float32(red[row, col])
+                out[row, col] = (n - r) / (n + r + eps)
+
+    @register_kernel("numba")
+    def ndvi_numba(nir, red, out=None):
+        """JIT-compiled parallel loop; expects 2D bands."""
+        out = _output_for(nir, out)
+        _ndvi_numba_2d(nir, red, out)
+        return out
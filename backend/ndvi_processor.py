@@ -2,12 +2,19 @@ import os
 import numpy as np
 import rasterio
 from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window
 from skimage.filters import gaussian
+from scipy.ndimage import gaussian_filter1d
 from shapely.geometry import box
 import traceback
-from PIL import Image
-import tifffile as tiff
+from dataclasses import dataclass
 from urllib.parse import urlparse
+from backend.cog_writer import COG_TILE_SIZE, COGWriter
+from backend.coregistration import align_to_reference
+from backend.ndvi_kernels import get_kernel
+from backend.ndvi_stats import NDVIStatsAccumulator
+from backend.previews import render_ndvi_previews, render_rgb_previews
 
 
 def read_multispectral_image(image_path):
@@ -17,62 +24,173 @@ def read_multispectral_image(image_path):
     return image, meta
 
 
-def align_images(ref_image, target_image):
-    # Placeholder: assume pre-aligned
-    return target_image
+@dataclass
+class RasterContext:
+    """A raster decoded once and shared by every stage of the pipeline."""
+    path: str
+    image: np.ndarray
+    meta: dict
+    bounds: rasterio.coords.BoundingBox
+
+    @property
+    def transform(self):
+        return self.meta["transform"]
+
+    @property
+    def crs(self):
+        return self.meta["crs"]
+
+
+def load_raster_context(image_path):
+    with rasterio.open(image_path) as src:
+        return RasterContext(
+            path=image_path,
+            image=src.read(),
+            meta=src.meta.copy(),
+            bounds=src.bounds,
+        )
+
+
+def align_images(ref_image, target_image, band_index=None, cache_key=None):
+    """Co-register `target_image` onto the reference pixel grid (pyramid phase correlation).
+
+    The estimated shift is cached per (reference, target) pair, see backend.coregistration.
+    """
+    if target_image is ref_image:
+        return target_image
+    return align_to_reference(ref_image, target_image, band_index=band_index, cache_key=cache_key)
 
 
 def reduce_noise(image, sigma=1):
     return gaussian(image, sigma=sigma, channel_axis=0)
 
 
-def compute_ndvi(image, nir_index, red_index):
-    nir = image[nir_index].astype(float)
-    red = image[red_index].astype(float)
-    ndvi = (nir - red) / (nir + red + 1e-10)
-    return ndvi
+def smooth_band_inplace(band, sigma=1, truncate=4.0):
+    """Separable Gaussian over a 2D float32 band, written back into `band`.
 
+    Same kernel and edge handling as skimage's gaussian (mode="nearest").
+    """
+    if not sigma:
+        return band
+    gaussian_filter1d(band, sigma, axis=0, mode="nearest", truncate=truncate, output=band)
+    gaussian_filter1d(band, sigma, axis=1, mode="nearest", truncate=truncate, output=band)
+    return band
 
-def save_ndvi_as_tiff(ndvi_image, reference_image_path, output_folder="output", filename="ndvi_output.tiff"):
-    os.makedirs(output_folder, exist_ok=True)
-    with rasterio.open(reference_image_path) as src:
-        meta = src.meta.copy()
-        transform = src.transform
-        crs = src.crs
-        bounds = src.bounds
 
-    meta.update({
-        "count": 1,
-        "dtype": "float32",
-        "nodata": -9999,
-    })
+def valid_pixels(bands, nodata=None):
+    """Pixels that are finite and not `nodata` in every band, or None if all are valid."""
+    valid = np.ones(bands[0].shape, dtype=bool)
+    for band in bands:
+        if np.issubdtype(band.dtype, np.floating):
+            valid &= np.isfinite(band)
+        if nodata is not None and not np.isnan(nodata):
+            valid &= band != nodata
+    return None if valid.all() else valid
+
+
+def smooth_band_masked(band, valid, sigma=1, truncate=4.0):
+    """smooth_band_inplace that ignores pixels outside `valid` and sets them to NaN.
+
+    Normalized convolution: the zero-filled band and the mask are smoothed
+    separately and divided, so values next to a nodata edge are averaged
+    over valid neighbours only instead of being pulled towards the fill.
+    """
+    if valid is None:
+        return smooth_band_inplace(band, sigma, truncate)
+    band[~valid] = 0
+    if sigma:
+        weight = smooth_band_inplace(valid.astype(np.float32), sigma, truncate)
+        smooth_band_inplace(band, sigma, truncate)
+        np.divide(band, weight, out=band, where=weight > 0)
+    band[~valid] = np.nan
+    return band
+
+
+def denoise_bands(image, band_indexes, sigma=1, nodata=None):
+    """Smooth only `band_indexes` of a (bands, H, W) stack.
+
+    Returns a float32 (len(band_indexes), H, W) stack in the requested order;
+    the other bands are never copied or filtered. Pixels that are `nodata`
+    (or non-finite) in any of the bands come back as NaN.
+    """
+    valid = valid_pixels([image[band_index] for band_index in band_indexes], nodata)
+    stack = np.empty((len(band_indexes),) + image.shape[1:], dtype=np.float32)
+    for out_index, band_index in enumerate(band_indexes):
+        stack[out_index] = image[band_index]
+        smooth_band_masked(stack[out_index], valid, sigma)
+    return stack
+
+
+def compute_ndvi(image, nir_index, red_index, kernel=None):
+    """float32 NDVI of two bands using the selected kernel (see ndvi_kernels)."""
+    return get_kernel(kernel)(image[nir_index], image[red_index])
+
 
+def compute_ndvi_denoised(image, nir_index, red_index, sigma=1, kernel=None, nodata=None):
+    """Denoise NIR and red and compute NDVI in one fused float32 pass.
+
+    The NIR buffer is reused for the result, so the only allocations are
+    the two smoothed bands and whatever the kernel needs. Pixels that are
+    `nodata` (or non-finite) in either band are NaN in the result.
+    """
+    valid = valid_pixels([image[nir_index], image[red_index]], nodata)
+    nir = smooth_band_masked(image[nir_index].astype(np.float32), valid, sigma)
+    red = smooth_band_masked(image[red_index].astype(np.float32), valid, sigma)
+    ndvi = get_kernel(kernel)(nir, red, out=nir)
+    if valid is not None:
+        ndvi[~valid] = np.nan
+    return ndvi
+
+
+def save_ndvi_as_tiff(ndvi_image, reference_image_path, output_folder="output", filename="ndvi_output.tiff",
+                      context=None):
+    """Write an in-memory NDVI array as a tiled, compressed COG with overviews."""
+    if context is None:
+        context = load_raster_context(reference_image_path)
+    meta = context.meta
     output_path = os.path.join(output_folder, filename)
 
-    with rasterio.open(output_path, "w", **meta) as dst:
-        dst.write(ndvi_image.astype("float32"), 1)
+    with COGWriter(output_path, meta["width"], meta["height"], meta["crs"], meta["transform"]) as dst:
+        dst.write(ndvi_image)
 
-    return output_path, bounds
+    return output_path, context.bounds
 
 
-def get_ndvi_stats(ndvi):
-    valid_ndvi = ndvi[np.isfinite(ndvi)]
-    return {
-        "min": float(np.min(valid_ndvi)),
-        "max": float(np.max(valid_ndvi)),
-        "mean": float(np.mean(valid_ndvi)),
-    }
+def get_ndvi_stats(ndvi, **accumulator_options):
+    """min/max/mean/std, histogram percentiles and health-class percentages in one pass."""
+    return NDVIStatsAccumulator(**accumulator_options).update(ndvi).result()
+
+def process_ndvi_pipeline(ref_image_path, target_image_path, nir_band_index, red_band_index, context=None,
+                          fuse_denoise=True, output_filename="ndvi_output.tiff"):
+    """Run align → denoise → NDVI → save → stats, decoding each distinct input once.
 
-def process_ndvi_pipeline(ref_image_path, target_image_path, nir_band_index, red_band_index):
+    `context` may be a RasterContext already loaded for `ref_image_path`.
+    Only the NIR and red bands are denoised; with `fuse_denoise` the filter
+    runs inside the NDVI computation instead of as a separate stage.
+    The returned dict carries the reference context and the NDVI array so
+    callers can render previews without decoding the files again.
+    """
     try:
-        ref_image, ref_meta = read_multispectral_image(ref_image_path)
-        target_image, _ = read_multispectral_image(target_image_path)
+        if context is not None and context.path == ref_image_path:
+            ref_context = context
+        else:
+            ref_context = load_raster_context(ref_image_path)
+        if target_image_path == ref_image_path:
+            target_context = ref_context
+        else:
+            target_context = load_raster_context(target_image_path)
 
-        aligned_img = align_images(ref_image, target_image)
-        noise_reduced_img = reduce_noise(aligned_img)
-        ndvi_final = compute_ndvi(noise_reduced_img, nir_band_index, red_band_index)
+        aligned_img = align_images(ref_context.image, target_context.image, band_index=nir_band_index)
+        nodata = target_context.meta.get("nodata")
+        if fuse_denoise:
+            ndvi_final = compute_ndvi_denoised(aligned_img, nir_band_index, red_band_index, nodata=nodata)
+        else:
+            noise_reduced_bands = denoise_bands(aligned_img, [nir_band_index, red_band_index], nodata=nodata)
+            ndvi_final = compute_ndvi(noise_reduced_bands, 0, 1)
 
-        ndvi_output_path, bounds = save_ndvi_as_tiff(ndvi_final, ref_image_path)
+        ndvi_output_path, bounds = save_ndvi_as_tiff(
+            ndvi_final, ref_image_path, filename=output_filename, context=ref_context
+        )
         stats = get_ndvi_stats(ndvi_final)
 
         extent = box(bounds.left, bounds.bottom, bounds.right, bounds.top)
@@ -80,38 +198,179 @@ def process_ndvi_pipeline(ref_image_path, target_image_path, nir_band_index, red
         return {
             "ndvi_path": ndvi_output_path,
             "stats": stats,
-            "extent": extent
+            "extent": extent,
+            "ndvi": ndvi_final,
+            "context": ref_context,
         }
 
     except Exception as e:
         print("Error inside process_ndvi_pipeline:")
         traceback.print_exc()
         raise e  
-    
-def simple_tiff_to_jpeg(tiff_path, jpeg_path):
-    """Safely convert complex TIFF to JPEG using tifffile + PIL."""
-    # Read using tifffile
-    img_array = tiff.imread(tiff_path)
-
-    # Handle single-channel or multi-band TIFFs
-    if img_array.ndim == 2:
-        # Single-band (grayscale), duplicate into 3 channels
-        img_array = np.stack([img_array]*3, axis=-1)
-    elif img_array.shape[0] in [1, 3, 4]:  
-        # (bands, H, W) → (H, W, bands)
-        img_array = np.transpose(img_array, (1, 2, 0))
-
-    # Normalize for display if needed
-    if img_array.dtype != np.uint8:
-        img_array = ((img_array - np.min(img_array)) / (np.max(img_array) - np.min(img_array)) * 255).astype(np.uint8)
-
-    # Convert to PIL Image
-    img = Image.fromarray(img_array[..., :3])  # Use first 3 bands
-
-    img.save(jpeg_path, "JPEG", quality=95)
-
-    
+
+
+DEFAULT_TILE_SIZE = COG_TILE_SIZE
+
+
+def gaussian_halo(sigma, truncate=4.0):
+    """Pixels of context a Gaussian of this sigma reads on each side (matches scipy/skimage)."""
+    if not sigma:
+        return 0
+    return int(truncate * float(sigma) + 0.5)
+
+
+def iter_tile_windows(width, height, tile_size=DEFAULT_TILE_SIZE):
+    for row_off in range(0, height, tile_size):
+        for col_off in range(0, width, tile_size):
+            yield Window(
+                col_off,
+                row_off,
+                min(tile_size, width - col_off),
+                min(tile_size, height - row_off),
+            )
+
+
+def pad_window(window, halo, width, height):
+    """Grow a window by `halo` pixels on each side, clipped to the raster.
+
+    Returns the padded window and the (row, col) slices that cut the
+    original window back out of an array read with it.
+    """
+    col_start = max(0, window.col_off - halo)
+    row_start = max(0, window.row_off - halo)
+    col_stop = min(width, window.col_off + window.width + halo)
+    row_stop = min(height, window.row_off + window.height + halo)
+
+    padded = Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+    row_inner = window.row_off - row_start
+    col_inner = window.col_off - col_start
+    inner = (
+        slice(row_inner, row_inner + window.height),
+        slice(col_inner, col_inner + window.width),
+    )
+    return padded, inner
+
+
+def stream_ndvi_to_tiff(image_path, nir_band_index, red_band_index, output_folder="output",
+                        filename="ndvi_output.tiff", sigma=1, tile_size=DEFAULT_TILE_SIZE):
+    """Compute NDVI tile by tile and write each tile straight into the output COG.
+
+    Only the NIR and red bands are read, one window at a time, padded with a
+    halo wide enough for the Gaussian so tile seams match the in-memory
+    pipeline. Peak memory is bounded by `tile_size`, not by the scene.
+    Source nodata is masked the same way as in compute_ndvi_denoised.
+    """
+    output_path = os.path.join(output_folder, filename)
+    halo = gaussian_halo(sigma)
+    accumulator = NDVIStatsAccumulator()
+
+    with rasterio.open(image_path) as src:
+        bounds = src.bounds
+        band_indexes = [nir_band_index + 1, red_band_index + 1]
+
+        with COGWriter(output_path, src.width, src.height, src.crs, src.transform) as dst:
+            for window in iter_tile_windows(src.width, src.height, tile_size):
+                padded, inner = pad_window(window, halo, src.width, src.height)
+                bands = src.read(band_indexes, window=padded, out_dtype="float32")
+                valid = valid_pixels(bands, src.nodata)
+                for band in bands:
+                    smooth_band_masked(band, valid, sigma)
+
+                ndvi = compute_ndvi(bands[(slice(None),) + inner], 0, 1)
+                if valid is not None:
+                    ndvi[~valid[inner]] = np.nan
+                dst.write(ndvi, window=window)
+
+                accumulator.update(ndvi)
+
+    return output_path, bounds, accumulator.result()
+
+
+def process_ndvi_pipeline_streaming(image_path, nir_band_index, red_band_index, sigma=1,
+                                    tile_size=DEFAULT_TILE_SIZE, output_filename="ndvi_output.tiff"):
+    """Block-streaming variant of process_ndvi_pipeline for scenes too big to hold in memory.
+
+    Co-registration is skipped: the image is used as its own reference.
+    """
+    try:
+        ndvi_output_path, bounds, stats = stream_ndvi_to_tiff(
+            image_path, nir_band_index, red_band_index, filename=output_filename, sigma=sigma,
+            tile_size=tile_size
+        )
+        extent = box(bounds.left, bounds.bottom, bounds.right, bounds.top)
+
+        return {
+            "ndvi_path": ndvi_output_path,
+            "stats": stats,
+            "extent": extent
+        }
+
+    except Exception as e:
+        print("Error inside process_ndvi_pipeline_streaming:")
+        traceback.print_exc()
+        raise e
+
+
+# Inputs at or above this size go through the tile-streaming NDVI engine
+STREAMING_THRESHOLD_BYTES = int(os.getenv("NDVI_STREAMING_THRESHOLD_MB", "256")) * 1024 * 1024
+
+
+def extent_wgs84(raster_path):
+    """Footprint of a raster as a lon/lat box (EPSG:4326), matching the raster_extent column.
+
+    Rasters without a CRS are assumed to be in lon/lat already.
+    """
+    with rasterio.open(raster_path) as src:
+        bounds = tuple(src.bounds)
+        if src.crs is not None and src.crs.to_epsg() != 4326:
+            bounds = transform_bounds(src.crs, "EPSG:4326", *bounds, densify_pts=21)
+    return box(*bounds)
+
+
+def run_ndvi_stage(image_path, nir_band_index, red_band_index, preview_prefix, output_filename="ndvi_output.tiff",
+                   rgb_bands=None):
+    """All CPU-bound work for one uploaded TIFF: NDVI raster, stats and every preview size.
+
+    Meant to run in a worker process, so it takes paths and returns only
+    small picklable results (paths, stats dict, lon/lat extent polygon). Previews
+    are written as `{preview_prefix}_rgb_{size}.jpg` and `..._ndvi_{size}.jpg`.
+    """
+    if os.path.getsize(image_path) >= STREAMING_THRESHOLD_BYTES:
+        ndvi_result = process_ndvi_pipeline_streaming(
+            image_path, nir_band_index, red_band_index, output_filename=output_filename
+        )
+        rgb_previews = render_rgb_previews(f"{preview_prefix}_rgb", image_path=image_path, rgb_bands=rgb_bands)
+        ndvi_previews = render_ndvi_previews(f"{preview_prefix}_ndvi", ndvi_path=ndvi_result["ndvi_path"])
+    else:
+        ndvi_result = process_ndvi_pipeline(
+            ref_image_path=image_path,
+            target_image_path=image_path,
+            nir_band_index=nir_band_index,
+            red_band_index=red_band_index,
+            output_filename=output_filename,
+        )
+        context = ndvi_result["context"]
+        rgb_previews = render_rgb_previews(
+            f"{preview_prefix}_rgb", image=context.image, rgb_bands=rgb_bands, nodata=context.meta.get("nodata")
+        )
+        ndvi_previews = render_ndvi_previews(f"{preview_prefix}_ndvi", ndvi=ndvi_result["ndvi"])
+
+    return {
+        "ndvi_path": ndvi_result["ndvi_path"],
+        "stats": ndvi_result["stats"],
+        "extent": extent_wgs84(ndvi_result["ndvi_path"]),
+        "previews": {"rgb": rgb_previews, "ndvi": ndvi_previews},
+    }
+
+
 def extract_s3_key_from_url(url: str) -> str:
-    """Given a full S3 URL, extract the S3 object key"""
+    """Given a full S3 URL, extract the S3 object key.
+
+    Virtual-hosted AWS URLs carry the bucket in the host; path-style URLs
+    (AWS_S3_ENDPOINT_URL, e.g. MinIO) carry it as the first path segment.
+    """
     parsed = urlparse(url)
-    return parsed.path.lstrip("/")
+    path = parsed.path.lstrip("/")
+    if ".s3." in parsed.netloc or "/" not in path:
+        return path
+    return path.split("/", 1)[1]
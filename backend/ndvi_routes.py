@@ -1,421 +1,265 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from backend.file_upload import get_db
-from backend.models import UploadedFile, NDVIResult, Project
+from backend.database import get_async_db, get_db
+from backend.models import NDVIResult, Project
 import os
 from uuid import uuid4
-from backend.ndvi_processor import process_ndvi_pipeline, simple_tiff_to_jpeg, extract_s3_key_from_url
-from backend.s3_utils import upload_to_s3
-from geoalchemy2.shape import from_shape
-from shapely.geometry import box
-import rasterio
-from typing import List
+from backend.ndvi_processor import extract_s3_key_from_url
+from backend.executors import ExecutorBusy, run_io
+from backend.s3_utils import download_from_s3
+from backend.ndvi_service import (
+    MAX_UPLOAD_FAN_OUT,
+    compute_and_upload_change,
+    compute_and_upload_indices,
+    process_upload_batch,
+    remove_files,
+)
+from typing import List, Optional
 from backend.schemas import ProjectCreate, ProjectRead
 from datetime import datetime
-from opencage.geocoder import OpenCageGeocode
+from backend.geocoding import GeocoderUnavailable, geocoding_service
 from backend.mars_client import run_mars_insights
+from backend.insights import INSIGHT_MAX_WAIT, notify_insight_workers, queue_insight, serialize_insight, wait_for_insight
+from backend.tile_server import TILE_MAX_AGE, get_tile, is_valid_tile, tile_etag
+from backend.vegetation_indices import validate_indices
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page, paginate_query
+from backend.spatial_search import (
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    bbox_geometry,
+    parse_bbox,
+    point_geometry,
+    search_statement,
+)
 
 router = APIRouter()
 
+
+def parse_index_names(indices: Optional[str]) -> List[str]:
+    """Index names from the query string; a 400 up front if any can't be computed."""
+    if not indices:
+        return []
+    index_names = [name.strip() for name in indices.split(",") if name.strip()]
+    try:
+        validate_indices(index_names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return index_names
+
+
+def _percentage(value):
+    return round(value, 1) if value is not None else None
+
+
+def serialize_ndvi_summary(r):
+    """Dashboard shape for a stored NDVI result; stats come from the row, never the raster."""
+    return {
+        "id": r.id,
+        "date": r.timestamp.strftime("%B %d, %Y"),
+        "filename": r.filename,
+        "url": r.s3_url,
+        "originalUrl": r.original_url,
+        "thumbnailUrl": r.thumbnail_url,
+        "ndviThumbnailUrl": r.ndvi_thumbnail_url,
+        "ndviCogUrl": r.ndvi_cog_url,
+        "ndviMin": r.ndvi_min,
+        "ndviMax": r.ndvi_max,
+        "ndviMean": r.ndvi_mean,
+        "ndviStd": r.ndvi_std,
+        "ndviMedian": r.ndvi_median,
+        "healthyPercentage": _percentage(r.healthy_percentage),
+        "stressedPercentage": _percentage(r.stressed_percentage),
+        "unhealthyPercentage": _percentage(r.unhealthy_percentage),
+    }
+
+
 @router.get("/ndvi-data")
-def get_ndvi_data(db: Session = Depends(get_db)):
-    images = db.query(UploadedFile).order_by(UploadedFile.uploaded_at.desc()).all()
-    return [
-        {
-            "id": img.id,
-            "date": img.uploaded_at.strftime("%B %d, %Y"),
-            "filename": img.filename,
-            "url": img.s3_url,
-            "ndviMin": -0.2,  # You can replace with real values if computed
-            "ndviMax": 0.8,
-            "ndviMean": 0.45,
-            "healthyPercentage": 65,
-            "stressedPercentage": 25,
-            "unhealthyPercentage": 10,
-        }
-        for img in images
-    ]
+async def get_ndvi_data(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    results, next_cursor = await paginate_query(
+        db, select(NDVIResult), NDVIResult.timestamp, NDVIResult.id, cursor, limit
+    )
+    return page([serialize_ndvi_summary(r) for r in results], next_cursor)
+
+
+@router.get("/ndvi/search/bbox")
+async def search_ndvi_by_bbox(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat (EPSG:4326)"),
+    project_id: Optional[int] = Query(None),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """NDVI results whose raster extent intersects the box, newest first."""
+    try:
+        geometry = bbox_geometry(*parse_bbox(bbox))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = await db.scalars(search_statement(geometry, project_id, limit))
+    return [serialize_ndvi_summary(r) for r in results]
+
+
+@router.get("/ndvi/search/point")
+async def search_ndvi_by_point(
+    lon: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    project_id: Optional[int] = Query(None),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """NDVI results whose raster extent contains the point, newest first."""
+    results = await db.scalars(search_statement(point_geometry(lon, lat), project_id, limit))
+    return [serialize_ndvi_summary(r) for r in results]
 
 
 @router.post("/projects/{project_id}/ndvi-process")
 async def process_ndvi(
     project_id: int,
     files: List[UploadFile] = File(...),
+    indices: Optional[str] = Query(None, description="Extra vegetation indices, e.g. NDRE,GNDVI,SAVI,EVI"),
+    concurrency: Optional[int] = Query(None, ge=1, le=MAX_UPLOAD_FAN_OUT, description="Files processed at once"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    project = await db.get(Project, project_id)
+    # Give the connection back before the long work; each file opens its own session
+    await db.close()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    return await process_upload_batch(project_id, files, parse_index_names(indices), concurrency)
+
+
+@router.post("/ndvi/{result_id}/indices")
+async def compute_result_indices(
+    result_id: int,
+    indices: str = Query(..., description="Vegetation indices, e.g. NDRE,GNDVI or NAME=expression"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Compute extra indices from an already-uploaded multispectral TIFF, no re-upload needed."""
+    result = await db.get(NDVIResult, result_id)
+    await db.close()
+    if not result:
+        raise HTTPException(status_code=404, detail="NDVI result not found")
+    if not result.tiff_url:
+        raise HTTPException(status_code=400, detail="No multispectral source stored for this result")
+
+    index_names = parse_index_names(indices)
+    if not index_names:
+        raise HTTPException(status_code=400, detail="No indices requested")
+
+    temp_filename = f"temp_{uuid4().hex}_{os.path.basename(result.filename)}"
+    try:
+        await run_io(download_from_s3, extract_s3_key_from_url(result.tiff_url), temp_filename)
+        index_output = await compute_and_upload_indices(temp_filename, index_names, result.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    finally:
+        # A failed download may leave a partial file or none at all
+        remove_files(temp_filename)
+
+    return {"id": result.id, "indices": index_output}
+
+
+@router.get("/ndvi/{result_id}/tiles/{z}/{x}/{y}.png")
+async def get_ndvi_tile(result_id: int, z: int, x: int, y: int, request: Request,
+                        db: AsyncSession = Depends(get_async_db)):
+    """XYZ web-mercator tile of the NDVI raster, coloured with the NDVI colormap."""
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    result = await db.get(NDVIResult, result_id)
+    await db.close()
+    if not result:
+        raise HTTPException(status_code=404, detail="NDVI result not found")
+    if not result.ndvi_cog_url:
+        raise HTTPException(status_code=404, detail="No tiled NDVI raster stored for this result")
+
+    etag = tile_etag(result.ndvi_cog_url, z, x, y)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={TILE_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        png = await get_tile(result.ndvi_cog_url, z, x, y)
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return Response(content=png, media_type="image/png", headers=headers)
+
+
+@router.get("/ndvi/{result_id}/insights")
+async def get_ndvi_insights(
+    result_id: int,
+    wait: float = Query(0, ge=0, le=INSIGHT_MAX_WAIT, description="Long-poll: seconds to wait for pending insights"),
     db: Session = Depends(get_db)
 ):
-    results_list = []
+    """AI insights for a result; `status` is pending/running until the enrichment worker stores them."""
+    result = await run_io(lambda: db.query(NDVIResult).filter(NDVIResult.id == result_id).first())
+    if not result:
+        raise HTTPException(status_code=404, detail="NDVI result not found")
 
-    for file in files:
-        filename = file.filename.lower()
+    insight = await wait_for_insight(db, result_id, wait)
+    if insight is None:
+        # Results stored before insights were persisted get theirs queued on first request
+        insight = await run_io(queue_insight, db, result_id, extract_s3_key_from_url(result.original_url))
+        notify_insight_workers()
+    return serialize_insight(insight)
 
-        try:
-            # Save to temp
-            temp_filename = f"temp_{uuid4().hex}_{file.filename}"
-            with open(temp_filename, "wb") as f:
-                f.write(await file.read())
-
-            if filename.endswith(".jpg") or filename.endswith(".jpeg"):
-                print("Skipping NDVI for JPEG:", filename)
-
-                # Upload JPEG to S3
-                jpeg_s3_filename = f"uploads/{datetime.utcnow().isoformat()}_{file.filename}"
-                jpeg_s3_url = upload_to_s3(temp_filename, jpeg_s3_filename)
-
-                # 📍 Get real coordinates using /geocode endpoint
-                project = db.query(Project).filter(Project.id == project_id).first()
-                if not project:
-                    raise HTTPException(status_code=404, detail="Project not found")
-
-                # Call internal /geocode route using httpx
-                import httpx
-                coords = {"latitude": 0, "longitude": 0}
-                if project.location:
-                    async with httpx.AsyncClient() as client:
-                        try:
-                            response = await client.get(f"http://localhost:8000/geocode", params={"location": project.location})
-                            if response.status_code == 200:
-                                coords = response.json()
-                            else:
-                                print("Geocode request failed:", response.text)
-                        except Exception as e:
-                            print("Geocode error:", str(e))
-
-                # Run AI insights
-                ai_payload = {
-                    "image_key": jpeg_s3_filename,
-                    "coordinates": coords,
-                    "user_id": "demo_user"
-                }
-                ai_result = await run_mars_insights(ai_payload)
-                print("AI insights from JPEG upload:", ai_result)
-
-                result = NDVIResult(
-                    filename=file.filename,
-                    s3_url=jpeg_s3_url,
-                    original_url=jpeg_s3_url,
-                    tiff_url=None,
-                    ndvi_min=0.0,
-                    ndvi_max=0.0,
-                    ndvi_mean=0.0,
-                    raster_extent=None,
-                    timestamp=datetime.utcnow(),
-                    project_id=project_id,
-                )
-                db.add(result)
-                db.commit()
-                db.refresh(result)
-
-                results_list.append({
-                    "id": result.id,
-                    "filename": result.filename,
-                    "s3_url": result.s3_url,
-                    "ndvi_min": result.ndvi_min,
-                    "ndvi_max": result.ndvi_max,
-                    "ndvi_mean": result.ndvi_mean,
-                    "timestamp": result.timestamp.isoformat(),
-                    "ai_insights": ai_result
-                })
-
-                os.remove(temp_filename)
-                continue
-
-
-            elif filename.endswith(".tif") or filename.endswith(".tiff"):
-                print("Calling NDVI pipeline for:", filename)
-                ndvi_result = process_ndvi_pipeline(
-                    ref_image_path=temp_filename,
-                    target_image_path=temp_filename,
-                    nir_band_index=3,
-                    red_band_index=2,
-                )
-
-                ndvi_path = ndvi_result["ndvi_path"]
-                stats = ndvi_result["stats"]
-                bounds = ndvi_result["extent"]
-
-                # Generate JPEG preview
-                jpeg_preview_path = f"preview_{uuid4().hex}.jpg"
-                simple_tiff_to_jpeg(temp_filename, jpeg_preview_path)
-
-                # Upload all files
-                jpeg_s3_filename = f"previews/{datetime.utcnow().isoformat()}_{file.filename.replace('.tif', '.jpg').replace('.tiff', '.jpg')}"
-                jpeg_s3_url = upload_to_s3(jpeg_preview_path, jpeg_s3_filename)
-
-                tiff_s3_filename = f"ndvi_results/{datetime.utcnow().isoformat()}_{file.filename}"
-                tiff_s3_url = upload_to_s3(temp_filename, tiff_s3_filename)
-
-                # Convert NDVI TIFF output to JPEG before uploading
-                converted_ndvi_jpeg = f"ndvi_converted_{uuid4().hex}.jpg"
-                simple_tiff_to_jpeg(ndvi_path, converted_ndvi_jpeg)
-
-                s3_filename = f"ndvi_corrected_results/{datetime.utcnow().isoformat()}_{file.filename.replace('.tif', '.jpg').replace('.tiff', '.jpg')}"
-                s3_url = upload_to_s3(converted_ndvi_jpeg, s3_filename)
-
-
-                original_s3_filename = f"originals/{datetime.utcnow().isoformat()}_{file.filename}"
-                original_s3_url = upload_to_s3(temp_filename, original_s3_filename)
-
-                # Convert bounds to geometry
-                minx, miny, maxx, maxy = bounds.bounds
-                polygon = box(minx, miny, maxx, maxy)
-                raster_geom = from_shape(polygon, srid=4326)
-
-                # Fetch project and geocode location
-                project = db.query(Project).filter(Project.id == project_id).first()
-                if not project:
-                    raise HTTPException(status_code=404, detail="Project not found")
-
-                import httpx
-                coords = {"latitude": 0, "longitude": 0}
-                if project.location:
-                    async with httpx.AsyncClient() as client:
-                        try:
-                            response = await client.get("http://localhost:8000/geocode", params={"location": project.location})
-                            if response.status_code == 200:
-                                coords = response.json()
-                            else:
-                                print("Geocode request failed:", response.text)
-                        except Exception as e:
-                            print("Geocode error:", str(e))
-
-                # Run AI insights
-                ai_payload = {
-                    "image_key": jpeg_s3_filename,  # you could also use s3_filename if NDVI file is preferred
-                    "coordinates": coords,
-                    "user_id": "demo_user"
-                }
-                ai_result = await run_mars_insights(ai_payload)
-                print("AI insights from TIFF upload:", ai_result)
-
-                # Store metadata
-                result = NDVIResult(
-                    filename=file.filename,
-                    s3_url=s3_url,
-                    original_url=jpeg_s3_url,
-                    tiff_url=tiff_s3_url,
-                    ndvi_min=stats["min"],
-                    ndvi_max=stats["max"],
-                    ndvi_mean=stats["mean"],
-                    raster_extent=raster_geom,
-                    timestamp=datetime.utcnow(),
-                    project_id=project_id,
-                )
-                db.add(result)
-                db.commit()
-                db.refresh(result)
-
-                results_list.append({
-                    "id": result.id,
-                    "filename": result.filename,
-                    "s3_url": result.s3_url,
-                    "ndvi_min": result.ndvi_min,
-                    "ndvi_max": result.ndvi_max,
-                    "ndvi_mean": result.ndvi_mean,
-                    "timestamp": result.timestamp.isoformat(),
-                    "ai_insights": ai_result
-                })
-
-                os.remove(temp_filename)
-
-
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-
-    return results_list
-
-
-# @router.post("/projects/{project_id}/ndvi-process")
-# async def process_ndvi(
-#     project_id: int,
-#     files: List[UploadFile] = File(...),
-#     db: Session = Depends(get_db)
-# ):
-#     def s3_to_http_url(s3_path: str) -> str:
-#         return s3_path.replace("s3://ndvi-images-bucket", "https://ndvi-images-bucket.s3.amazonaws.com")
-
-#     results_list = []
-
-#     for file in files:
-#         filename = file.filename.lower()
-
-#         try:
-#             # Save to temp
-#             temp_filename = f"temp_{uuid4().hex}_{file.filename}"
-#             with open(temp_filename, "wb") as f:
-#                 f.write(await file.read())
-
-#             if filename.endswith(".jpg") or filename.endswith(".jpeg"):
-#                 print("Skipping NDVI for JPEG:", filename)
-
-#                 jpeg_s3_filename = f"uploads/{datetime.utcnow().isoformat()}_{file.filename}"
-#                 jpeg_s3_url = upload_to_s3(temp_filename, jpeg_s3_filename)
-
-#                 project = db.query(Project).filter(Project.id == project_id).first()
-#                 if not project:
-#                     raise HTTPException(status_code=404, detail="Project not found")
-
-#                 import httpx
-#                 coords = {"latitude": 0, "longitude": 0}
-#                 if project.location:
-#                     async with httpx.AsyncClient() as client:
-#                         try:
-#                             response = await client.get(f"http://localhost:8000/geocode", params={"location": project.location})
-#                             if response.status_code == 200:
-#                                 coords = response.json()
-#                             else:
-#                                 print("Geocode request failed:", response.text)
-#                         except Exception as e:
-#                             print("Geocode error:", str(e))
-
-#                 ai_payload = {
-#                     "image_key": jpeg_s3_filename,
-#                     "coordinates": coords,
-#                     "user_id": "demo_user"
-#                 }
-#                 ai_result = await run_mars_insights(ai_payload)
-
-#                 ai_image_url = None
-#                 if ai_result and "ndvi_result" in ai_result and "save_path" in ai_result["ndvi_result"]:
-#                     ai_image_url = s3_to_http_url(ai_result["ndvi_result"]["save_path"])
-
-#                 result = NDVIResult(
-#                     filename=file.filename,
-#                     s3_url=jpeg_s3_url,
-#                     original_url=jpeg_s3_url,
-#                     tiff_url=None,
-#                     ndvi_min=0.0,
-#                     ndvi_max=0.0,
-#                     ndvi_mean=0.0,
-#                     raster_extent=None,
-#                     timestamp=datetime.utcnow(),
-#                     project_id=project_id,
-#                 )
-#                 db.add(result)
-#                 db.commit()
-#                 db.refresh(result)
-
-#                 results_list.append({
-#                     "id": result.id,
-#                     "filename": result.filename,
-#                     "ndvi_image_url": result.s3_url,
-#                     "preview_image_url": result.original_url,
-#                     "tiff_url": result.tiff_url,
-#                     "ndvi_min": result.ndvi_min,
-#                     "ndvi_max": result.ndvi_max,
-#                     "ndvi_mean": result.ndvi_mean,
-#                     "timestamp": result.timestamp.isoformat(),
-#                     "ai_insights": ai_result,
-#                     "ai_image_url": ai_image_url
-#                 })
-
-#                 os.remove(temp_filename)
-#                 continue
-
-#             elif filename.endswith(".tif") or filename.endswith(".tiff"):
-#                 print("Calling NDVI pipeline for:", filename)
-#                 ndvi_result = process_ndvi_pipeline(
-#                     ref_image_path=temp_filename,
-#                     target_image_path=temp_filename,
-#                     nir_band_index=3,
-#                     red_band_index=2,
-#                 )
-
-#                 ndvi_path = ndvi_result["ndvi_path"]
-#                 stats = ndvi_result["stats"]
-#                 bounds = ndvi_result["extent"]
-
-#                 jpeg_preview_path = f"preview_{uuid4().hex}.jpg"
-#                 simple_tiff_to_jpeg(temp_filename, jpeg_preview_path)
-
-#                 jpeg_s3_filename = f"previews/{datetime.utcnow().isoformat()}_{file.filename.replace('.tif', '.jpg').replace('.tiff', '.jpg')}"
-#                 jpeg_s3_url = upload_to_s3(jpeg_preview_path, jpeg_s3_filename)
-
-#                 tiff_s3_filename = f"ndvi_results/{datetime.utcnow().isoformat()}_{file.filename}"
-#                 tiff_s3_url = upload_to_s3(temp_filename, tiff_s3_filename)
-
-#                 converted_ndvi_jpeg = f"ndvi_converted_{uuid4().hex}.jpg"
-#                 simple_tiff_to_jpeg(ndvi_path, converted_ndvi_jpeg)
-
-#                 s3_filename = f"ndvi_corrected_results/{datetime.utcnow().isoformat()}_{file.filename.replace('.tif', '.jpg').replace('.tiff', '.jpg')}"
-#                 s3_url = upload_to_s3(converted_ndvi_jpeg, s3_filename)
-
-#                 original_s3_filename = f"originals/{datetime.utcnow().isoformat()}_{file.filename}"
-#                 original_s3_url = upload_to_s3(temp_filename, original_s3_filename)
-
-#                 minx, miny, maxx, maxy = bounds.bounds
-#                 polygon = box(minx, miny, maxx, maxy)
-#                 raster_geom = from_shape(polygon, srid=4326)
-
-#                 project = db.query(Project).filter(Project.id == project_id).first()
-#                 if not project:
-#                     raise HTTPException(status_code=404, detail="Project not found")
-
-#                 import httpx
-#                 coords = {"latitude": 0, "longitude": 0}
-#                 if project.location:
-#                     async with httpx.AsyncClient() as client:
-#                         try:
-#                             response = await client.get("http://localhost:8000/geocode", params={"location": project.location})
-#                             if response.status_code == 200:
-#                                 coords = response.json()
-#                             else:
-#                                 print("Geocode request failed:", response.text)
-#                         except Exception as e:
-#                             print("Geocode error:", str(e))
-
-#                 ai_payload = {
-#                     "image_key": jpeg_s3_filename,
-#                     "coordinates": coords,
-#                     "user_id": "demo_user"
-#                 }
-#                 ai_result = await run_mars_insights(ai_payload)
-
-#                 ai_image_url = None
-#                 if ai_result and "ndvi_result" in ai_result and "save_path" in ai_result["ndvi_result"]:
-#                     ai_image_url = s3_to_http_url(ai_result["ndvi_result"]["save_path"])
-
-#                 result = NDVIResult(
-#                     filename=file.filename,
-#                     s3_url=s3_url,
-#                     original_url=jpeg_s3_url,
-#                     tiff_url=tiff_s3_url,
-#                     ndvi_min=stats["min"],
-#                     ndvi_max=stats["max"],
-#                     ndvi_mean=stats["mean"],
-#                     raster_extent=raster_geom,
-#                     timestamp=datetime.utcnow(),
-#                     project_id=project_id,
-#                 )
-#                 db.add(result)
-#                 db.commit()
-#                 db.refresh(result)
-
-#                 results_list.append({
-#                     "id": result.id,
-#                     "filename": result.filename,
-#                     "ndvi_image_url": result.s3_url,
-#                     "preview_image_url": result.original_url,
-#                     "tiff_url": result.tiff_url,
-#                     "ndvi_min": result.ndvi_min,
-#                     "ndvi_max": result.ndvi_max,
-#                     "ndvi_mean": result.ndvi_mean,
-#                     "timestamp": result.timestamp.isoformat(),
-#                     "ai_insights": ai_result,
-#                     "ai_image_url": ai_image_url
-#                 })
-
-#                 os.remove(temp_filename)
-
-#         except Exception as e:
-#             raise HTTPException(status_code=500, detail=str(e))
-
-#     return results_list
+
+# Most recent dates used by one change computation
+MAX_CHANGE_DATES = int(os.getenv("MAX_CHANGE_DATES", "48"))
+
+
+@router.post("/projects/{project_id}/ndvi-change")
+async def compute_project_ndvi_change(
+    project_id: int,
+    start: Optional[datetime] = Query(None, description="Only results on or after this time"),
+    end: Optional[datetime] = Query(None, description="Only results on or before this time"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Per-pixel NDVI change across the project's flights: a delta/slope COG plus summary stats."""
+    project = await db.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    statement = select(NDVIResult).where(
+        NDVIResult.project_id == project_id, NDVIResult.ndvi_cog_url.isnot(None)
+    )
+    if start:
+        statement = statement.where(NDVIResult.timestamp >= start)
+    if end:
+        statement = statement.where(NDVIResult.timestamp <= end)
+    results = (
+        await db.scalars(statement.order_by(NDVIResult.timestamp.desc()).limit(MAX_CHANGE_DATES))
+    ).all()
+    await db.close()
+    if len(results) < 2:
+        raise HTTPException(status_code=400, detail="Need at least two NDVI rasters to compare")
+
+    try:
+        change = await compute_and_upload_change(results[::-1])
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"project_id": project_id, "result_ids": [r.id for r in reversed(results)], **change}
 
 
-    
 @router.get("/projects/{project_id}/timeline")
-def get_project_timeline(project_id: int, db: Session = Depends(get_db)):
-    results = db.query(NDVIResult).filter(NDVIResult.project_id == project_id).order_by(NDVIResult.timestamp.desc()).all()
+async def get_project_timeline(
+    project_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    results, next_cursor = await paginate_query(
+        db, select(NDVIResult).where(NDVIResult.project_id == project_id),
+        NDVIResult.timestamp, NDVIResult.id, cursor, limit
+    )
 
     timeline = []
     for r in results:
@@ -427,55 +271,50 @@ def get_project_timeline(project_id: int, db: Session = Depends(get_db)):
             "files": [r.filename],
         })
 
-    return timeline
+    return page(timeline, next_cursor)
 
 
 @router.get("/projects/{project_id}/ndvi")
-def get_project_ndvi_results(project_id: int, db: Session = Depends(get_db)):
-    results = (
-        db.query(NDVIResult)
-        .filter(NDVIResult.project_id == project_id)
-        .order_by(NDVIResult.timestamp.desc())
-        .all()
+async def get_project_ndvi_results(
+    project_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    results, next_cursor = await paginate_query(
+        db, select(NDVIResult).where(NDVIResult.project_id == project_id),
+        NDVIResult.timestamp, NDVIResult.id, cursor, limit
     )
 
-    return [
-        {
-            "id": r.id,
-            "date": r.timestamp.strftime("%B %d, %Y"),
-            "url": r.s3_url,
-            "originalUrl": r.original_url,  
-            "ndviMin": r.ndvi_min,
-            "ndviMax": r.ndvi_max,
-            "ndviMean": r.ndvi_mean,
-            "healthyPercentage": 65,   # Placeholder
-            "stressedPercentage": 25,  # Placeholder
-            "unhealthyPercentage": 10, # Placeholder
-        }
-        for r in results
-    ]
+    return page([serialize_ndvi_summary(r) for r in results], next_cursor)
 
 
    
 @router.post("/projects", response_model=ProjectRead)
 def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     db_project = Project(**project.dict())
+    if (db_project.latitude is None or db_project.longitude is None) and db_project.location:
+        try:
+            coords = geocoding_service.geocode(db, db_project.location)
+            db_project.latitude, db_project.longitude = coords["latitude"], coords["longitude"]
+        except GeocoderUnavailable as e:
+            print("Geocode error:", str(e))
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
     return db_project    
 
 @router.get("/projects/{project_id}")
-def get_project(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
+async def get_project(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    latest_ndvi = (
-        db.query(NDVIResult)
-        .filter(NDVIResult.project_id == project_id)
+    latest_ndvi = await db.scalar(
+        select(NDVIResult)
+        .where(NDVIResult.project_id == project_id)
         .order_by(NDVIResult.timestamp.desc())
-        .first()
+        .limit(1)
     )
 
     # None if no NDVI found
@@ -498,9 +337,15 @@ def get_project(project_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/projects")
-def list_projects(db: Session = Depends(get_db)):
-    projects = db.query(Project).order_by(Project.created_at.desc()).all()
-    return [
+async def list_projects(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    projects, next_cursor = await paginate_query(
+        db, select(Project), Project.created_at, Project.id, cursor, limit
+    )
+    return page([
         {
             "id": p.id,
             "name": p.name,
@@ -509,34 +354,22 @@ def list_projects(db: Session = Depends(get_db)):
             "created_at": p.created_at.isoformat(),
         }
         for p in projects
-    ]
+    ], next_cursor)
     
 
 @router.get("/geocode")
-def get_coordinates(location: str):
+def get_coordinates(location: str, db: Session = Depends(get_db)):
     try:
-        api_key = os.getenv("OPENCAGE_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="OpenCage API key not configured")
-
-        geocoder = OpenCageGeocode(api_key)
-        results = geocoder.geocode(location)
-
-        if results and len(results) > 0:
-            lat = results[0]['geometry']['lat']
-            lng = results[0]['geometry']['lng']
-            return {"latitude": lat, "longitude": lng}
-        else:
-            return {"latitude": None, "longitude": None}
-    
-    except Exception as e:
+        return geocoding_service.geocode(db, location)
+    except GeocoderUnavailable as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/ai-insights")
 async def run_ai_insights(payload: dict):
     try:
-        result = await run_mars_insights(payload)
+        # Live dashboard call: the answer includes current weather, so never serve it from the cache
+        result = await run_mars_insights(payload, use_cache=False)
         return {"result": result} 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
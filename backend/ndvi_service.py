@@ -0,0 +1,467 @@
+# backend/ndvi_service.py
+import asyncio
+import hashlib
+import os
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional
+from uuid import uuid4
+
+from geoalchemy2.shape import from_shape
+from shapely.geometry import box
+from sqlalchemy.orm import Session
+
+from backend.change_detection import compute_ndvi_change
+from backend.cog_writer import COG_COMPRESS, COG_ENCODING
+from backend.database import AsyncSessionLocal, SessionLocal
+from backend.executors import ExecutorBusy, run_raster, run_io
+from backend.insights import notify_insight_workers, queue_insight
+from backend.models import NDVIResult, Project
+from backend.artifact_store import (
+    clone_result,
+    content_key,
+    file_sha256,
+    find_cached_result,
+    get_artifact,
+    record_artifact,
+)
+from backend.ndvi_processor import run_ndvi_stage, extract_s3_key_from_url
+from backend.ndvi_stats import stats_columns
+from backend.previews import MAIN_PREVIEW, PREVIEW_SIZES, THUMB_PREVIEW
+from backend.s3_utils import upload_manager
+from backend.tile_server import with_local_sources
+from backend.vegetation_indices import DEFAULT_BAND_MAP, RGB_BAND_INDEXES, compute_indices_to_cog
+
+
+JPEG_EXTENSIONS = (".jpg", ".jpeg")
+TIFF_EXTENSIONS = (".tif", ".tiff")
+
+# Bump when NDVI outputs change so results cached under older settings aren't reused
+NDVI_PIPELINE_VERSION = (
+    f"ndvi-4:nir{DEFAULT_BAND_MAP['nir']}:red{DEFAULT_BAND_MAP['red']}:{COG_ENCODING}-{COG_COMPRESS}"
+)
+
+# Uploads are copied to disk in chunks of this size, so memory per upload stays constant
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE_KB", "1024")) * 1024
+
+# How many files of one multi-file upload are processed at the same time
+UPLOAD_FAN_OUT = int(os.getenv("UPLOAD_FAN_OUT", "4"))
+MAX_UPLOAD_FAN_OUT = int(os.getenv("MAX_UPLOAD_FAN_OUT", "16"))
+
+
+class ProjectNotFound(Exception):
+    pass
+
+
+@contextmanager
+def stage_timer(timings: Optional[dict], name: str):
+    """Add the wall time of the block to timings[name] (seconds)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0.0) + time.perf_counter() - start, 4)
+
+
+def is_supported_upload(filename: str) -> bool:
+    return filename.lower().endswith(JPEG_EXTENSIONS + TIFF_EXTENSIONS)
+
+
+def remove_files(*paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+async def spool_upload(file, directory: str = ".", digest=None) -> str:
+    """Stream an UploadFile to a uniquely named temp file and return its path.
+
+    The body is copied in UPLOAD_CHUNK_SIZE pieces instead of read whole;
+    pass a hashlib object as `digest` to hash the bytes on the way through.
+    Opening, hashing and writing run on the I/O pool, off the event loop.
+    """
+    temp_filename = os.path.join(directory, f"temp_{uuid4().hex}_{os.path.basename(file.filename)}")
+    f = None
+    try:
+        f = await run_io(open, temp_filename, "wb")
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await run_io(_write_chunk, f, chunk, digest)
+        await run_io(f.close)
+    except BaseException:
+        if f is not None:
+            f.close()
+        remove_files(temp_filename)
+        raise
+    return temp_filename
+
+
+def _write_chunk(f, chunk, digest):
+    if digest is not None:
+        digest.update(chunk)
+    f.write(chunk)
+
+
+def _get_project(db: Session, project_id: int):
+    return db.query(Project).filter(Project.id == project_id).first()
+
+
+def _in_session(func, *args):
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+
+async def _db_step(func, *args):
+    """Run func(db, *args) in its own short session on the I/O pool.
+
+    Between steps no connection is checked out, so a file's raster work and
+    S3 uploads don't keep one idle in a transaction. Returned rows are
+    detached but keep their loaded attributes.
+    """
+    return await run_io(_in_session, func, *args)
+
+
+async def _save_result(result: NDVIResult) -> NDVIResult:
+    # The insert goes through the async engine, so it doesn't hold an I/O thread while committing
+    async with AsyncSessionLocal() as session:
+        session.add(result)
+        await session.commit()
+        await session.refresh(result)
+    return result
+
+
+def _jpeg_name(filename: str) -> str:
+    return filename.replace('.tif', '.jpg').replace('.tiff', '.jpg')
+
+
+def _preview_keys(prefix: str, content_hash: str, filename: str) -> dict:
+    """S3 key per preview size; the main size keeps the plain name the dashboard already uses."""
+    name = _jpeg_name(os.path.basename(filename))
+    return {
+        size: content_key(
+            prefix, content_hash, name if size == MAIN_PREVIEW else f"{size}_{name}", NDVI_PIPELINE_VERSION
+        )
+        for size in PREVIEW_SIZES
+    }
+
+
+def _cog_name(filename: str) -> str:
+    return f"{os.path.splitext(os.path.basename(filename))[0]}_ndvi.tif"
+
+
+async def compute_and_upload_indices(image_path: str, index_names: List[str], source_filename: str) -> dict:
+    """Compute the requested indices as one multiband COG, upload it and return URL + per-index stats."""
+    output_path = os.path.join("output", f"indices_{uuid4().hex}.tif")
+    index_result = await run_raster(compute_indices_to_cog, image_path, index_names, output_path)
+
+    base_name = os.path.splitext(source_filename)[0]
+    indices_s3_filename = f"indices/{datetime.utcnow().isoformat()}_{base_name}_{'_'.join(index_result['bands'])}.tif"
+    indices_s3_url = await upload_manager.upload_file_async(output_path, indices_s3_filename)
+    os.remove(output_path)
+
+    return {
+        "url": indices_s3_url,
+        "bands": index_result["bands"],
+        "stats": index_result["stats"],
+    }
+
+
+async def compute_and_upload_change(results: List[NDVIResult]) -> dict:
+    """NDVI change raster (delta, slope) across the given results' COGs, uploaded once per set of inputs."""
+    output_path = os.path.join("output", f"ndvi_change_{uuid4().hex}.tif")
+
+    async def compute(paths):
+        # COG keys carry the input hash and pipeline version, so they identify each date's pixels for the alignment cache
+        sources = [
+            {"path": path, "timestamp": r.timestamp, "key": extract_s3_key_from_url(r.ndvi_cog_url)}
+            for r, path in zip(results, paths)
+        ]
+        return await run_raster(compute_ndvi_change, sources, output_path)
+
+    # Every date stays pinned until the change raster is written, so fetching one can't evict another
+    change = await with_local_sources([r.ndvi_cog_url for r in results], compute)
+
+    change_hash = hashlib.sha256("|".join(sorted(r.ndvi_cog_url for r in results)).encode()).hexdigest()
+    try:
+        change_url = await upload_manager.upload_file_async(
+            output_path, content_key("ndvi_changes", change_hash, "ndvi_change.tif")
+        )
+    finally:
+        remove_files(output_path)
+
+    return {
+        "url": change_url,
+        "bands": change["bands"],
+        "dates": change["dates"],
+        "alignments": change["alignments"],
+        "stats": change["stats"],
+    }
+
+
+async def process_uploaded_file(
+    project_id: int,
+    original_filename: str,
+    temp_filename: str,
+    index_names: Optional[List[str]] = None,
+    timings: Optional[dict] = None,
+    content_hash: Optional[str] = None,
+    keep_input: bool = False,
+) -> Optional[dict]:
+    """Run the full NDVI flow for one spooled upload and persist its NDVIResult.
+
+    Used by the synchronous upload route and by background job workers.
+    Per-stage wall times are added to `timings` when given. Pass
+    `content_hash` if the SHA-256 was taken while spooling; otherwise the
+    file is hashed here. Returns None for unsupported file types. The temp
+    file is removed in every case unless `keep_input` is set (job workers
+    keep it until the job won't be retried).
+    """
+    filename = original_filename.lower()
+    try:
+        if not await _db_step(_get_project, project_id):
+            raise ProjectNotFound(f"Project {project_id} not found")
+        if filename.endswith(JPEG_EXTENSIONS):
+            return await _process_jpeg(project_id, original_filename, temp_filename, content_hash, timings)
+        if filename.endswith(TIFF_EXTENSIONS):
+            return await _process_tiff(
+                project_id, original_filename, temp_filename, index_names or [], content_hash, timings
+            )
+        return None
+    finally:
+        if not keep_input:
+            remove_files(temp_filename)
+
+
+async def process_upload_batch(
+    project_id: int,
+    files: list,
+    index_names: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+) -> List[dict]:
+    """Process the files of one upload concurrently, returning one entry per file in input order.
+
+    Up to `concurrency` files are in flight at once, so decode/NDVI in the
+    raster pool, S3 uploads and AI calls of different files overlap. Each
+    file commits its own NDVIResult, holding a DB connection only for the
+    individual lookups and inserts; a failure is reported in that file's
+    entry instead of aborting the batch.
+    """
+    concurrency = min(max(concurrency or UPLOAD_FAN_OUT, 1), MAX_UPLOAD_FAN_OUT)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process_one(file):
+        async with semaphore:
+            try:
+                digest = hashlib.sha256()
+                temp_filename = await spool_upload(file, digest=digest)
+                result = await process_uploaded_file(
+                    project_id, file.filename, temp_filename, index_names, content_hash=digest.hexdigest()
+                )
+            except ExecutorBusy as e:
+                return {"filename": file.filename, "status": "failed", "error": str(e), "retryable": True}
+            except Exception as e:
+                traceback.print_exc()
+                return {"filename": file.filename, "status": "failed", "error": str(e)}
+
+        if result is None:
+            return {"filename": file.filename, "status": "skipped", "error": "Unsupported file type"}
+        return {**result, "status": "succeeded"}
+
+    return await asyncio.gather(*(process_one(file) for file in files))
+
+
+async def _queue_insights(result, image_key, timings):
+    # MARS runs after the response, in the enrichment workers; the client polls /ndvi/{id}/insights
+    with stage_timer(timings, "db"):
+        await _db_step(queue_insight, result.id, image_key)
+    notify_insight_workers()
+
+
+def _insights_fields(result) -> dict:
+    return {"insights_status": "pending", "insights_url": f"/ndvi/{result.id}/insights"}
+
+
+async def _content_hash(temp_filename, content_hash, timings):
+    if content_hash:
+        return content_hash
+    with stage_timer(timings, "hash"):
+        return await run_io(file_sha256, temp_filename)
+
+
+async def _store_original(temp_filename, content_hash, original_filename, prefix):
+    """Upload the input bytes once per content hash; later uploads reuse the stored object."""
+    artifact = await _db_step(get_artifact, content_hash, "original")
+    if artifact is None:
+        key = content_key(prefix, content_hash, original_filename)
+        url = await upload_manager.upload_file_async(temp_filename, key)
+        artifact = await _db_step(
+            record_artifact, content_hash, "original", key, url, os.path.getsize(temp_filename)
+        )
+    return artifact
+
+
+async def _process_jpeg(project_id, original_filename, temp_filename, content_hash, timings):
+    print("Skipping NDVI for JPEG:", original_filename)
+    content_hash = await _content_hash(temp_filename, content_hash, timings)
+
+    with stage_timer(timings, "upload"):
+        artifact = await _store_original(temp_filename, content_hash, original_filename, "uploads")
+        jpeg_s3_filename = artifact.s3_key
+        jpeg_s3_url = artifact.s3_url
+
+    with stage_timer(timings, "db"):
+        result = NDVIResult(
+            filename=original_filename,
+            s3_url=jpeg_s3_url,
+            original_url=jpeg_s3_url,
+            tiff_url=None,
+            ndvi_min=0.0,
+            ndvi_max=0.0,
+            ndvi_mean=0.0,
+            raster_extent=None,
+            timestamp=datetime.utcnow(),
+            project_id=project_id,
+            content_hash=content_hash,
+        )
+        result = await _save_result(result)
+    await _queue_insights(result, jpeg_s3_filename, timings)
+
+    return {
+        "id": result.id,
+        "filename": result.filename,
+        "s3_url": result.s3_url,
+        "ndvi_min": result.ndvi_min,
+        "ndvi_max": result.ndvi_max,
+        "ndvi_mean": result.ndvi_mean,
+        "timestamp": result.timestamp.isoformat(),
+        **_insights_fields(result),
+    }
+
+
+def _tiff_response(result, index_output, cached):
+    return {
+        "id": result.id,
+        "filename": result.filename,
+        "s3_url": result.s3_url,
+        "thumbnail_url": result.thumbnail_url,
+        "ndvi_thumbnail_url": result.ndvi_thumbnail_url,
+        "ndvi_cog_url": result.ndvi_cog_url,
+        "ndvi_min": result.ndvi_min,
+        "ndvi_max": result.ndvi_max,
+        "ndvi_mean": result.ndvi_mean,
+        "ndvi_std": result.ndvi_std,
+        "healthy_percentage": result.healthy_percentage,
+        "stressed_percentage": result.stressed_percentage,
+        "unhealthy_percentage": result.unhealthy_percentage,
+        "timestamp": result.timestamp.isoformat(),
+        **_insights_fields(result),
+        "indices": index_output,
+        "cached": cached,
+    }
+
+
+async def _additional_indices(temp_filename, index_names, original_filename, timings):
+    # Additional indices from the same upload, in one pass
+    if not index_names:
+        return None
+    with stage_timer(timings, "indices"):
+        return await compute_and_upload_indices(temp_filename, index_names, original_filename)
+
+
+async def _process_tiff(project_id, original_filename, temp_filename, index_names, content_hash, timings):
+    content_hash = await _content_hash(temp_filename, content_hash, timings)
+
+    # Identical bytes already processed with the same settings: metadata-only insert
+    cached = await _db_step(find_cached_result, content_hash, NDVI_PIPELINE_VERSION)
+    if cached is not None:
+        print("Reusing cached NDVI result for:", original_filename)
+        index_output = await _additional_indices(temp_filename, index_names, original_filename, timings)
+        with stage_timer(timings, "db"):
+            result = await _save_result(clone_result(cached, project_id, original_filename))
+        await _queue_insights(result, extract_s3_key_from_url(cached.original_url), timings)
+        return _tiff_response(result, index_output, cached=True)
+
+    print("Calling NDVI pipeline for:", original_filename)
+    # Decode, filter, NDVI and all previews run in the raster process pool
+    with stage_timer(timings, "ndvi"):
+        ndvi_result = await run_raster(
+            run_ndvi_stage,
+            temp_filename,
+            DEFAULT_BAND_MAP["nir"],
+            DEFAULT_BAND_MAP["red"],
+            preview_prefix=f"preview_{uuid4().hex}",
+            output_filename=f"ndvi_{uuid4().hex}.tiff",
+            rgb_bands=RGB_BAND_INDEXES,
+        )
+
+    ndvi_path = ndvi_result["ndvi_path"]
+    stats = ndvi_result["stats"]
+    bounds = ndvi_result["extent"]
+    rgb_previews = ndvi_result["previews"]["rgb"]
+    ndvi_previews = ndvi_result["previews"]["ndvi"]
+
+    # Derived artifacts are keyed by the input hash and pipeline version, so reprocessing under the
+    # same pipeline overwrites identical bytes and a new pipeline never rewrites older rows' objects
+    rgb_keys = _preview_keys("previews", content_hash, original_filename)
+    ndvi_keys = _preview_keys("ndvi_corrected_results", content_hash, original_filename)
+    cog_s3_filename = content_key("ndvi_cogs", content_hash, _cog_name(original_filename), NDVI_PIPELINE_VERSION)
+    artifacts = {cog_s3_filename: ndvi_path}
+    for size, path in rgb_previews.items():
+        artifacts[rgb_keys[size]] = path
+    for size, path in ndvi_previews.items():
+        artifacts[ndvi_keys[size]] = path
+
+    async def upload_artifacts():
+        # Previews go up in parallel with the (deduplicated) original
+        with stage_timer(timings, "upload"):
+            urls, original = await asyncio.gather(
+                upload_manager.upload_many_async(artifacts),
+                _store_original(temp_filename, content_hash, original_filename, "originals"),
+            )
+            return urls, original
+
+    try:
+        (urls, original), index_output = await asyncio.gather(
+            upload_artifacts(),
+            _additional_indices(temp_filename, index_names, original_filename, timings),
+        )
+    finally:
+        remove_files(ndvi_path, *rgb_previews.values(), *ndvi_previews.values())
+
+    jpeg_s3_filename = rgb_keys[MAIN_PREVIEW]
+
+    # Convert bounds to geometry
+    minx, miny, maxx, maxy = bounds.bounds
+    polygon = box(minx, miny, maxx, maxy)
+    raster_geom = from_shape(polygon, srid=4326)
+
+    # Store metadata
+    with stage_timer(timings, "db"):
+        result = NDVIResult(
+            filename=original_filename,
+            s3_url=urls[ndvi_keys[MAIN_PREVIEW]],
+            original_url=urls[jpeg_s3_filename],
+            thumbnail_url=urls[rgb_keys[THUMB_PREVIEW]],
+            ndvi_thumbnail_url=urls[ndvi_keys[THUMB_PREVIEW]],
+            tiff_url=original.s3_url,
+            ndvi_cog_url=urls[cog_s3_filename],
+            **stats_columns(stats),
+            raster_extent=raster_geom,
+            timestamp=datetime.utcnow(),
+            project_id=project_id,
+            content_hash=content_hash,
+            pipeline_version=NDVI_PIPELINE_VERSION,
+        )
+        result = await _save_result(result)
+    # you could also use the NDVI preview key if that suits MARS better
+    await _queue_insights(result, jpeg_s3_filename, timings)
+
+    return _tiff_response(result, index_output, cached=False)
@@ -0,0 +1,148 @@
+# backend/ndvi_stats.py
+import os
+import numpy as np
+
+
+# Health classes: NDVI < STRESSED is unhealthy, < HEALTHY is stressed, the rest healthy
+STRESSED_THRESHOLD = float(os.getenv("NDVI_STRESSED_THRESHOLD", "0.2"))
+HEALTHY_THRESHOLD = float(os.getenv("NDVI_HEALTHY_THRESHOLD", "0.5"))
+
+HISTOGRAM_BINS = 256
+PERCENTILES = (2, 25, 50, 75, 98)
+
+# Values are processed in cache-sized chunks so every statistic is taken
+# in one sweep over memory without a full-size masked copy.
+_CHUNK_SIZE = 1 << 16
+
+
+class NDVIStatsAccumulator:
+    """Single-pass, mergeable NDVI statistics.
+
+    Feed it whole rasters or individual tiles with `update`, combine partial
+    results from other tiles/workers with `merge`, and read the summary with
+    `result`. Percentiles come from a fixed-bin histogram over `value_range`
+    (values outside it land in the edge bins). The health classes use NDVI
+    thresholds; pass health_classes=False for other indices to leave them out.
+    """
+
+    def __init__(self, bins=HISTOGRAM_BINS, value_range=(-1.0, 1.0), nodata=None,
+                 stressed_threshold=STRESSED_THRESHOLD, healthy_threshold=HEALTHY_THRESHOLD, health_classes=True):
+        self.bins = bins
+        self.value_range = value_range
+        self.nodata = nodata
+        self.health_classes = health_classes
+        self.stressed_threshold = stressed_threshold
+        self.healthy_threshold = healthy_threshold
+
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.unhealthy = 0
+        self.healthy = 0
+        self.histogram = np.zeros(bins, dtype=np.int64)
+
+    def update(self, values):
+        flat = np.asarray(values).reshape(-1)
+        low, high = self.value_range
+        scale = self.bins / (high - low)
+
+        for start in range(0, flat.size, _CHUNK_SIZE):
+            chunk = flat[start:start + _CHUNK_SIZE]
+            valid = np.isfinite(chunk)
+            if self.nodata is not None:
+                valid &= chunk != self.nodata
+            if not valid.all():
+                chunk = chunk[valid]
+            if not chunk.size:
+                continue
+
+            chunk64 = chunk.astype(np.float64)
+            self.count += chunk.size
+            self.total += float(chunk64.sum())
+            self.total_sq += float(np.dot(chunk64, chunk64))
+            self.min = min(self.min, float(chunk.min()))
+            self.max = max(self.max, float(chunk.max()))
+            if self.health_classes:
+                self.unhealthy += int(np.count_nonzero(chunk < self.stressed_threshold))
+                self.healthy += int(np.count_nonzero(chunk >= self.healthy_threshold))
+
+            bin_index = ((chunk64 - low) * scale).astype(np.intp)
+            np.clip(bin_index, 0, self.bins - 1, out=bin_index)
+            self.histogram += np.bincount(bin_index, minlength=self.bins)
+
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.unhealthy += other.unhealthy
+        self.healthy += other.healthy
+        self.histogram += other.histogram
+        return self
+
+    def percentile(self, q):
+        """Approximate percentile, interpolated linearly inside histogram bins."""
+        if not self.count:
+            return None
+        low, high = self.value_range
+        bin_width = (high - low) / self.bins
+        target = q / 100.0 * self.count
+        cumulative = np.cumsum(self.histogram)
+        index = int(np.searchsorted(cumulative, target, side="left"))
+        index = min(index, self.bins - 1)
+        before = cumulative[index - 1] if index > 0 else 0
+        in_bin = self.histogram[index]
+        fraction = (target - before) / in_bin if in_bin else 0.0
+        value = low + (index + fraction) * bin_width
+        return float(min(max(value, self.min), self.max))
+
+    def result(self):
+        if not self.count:
+            result = {
+                "min": None, "max": None, "mean": None, "std": None, "count": 0,
+                "percentiles": {f"p{q}": None for q in PERCENTILES},
+            }
+            if self.health_classes:
+                result.update(healthy_percentage=None, stressed_percentage=None, unhealthy_percentage=None)
+            return result
+
+        mean = self.total / self.count
+        variance = max(self.total_sq / self.count - mean * mean, 0.0)
+        result = {
+            "min": self.min,
+            "max": self.max,
+            "mean": mean,
+            "std": float(np.sqrt(variance)),
+            "count": self.count,
+            "percentiles": {f"p{q}": self.percentile(q) for q in PERCENTILES},
+        }
+        if self.health_classes:
+            stressed = self.count - self.healthy - self.unhealthy
+            result.update(
+                healthy_percentage=100.0 * self.healthy / self.count,
+                stressed_percentage=100.0 * stressed / self.count,
+                unhealthy_percentage=100.0 * self.unhealthy / self.count,
+            )
+        return result
+
+
+def stats_columns(stats):
+    """Map an accumulator result onto the NDVIResult stat columns."""
+    percentiles = stats.get("percentiles") or {}
+    return {
+        "ndvi_min": stats.get("min"),
+        "ndvi_max": stats.get("max"),
+        "ndvi_mean": stats.get("mean"),
+        "ndvi_std": stats.get("std"),
+        "ndvi_p2": percentiles.get("p2"),
+        "ndvi_median": percentiles.get("p50"),
+        "ndvi_p98": percentiles.get("p98"),
+        "healthy_percentage": stats.get("healthy_percentage"),
+        "stressed_percentage": stats.get("stressed_percentage"),
+        "unhealthy_percentage": stats.get("unhealthy_percentage"),
+    }
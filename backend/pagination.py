@@ -0,0 +1,93 @@
+# backend/pagination.py
+"""Keyset (cursor) pagination for the list endpoints.
+
+Pages are ordered newest first by (timestamp, id). The cursor is the
+(timestamp, id) of the last row returned, and the next page starts strictly
+after it. With a composite index on those columns every page is an index
+range scan, so latency doesn't grow with table size the way OFFSET does.
+Ids may be integers or strings (job ids are UUIDs).
+"""
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp: datetime, row_id) -> str:
+    payload = {"t": timestamp.isoformat(), "id": row_id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """(timestamp, id) from a cursor made by encode_cursor; InvalidCursor otherwise."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        timestamp, row_id = datetime.fromisoformat(payload["t"]), payload["id"]
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+    if isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+        raise InvalidCursor("Invalid cursor")
+    return timestamp, row_id
+
+
+def _keyset_page(query, timestamp_column, id_column, cursor, limit):
+    # Works on an ORM Query and on a select() alike
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(timestamp, row_id))
+    return query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def _split_page(rows, timestamp_column, id_column, limit):
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+
+
+def paginate(query, timestamp_column, id_column, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """One page of `query`, newest first, and the cursor of the following page (None on the last page).
+
+    The timestamp column must be non-NULL for every row (the models fill it
+    on insert). The row-value comparison is what lets the database use the
+    composite index as a range condition.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = _keyset_page(query, timestamp_column, id_column, cursor, limit).all()
+    return _split_page(rows, timestamp_column, id_column, limit)
+
+
+async def paginate_async(db: AsyncSession, statement, timestamp_column, id_column, cursor: Optional[str] = None,
+                         limit: int = DEFAULT_PAGE_SIZE):
+    """paginate() for an AsyncSession: `statement` is a select() of one entity, e.g. select(NDVIResult)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = (await db.scalars(_keyset_page(statement, timestamp_column, id_column, cursor, limit))).all()
+    return _split_page(list(rows), timestamp_column, id_column, limit)
+
+
+async def paginate_query(db: AsyncSession, statement, timestamp_column, id_column, cursor, limit):
+    """paginate_async() for route handlers: a malformed cursor is a 400."""
+    try:
+        return await paginate_async(db, statement, timestamp_column, id_column, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def page(items, next_cursor):
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,134 @@
+# backend/previews.py
+import os
+import numpy as np
+import rasterio
+from PIL import Image
+from rasterio.enums import Resampling
+from backend.ndvi_colormap import colorize
+
+
+# name:max-side pairs; every size is rendered from one decimated read
+PREVIEW_SIZES = {
+    name: int(size)
+    for name, size in (item.split(":") for item in os.getenv("PREVIEW_SIZES", "thumb:256,medium:1024").split(","))
+}
+# The largest size is the main preview; the smallest is stored as the thumbnail
+MAIN_PREVIEW = max(PREVIEW_SIZES, key=PREVIEW_SIZES.get)
+THUMB_PREVIEW = min(PREVIEW_SIZES, key=PREVIEW_SIZES.get)
+PREVIEW_QUALITY = int(os.getenv("PREVIEW_QUALITY", "85"))
+STRETCH_PERCENTILES = (2, 98)
+
+
+def preview_shape(height, width, max_side):
+    scale = min(1.0, max_side / max(height, width))
+    return max(1, round(height * scale)), max(1, round(width * scale))
+
+
+def rgb_band_indexes(count, rgb_bands=None):
+    """Zero-based red, green, blue positions, or the first three bands if those aren't in the stack."""
+    if rgb_bands and all(index < count for index in rgb_bands):
+        return list(rgb_bands)
+    return [min(index, count - 1) for index in range(3)]
+
+
+def read_decimated(path, indexes, max_side):
+    """Read zero-based `indexes` at most `max_side` pixels on the long edge as float32, nodata as NaN.
+
+    GDAL serves decimated reads from the nearest overview when the file has one.
+    """
+    with rasterio.open(path) as src:
+        out_shape = (len(indexes),) + preview_shape(src.height, src.width, max_side)
+        data = src.read([index + 1 for index in indexes], out_shape=out_shape, out_dtype="float32",
+                        resampling=Resampling.nearest)
+        if src.nodata is not None:
+            data[data == src.nodata] = np.nan
+        scales = src.scales or ()
+        for position, index in enumerate(indexes):
+            if index < len(scales) and scales[index] != 1.0:
+                data[position] *= np.float32(scales[index])
+    return data
+
+
+def decimate_array(array, max_side, nodata=None):
+    """Strided (nearest-neighbour) copy of an in-memory (bands, H, W) or 2D array as float32, nodata as NaN."""
+    height, width = array.shape[-2:]
+    step = max(1, int(np.ceil(max(height, width) / max_side)))
+    strided = array[..., ::step, ::step]
+    data = strided.astype("float32")
+    if nodata is not None:
+        data[strided == nodata] = np.nan
+    return data
+
+
+def stretch_limits(values, percentiles=STRETCH_PERCENTILES):
+    """Low/high percentiles of the finite values, or None if there are none."""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return None
+    low, high = np.percentile(finite, percentiles)
+    return float(low), float(high)
+
+
+def stretch_to_uint8(bands):
+    """Per-band 2–98% stretch of (bands, h, w) to (h, w, bands) uint8; NaN becomes 0."""
+    out = np.zeros(bands.shape[1:] + (bands.shape[0],), dtype=np.uint8)
+    for position, band in enumerate(bands):
+        limits = stretch_limits(band)
+        if limits is None:
+            continue
+        low, high = limits
+        scaled = (band - low) * (255.0 / max(high - low, 1e-6))
+        np.clip(scaled, 0, 255, out=scaled)
+        out[..., position] = np.nan_to_num(scaled, nan=0.0)
+    return out
+
+
+def colorize_ndvi(ndvi):
+    """NDVI through the colormap LUT on the absolute -1..1 scale, like map tiles; nodata is black.
+
+    No stretch: the LUT's health breakpoints are absolute NDVI values.
+    """
+    rgba = colorize(ndvi)
+    rgba[rgba[..., 3] == 0, :3] = 0
+    return rgba[..., :3]
+
+
+def save_sizes(rgb, path_prefix, sizes=None):
+    """Write one JPEG per size from an (h, w, 3) uint8 array; returns {name: path}."""
+    sizes = sizes or PREVIEW_SIZES
+    image = Image.fromarray(rgb)
+    paths = {}
+    for name, max_side in sorted(sizes.items(), key=lambda item: -item[1]):
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+        path = f"{path_prefix}_{name}.jpg"
+        resized.save(path, "JPEG", quality=PREVIEW_QUALITY, optimize=True)
+        paths[name] = path
+        image = resized
+    return paths
+
+
+def render_rgb_previews(path_prefix, image_path=None, image=None, rgb_bands=None, sizes=None, nodata=None):
+    """True-colour previews of a multispectral stack, from `image` if already decoded, else from disk.
+
+    `rgb_bands` are the zero-based red, green, blue positions in the stack;
+    `nodata` is the decoded image's nodata value (read from the file otherwise).
+    """
+    max_side = max((sizes or PREVIEW_SIZES).values())
+    if image is not None:
+        bands = decimate_array(image[rgb_band_indexes(image.shape[0], rgb_bands)], max_side, nodata)
+    else:
+        with rasterio.open(image_path) as src:
+            indexes = rgb_band_indexes(src.count, rgb_bands)
+        bands = read_decimated(image_path, indexes, max_side)
+    return save_sizes(stretch_to_uint8(bands), path_prefix, sizes)
+
+
+def render_ndvi_previews(path_prefix, ndvi_path=None, ndvi=None, sizes=None):
+    """Colormapped NDVI previews, read from the COG's overviews unless the array is passed in."""
+    max_side = max((sizes or PREVIEW_SIZES).values())
+    if ndvi is not None:
+        values = decimate_array(ndvi, max_side)
+    else:
+        values = read_decimated(ndvi_path, [0], max_side)[0]
+    return save_sizes(colorize_ndvi(values), path_prefix, sizes)
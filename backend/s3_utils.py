@@ -1,22 +1,112 @@
+import asyncio
 import boto3
 import os
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from dotenv import load_dotenv
+from backend.executors import s3_executor
 
 load_dotenv()
 
+MB = 1024 * 1024
+
+# Point at MinIO or a moto server for local testing, e.g. http://localhost:9000
+S3_ENDPOINT_URL = os.getenv("AWS_S3_ENDPOINT_URL") or None
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+
+# One client for the whole process: boto3 clients are thread-safe and keep a connection pool
 s3 = boto3.client(
     's3',
     aws_access_key_id=os.getenv("AWS_ACCESS_KEY"),
     aws_secret_access_key=os.getenv("AWS_SECRET_KEY"),
-    region_name=os.getenv("AWS_REGION")
+    region_name=os.getenv("AWS_REGION"),
+    endpoint_url=S3_ENDPOINT_URL,
+    config=Config(
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        retries={"max_attempts": 5, "mode": "adaptive"},
+    ),
 )
 
 BUCKET_NAME = os.getenv("AWS_BUCKET_NAME")
 
+# Multipart above 16 MB, parts uploaded concurrently
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16")) * MB,
+    multipart_chunksize=int(os.getenv("S3_MULTIPART_CHUNK_MB", "16")) * MB,
+    max_concurrency=int(os.getenv("S3_MULTIPART_CONCURRENCY", "8")),
+    use_threads=True,
+)
+
+
+class S3UploadManager:
+    """Uploads through one pooled client with multipart transfers and parallel batches.
+
+    Batches run on the shared s3 executor, so /metrics reports them and
+    shutdown_executors stops them. `client`, `bucket` and `endpoint_url` can
+    be swapped for a moto/MinIO stand-in in tests.
+    """
+
+    def __init__(self, client=None, bucket=None, transfer_config=TRANSFER_CONFIG, executor=s3_executor,
+                 endpoint_url=S3_ENDPOINT_URL):
+        self.client = client or s3
+        self.bucket = bucket or BUCKET_NAME
+        self.transfer_config = transfer_config
+        self.executor = executor
+        self.endpoint_url = endpoint_url
+
+    def object_url(self, filename: str) -> str:
+        # Custom endpoints (MinIO, moto) serve path-style URLs; AWS gets the virtual-hosted form
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{filename}"
+        return f"https://{self.bucket}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{filename}"
+
+    def _extra_args(self, content_type):
+        return {"ContentType": content_type} if content_type else None
+
+    def upload_file(self, file_path: str, filename: str, content_type: str = None) -> str:
+        self.client.upload_file(
+            file_path, self.bucket, filename,
+            ExtraArgs=self._extra_args(content_type),
+            Config=self.transfer_config,
+        )
+        return self.object_url(filename)
+
+    def upload_fileobj(self, fileobj, filename: str, content_type: str = None) -> str:
+        self.client.upload_fileobj(
+            fileobj, self.bucket, filename,
+            ExtraArgs=self._extra_args(content_type),
+            Config=self.transfer_config,
+        )
+        return self.object_url(filename)
+
+    def upload_many(self, artifacts: dict) -> dict:
+        """Upload {s3_key: local_path} in parallel and return {s3_key: url}."""
+        futures = {key: self.executor.submit(self.upload_file, path, key) for key, path in artifacts.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+    async def upload_file_async(self, file_path: str, filename: str, content_type: str = None) -> str:
+        return await self.executor.run(self.upload_file, file_path, filename, content_type)
+
+    async def upload_many_async(self, artifacts: dict) -> dict:
+        """Awaitable upload_many; the event loop stays free while parts are in flight."""
+        keys = list(artifacts)
+        urls = await asyncio.gather(*(self.upload_file_async(artifacts[key], key) for key in keys))
+        return dict(zip(keys, urls))
+
+
+upload_manager = S3UploadManager()
+
+
 def upload_to_s3(file_path: str, filename: str) -> str:
     """
     Uploads a file from local disk to S3 using its file path.
     """
-    s3.upload_file(file_path, BUCKET_NAME, filename)
-    file_url = f"https://{BUCKET_NAME}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{filename}"
-    return file_url
+    return upload_manager.upload_file(file_path, filename)
+
+
+def download_from_s3(filename: str, file_path: str) -> str:
+    """
+    Downloads an S3 object to local disk and returns the local path.
+    """
+    s3.download_file(BUCKET_NAME, filename, file_path, Config=TRANSFER_CONFIG)
+    return file_path
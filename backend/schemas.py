@@ -2,7 +2,7 @@
 
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 # --- PROJECT SCHEMAS ---
@@ -11,8 +11,9 @@ class ProjectCreate(BaseModel):
     name: str
     location: str
     description: str
-    latitude: float
-    longitude: float
+    # Filled from the (cached) geocoder when left out
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 
 class ProjectRead(ProjectCreate):
@@ -23,6 +24,13 @@ class ProjectRead(ProjectCreate):
         orm_mode = True
 
 
+# --- FIELD SCHEMAS ---
+
+class FieldCreate(BaseModel):
+    name: str
+    boundary: Dict[str, Any]  # GeoJSON Polygon or MultiPolygon, EPSG:4326
+
+
 # --- NDVI RESULT SCHEMAS (Optional, for future integration) ---
 
 class NDVIResultRead(BaseModel):
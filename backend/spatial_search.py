@@ -0,0 +1,58 @@
+# backend/spatial_search.py
+"""Find NDVI results by location.
+
+Every search is an ST_Intersects against ndvi_results.raster_extent
+(EPSG:4326) with the search geometry built in SQL, so PostGIS answers it
+from the GiST index instead of scanning every row.
+"""
+import os
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.models import Field, NDVIResult
+
+
+WGS84_SRID = 4326
+DEFAULT_SEARCH_LIMIT = int(os.getenv("DEFAULT_SEARCH_LIMIT", "100"))
+MAX_SEARCH_LIMIT = int(os.getenv("MAX_SEARCH_LIMIT", "1000"))
+
+
+def parse_bbox(bbox: str):
+    """"min_lon,min_lat,max_lon,max_lat" as floats; ValueError if malformed or out of range."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat within -180..180 / -90..90")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def bbox_geometry(min_lon, min_lat, max_lon, max_lat):
+    return func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, WGS84_SRID)
+
+
+def point_geometry(lon, lat):
+    return func.ST_SetSRID(func.ST_MakePoint(lon, lat), WGS84_SRID)
+
+
+def field_geometry(field_id: int):
+    return select(Field.boundary).where(Field.id == field_id).scalar_subquery()
+
+
+def search_statement(geometry, project_id: Optional[int] = None, limit: int = DEFAULT_SEARCH_LIMIT):
+    """select() of the NDVI results whose extent intersects `geometry`, newest first."""
+    statement = select(NDVIResult).where(func.ST_Intersects(NDVIResult.raster_extent, geometry))
+    if project_id is not None:
+        statement = statement.where(NDVIResult.project_id == project_id)
+    return (
+        statement.order_by(NDVIResult.timestamp.desc(), NDVIResult.id.desc())
+        .limit(min(limit, MAX_SEARCH_LIMIT))
+    )
+
+
+def search_results(db: Session, geometry, project_id: Optional[int] = None, limit: int = DEFAULT_SEARCH_LIMIT):
+    """NDVI results whose extent intersects `geometry`, newest first."""
+    return db.scalars(search_statement(geometry, project_id, limit)).all()
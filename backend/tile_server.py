@@ -0,0 +1,387 @@
+# backend/tile_server.py
+"""Web-mercator PNG tiles rendered from stored NDVI COGs.
+
+Lookup order for a tile: in-process LRU → on-disk tile cache → render.
+Rendering reads only the overview level matching the zoom from a local
+copy of the COG (downloaded once per result), warps it to EPSG:3857 and
+colours it through the NDVI LUT.
+
+Disk tiles (TILE_CACHE_MAX_MB) and downloaded COGs (TILE_SOURCE_CACHE_MAX_MB)
+have separate byte budgets; going over one deletes its least recently used
+files (reads refresh a file's mtime). COGs are pinned while a reader has them
+open, and a copy that can't be opened is downloaded again once.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+import rasterio
+from PIL import Image
+from rasterio.enums import Resampling
+from rasterio.errors import RasterioIOError
+from rasterio.transform import from_bounds
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+
+from backend.executors import run_io
+from backend.ndvi_colormap import COLORMAP_VERSION, colorize
+from backend.ndvi_processor import extract_s3_key_from_url
+from backend.s3_utils import download_from_s3
+
+
+TILE_SIZE = 256
+TILE_MAX_ZOOM = int(os.getenv("TILE_MAX_ZOOM", "24"))
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", "tile_cache")
+TILE_MEMORY_CACHE_TILES = int(os.getenv("TILE_MEMORY_CACHE_TILES", "2048"))
+TILE_MAX_AGE = int(os.getenv("TILE_MAX_AGE", "86400"))
+# Bytes the rendered PNG tiles on disk may use; 0 disables the limit
+TILE_CACHE_MAX_BYTES = int(os.getenv("TILE_CACHE_MAX_MB", "2048")) * 1024 * 1024
+# Bytes the downloaded source COGs may use; 0 disables the limit
+TILE_SOURCE_CACHE_MAX_BYTES = int(os.getenv("TILE_SOURCE_CACHE_MAX_MB", "2048")) * 1024 * 1024
+# An eviction sweep stops once usage is back under this share of the budget
+TILE_CACHE_LOW_WATER = float(os.getenv("TILE_CACHE_LOW_WATER", "0.9"))
+
+WEB_MERCATOR = "EPSG:3857"
+MERCATOR_HALF_WORLD = 20037508.342789244
+
+
+class TileLRU:
+    """Thread-safe LRU of rendered PNG bytes, bounded by tile count."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            png = self._tiles.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._tiles[key] = png
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.capacity:
+                self._tiles.popitem(last=False)
+
+    def stats(self):
+        return {"tiles": len(self._tiles), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+class DiskBudget:
+    """Byte budget for the files under `root`, evicting the least recently used first.
+
+    Usage is counted from disk on first use and then kept up to date as files
+    are added. Partial downloads, temp files and pinned paths are never evicted.
+    """
+
+    def __init__(self, root, max_bytes, low_water=TILE_CACHE_LOW_WATER, on_evict=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.on_evict = on_evict
+        self._used = None
+        self._lock = threading.Lock()
+        self._pins = {}
+        self.evictions = 0
+
+    def _files(self):
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith((".tmp", ".download")):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def touch(self, path):
+        """Mark a cached file as just used."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def pin(self, path):
+        """Keep `path` from being evicted until a matching unpin()."""
+        with self._lock:
+            self._pins[path] = self._pins.get(path, 0) + 1
+
+    def unpin(self, path):
+        with self._lock:
+            count = self._pins.pop(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+
+    def discard(self, path):
+        """Delete a cached file (e.g. an unreadable download) and stop counting it."""
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            if self._used is not None:
+                self._used -= size
+        if self.on_evict is not None:
+            self.on_evict(path)
+
+    def added(self, path, size):
+        """Account for a new file at `path`, evicting older files if that puts the cache over budget."""
+        with self._lock:
+            if self._used is None:
+                self._used = sum(size for _, size, _ in self._files())
+            else:
+                self._used += size
+            if self.max_bytes > 0 and self._used > self.max_bytes:
+                self._sweep(keep=path)
+
+    def _sweep(self, keep):
+        files = sorted(self._files())
+        used = sum(size for _, size, _ in files)
+        target = self.max_bytes * self.low_water
+        for _, size, path in files:
+            if used <= target:
+                break
+            if path == keep or path in self._pins:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            used -= size
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(path)
+        self._used = used
+
+    def stats(self):
+        return {
+            "bytes": self._used,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "pinned": len(self._pins),
+        }
+
+
+tile_cache = TileLRU(TILE_MEMORY_CACHE_TILES)
+
+_source_lock = threading.Lock()
+_download_locks = {}
+_source_info = {}
+
+disk_cache = DiskBudget(os.path.join(TILE_CACHE_DIR, "tiles"), TILE_CACHE_MAX_BYTES)
+source_cache = DiskBudget(
+    os.path.join(TILE_CACHE_DIR, "sources"), TILE_SOURCE_CACHE_MAX_BYTES,
+    on_evict=lambda path: _source_info.pop(path, None),
+)
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def mercator_tile_bounds(z, x, y):
+    """(left, bottom, right, top) of an XYZ tile in EPSG:3857 metres."""
+    size = 2 * MERCATOR_HALF_WORLD / 2 ** z
+    left = -MERCATOR_HALF_WORLD + x * size
+    top = MERCATOR_HALF_WORLD - y * size
+    return left, top - size, left + size, top
+
+
+def _source_id(cog_url):
+    # COG keys include the input hash and the NDVI pipeline version (see ndvi_service), so the
+    # object behind a URL is never rewritten with different pixels and the URL identifies them
+    return hashlib.sha1(f"{cog_url}|{COLORMAP_VERSION}".encode()).hexdigest()
+
+
+def tile_etag(cog_url, z, x, y):
+    return f'"{_source_id(cog_url)[:16]}-{z}-{x}-{y}"'
+
+
+def _tile_path(cog_url, z, x, y):
+    return os.path.join(TILE_CACHE_DIR, "tiles", _source_id(cog_url), str(z), str(x), f"{y}.png")
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    disk_cache.added(path, len(data))
+
+
+def source_path(cog_url):
+    return os.path.join(source_cache.root, f"{hashlib.sha1(cog_url.encode()).hexdigest()}.tif")
+
+
+def local_source(cog_url):
+    """Path of a local copy of the COG, downloading it on first use.
+
+    Use it inside pinned_sources() so the copy can't be evicted before it is opened.
+    """
+    path = source_path(cog_url)
+    if os.path.exists(path):
+        source_cache.touch(path)
+        return path
+
+    with _source_lock:
+        lock = _download_locks.setdefault(path, threading.Lock())
+    with lock:
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.download"
+            download_from_s3(extract_s3_key_from_url(cog_url), temp_path)
+            os.replace(temp_path, path)
+            source_cache.added(path, os.path.getsize(path))
+    return path
+
+
+def refresh_source(cog_url):
+    """Download the COG again if its local copy is missing or can't be opened."""
+    path = source_path(cog_url)
+    try:
+        with rasterio.open(path):
+            return path
+    except RasterioIOError:
+        source_cache.discard(path)
+    return local_source(cog_url)
+
+
+@contextmanager
+def pinned_sources(cog_urls):
+    """Keep the local copies of these COGs from being evicted inside the block."""
+    paths = [source_path(cog_url) for cog_url in cog_urls]
+    for path in paths:
+        source_cache.pin(path)
+    try:
+        yield paths
+    finally:
+        for path in paths:
+            source_cache.unpin(path)
+
+
+async def with_local_sources(cog_urls, work):
+    """`await work(paths)` on pinned local copies of the COGs.
+
+    If a copy can't be opened (deleted or truncated on disk), the broken
+    copies are downloaded again and `work` is retried once.
+    """
+    with pinned_sources(cog_urls):
+        paths = await asyncio.gather(*(run_io(local_source, cog_url) for cog_url in cog_urls))
+        try:
+            return await work(paths)
+        except RasterioIOError:
+            await asyncio.gather(*(run_io(refresh_source, cog_url) for cog_url in cog_urls))
+            return await work(paths)
+
+
+def _describe_source(path):
+    info = _source_info.get(path)
+    if info is None:
+        with rasterio.open(path) as src:
+            bounds = transform_bounds(src.crs, WEB_MERCATOR, *src.bounds)
+            info = {
+                "bounds": bounds,
+                "resolution": (bounds[2] - bounds[0]) / src.width,
+                "overviews": src.overviews(1),
+                "scale": src.scales[0] if src.scales else 1.0,
+            }
+        _source_info[path] = info
+    return info
+
+
+def _overview_level(info, tile_resolution):
+    """Coarsest overview that is still at least as fine as the tile's pixels."""
+    level = None
+    for index, factor in enumerate(info["overviews"]):
+        if info["resolution"] * factor <= tile_resolution:
+            level = index
+    return level
+
+
+def encode_png(rgba):
+    buffer = BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def render_tile(source_path, z, x, y):
+    left, bottom, right, top = mercator_tile_bounds(z, x, y)
+    info = _describe_source(source_path)
+    src_left, src_bottom, src_right, src_top = info["bounds"]
+    if right <= src_left or left >= src_right or top <= src_bottom or bottom >= src_top:
+        return EMPTY_TILE
+
+    level = _overview_level(info, (right - left) / TILE_SIZE)
+    open_options = {"overview_level": level} if level is not None else {}
+    with rasterio.open(source_path, **open_options) as src:
+        nodata = src.nodata
+        with WarpedVRT(
+            src,
+            crs=WEB_MERCATOR,
+            transform=from_bounds(left, bottom, right, top, TILE_SIZE, TILE_SIZE),
+            width=TILE_SIZE,
+            height=TILE_SIZE,
+            resampling=Resampling.bilinear,
+            src_nodata=nodata,
+            nodata=nodata,
+        ) as vrt:
+            data = vrt.read(1, out_dtype="float32")
+
+    if nodata is not None:
+        data[data == nodata] = np.nan
+    if info["scale"] != 1.0:
+        data *= np.float32(info["scale"])
+    return encode_png(colorize(data))
+
+
+def load_or_render_tile(cog_url, z, x, y):
+    path = _tile_path(cog_url, z, x, y)
+    try:
+        with open(path, "rb") as f:
+            png = f.read()
+        disk_cache.touch(path)
+        return png
+    except FileNotFoundError:
+        pass
+
+    with pinned_sources([cog_url]):
+        try:
+            png = render_tile(local_source(cog_url), z, x, y)
+        except RasterioIOError:
+            png = render_tile(refresh_source(cog_url), z, x, y)
+    _write_atomic(path, png)
+    return png
+
+
+async def get_tile(cog_url, z, x, y):
+    key = (cog_url, z, x, y)
+    png = tile_cache.get(key)
+    if png is None:
+        png = await run_io(load_or_render_tile, cog_url, z, x, y)
+        tile_cache.put(key, png)
+    return png
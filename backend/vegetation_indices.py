@@ -0,0 +1,190 @@
+# backend/vegetation_indices.py
+import ast
+import os
+import numpy as np
+import rasterio
+from backend.cog_writer import FLOAT32_NODATA, COGWriter
+from backend.ndvi_processor import DEFAULT_TILE_SIZE, iter_tile_windows
+from backend.ndvi_stats import NDVIStatsAccumulator
+
+
+# Zero-based band positions in the uploaded stack, e.g. "blue,green,red,nir,rededge"
+BAND_ORDER = os.getenv("NDVI_BAND_ORDER", "blue,green,red,nir,rededge").split(",")
+DEFAULT_BAND_MAP = {name.strip(): index for index, name in enumerate(BAND_ORDER)}
+# True-colour preview bands, if the stack has them
+RGB_BAND_INDEXES = (
+    [DEFAULT_BAND_MAP[name] for name in ("red", "green", "blue")]
+    if all(name in DEFAULT_BAND_MAP for name in ("red", "green", "blue")) else None
+)
+
+# SAVI and EVI assume surface reflectance; pass reflectance_scale to convert DNs
+INDEX_EXPRESSIONS = {
+    "NDVI": "(nir - red) / (nir + red)",
+    "NDRE": "(nir - rededge) / (nir + rededge)",
+    "GNDVI": "(nir - green) / (nir + green)",
+    "SAVI": "1.5 * (nir - red) / (nir + red + 0.5)",
+    "EVI": "2.5 * (nir - red) / (nir + 6 * red - 7.5 * blue + 1)",
+}
+
+NODATA = FLOAT32_NODATA
+
+_BINARY_OPS = {
+    ast.Add: "add",
+    ast.Sub: "sub",
+    ast.Mult: "mul",
+    ast.Div: "div",
+}
+_COMMUTATIVE = {"add", "mul"}
+
+
+def resolve_expressions(indices):
+    """Turn index names or "NAME=expression" strings into {name: expression}."""
+    expressions = {}
+    for item in indices:
+        item = item.strip()
+        if "=" in item:
+            name, expression = item.split("=", 1)
+            expressions[name.strip()] = expression.strip()
+        elif item.upper() in INDEX_EXPRESSIONS:
+            expressions[item.upper()] = INDEX_EXPRESSIONS[item.upper()]
+        else:
+            raise ValueError(f"Unknown vegetation index: {item}")
+    return expressions
+
+
+def validate_indices(indices, band_map=None):
+    """Raise ValueError for unknown names, bad expressions or bands missing from the band map."""
+    band_map = band_map or DEFAULT_BAND_MAP
+    program = IndexProgram(resolve_expressions(indices))
+    missing = [band for band in program.bands if band not in band_map]
+    if missing:
+        raise ValueError(f"No band position configured for: {', '.join(missing)}")
+    return program
+
+
+class IndexProgram:
+    """A set of index expressions compiled into one deduplicated evaluation plan.
+
+    Every distinct sub-expression (including commutative rewrites such as
+    `red + nir` vs `nir + red`) becomes a single node, so band sums and
+    differences shared between indices are computed once per evaluation.
+    """
+
+    def __init__(self, expressions):
+        self.nodes = {}
+        self.outputs = {}
+        for name, expression in expressions.items():
+            try:
+                tree = ast.parse(expression, mode="eval").body
+            except SyntaxError:
+                raise ValueError(f"Invalid expression for {name}: {expression}")
+            self.outputs[name] = self._add(tree)
+            # A constants-only expression would be a scalar, not a raster band
+            if not self._uses_band(self.outputs[name]):
+                raise ValueError(f"Index {name} must reference at least one band: {expression}")
+        self._last_use = self._compute_last_use()
+
+    @property
+    def bands(self):
+        return sorted(key[1] for key in self.nodes if key[0] == "band")
+
+    def _add(self, tree):
+        if isinstance(tree, ast.Name):
+            key = ("band", tree.id)
+        elif isinstance(tree, ast.Constant) and isinstance(tree.value, (int, float)):
+            key = ("const", float(tree.value))
+        elif isinstance(tree, ast.UnaryOp) and isinstance(tree.op, ast.USub):
+            key = ("neg", self._add(tree.operand))
+        elif isinstance(tree, ast.UnaryOp) and isinstance(tree.op, ast.UAdd):
+            return self._add(tree.operand)
+        elif isinstance(tree, ast.BinOp) and type(tree.op) in _BINARY_OPS:
+            op = _BINARY_OPS[type(tree.op)]
+            left, right = self._add(tree.left), self._add(tree.right)
+            if op in _COMMUTATIVE:
+                left, right = sorted((left, right), key=repr)
+            key = (op, left, right)
+        else:
+            raise ValueError(f"Unsupported expression element: {ast.dump(tree)}")
+
+        self.nodes.setdefault(key, len(self.nodes))
+        return key
+
+    def _uses_band(self, key):
+        return key[0] == "band" or any(isinstance(child, tuple) and self._uses_band(child) for child in key[1:])
+
+    def _compute_last_use(self):
+        last_use = {}
+        for position, key in enumerate(self.nodes):
+            for child in key[1:]:
+                if isinstance(child, tuple):
+                    last_use[child] = position
+        return last_use
+
+    def evaluate(self, bands):
+        """Evaluate all outputs over float32 band arrays; returns {name: array}."""
+        values = {}
+        keep = set(self.outputs.values())
+        for position, key in enumerate(self.nodes):
+            kind = key[0]
+            if kind == "band":
+                values[key] = bands[key[1]]
+            elif kind == "const":
+                values[key] = np.float32(key[1])
+            elif kind == "neg":
+                values[key] = np.negative(values[key[1]])
+            else:
+                left, right = values[key[1]], values[key[2]]
+                if kind == "add":
+                    values[key] = np.add(left, right, dtype=np.float32)
+                elif kind == "sub":
+                    values[key] = np.subtract(left, right, dtype=np.float32)
+                elif kind == "mul":
+                    values[key] = np.multiply(left, right, dtype=np.float32)
+                else:
+                    shape = np.broadcast_shapes(np.shape(left), np.shape(right))
+                    out = np.full(shape, np.nan, dtype=np.float32)
+                    values[key] = np.divide(left, right, out=out, where=right != 0)
+
+            # Drop intermediates as soon as nothing downstream needs them
+            for child in key[1:]:
+                if isinstance(child, tuple) and self._last_use.get(child) == position and child not in keep:
+                    values.pop(child, None)
+
+        return {name: values[key] for name, key in self.outputs.items()}
+
+
+def compute_indices_to_cog(image_path, indices, output_path, band_map=None, reflectance_scale=1.0,
+                           tile_size=DEFAULT_TILE_SIZE):
+    """Compute several vegetation indices in one windowed pass and write them as one multiband COG.
+
+    Each tile reads only the bands the indices reference, evaluates the
+    shared IndexProgram once, and writes every index into its own band.
+    Returns {"path", "bands", "stats"} with per-index NDVIStatsAccumulator results.
+    """
+    band_map = band_map or DEFAULT_BAND_MAP
+    program = validate_indices(indices, band_map)
+    names = list(program.outputs)
+
+    stats = {name: NDVIStatsAccumulator(health_classes=name == "NDVI") for name in names}
+
+    with rasterio.open(image_path) as src:
+        band_indexes = [band_map[band] + 1 for band in program.bands]
+        # Indices like EVI range past the int16 scaling, so always float32 here
+        with COGWriter(output_path, src.width, src.height, src.crs, src.transform, count=len(names),
+                       encoding="float32", descriptions=names) as dst:
+            for window in iter_tile_windows(src.width, src.height, tile_size):
+                data = src.read(band_indexes, window=window, out_dtype="float32")
+                if reflectance_scale != 1.0:
+                    data *= np.float32(reflectance_scale)
+                results = program.evaluate(dict(zip(program.bands, data)))
+
+                for output_index, name in enumerate(names, start=1):
+                    values = results[name]
+                    stats[name].update(values)
+                    dst.write(values, output_index, window=window)
+
+    return {
+        "path": output_path,
+        "bands": names,
+        "stats": {name: accumulator.result() for name, accumulator in stats.items()},
+    }
@@ -0,0 +1,138 @@
+# backend/zonal_stats.py
+import numpy as np
+import rasterio
+from rasterio.features import rasterize
+from rasterio.warp import transform_geom
+from rasterio.windows import Window, from_bounds
+from shapely.geometry import shape
+
+from backend.cog_writer import read_values
+from backend.ndvi_processor import DEFAULT_TILE_SIZE, iter_tile_windows
+from backend.ndvi_stats import (
+    HEALTHY_THRESHOLD,
+    HISTOGRAM_BINS,
+    STRESSED_THRESHOLD,
+    NDVIStatsAccumulator,
+)
+
+
+class ZonalStatsAccumulator:
+    """NDVIStatsAccumulator for many zones at once.
+
+    `update` takes a label mask (0 = outside every zone, 1..zones) and the
+    matching NDVI values and folds every zone's count, sums, extrema,
+    health classes and histogram in with a handful of bincounts, instead
+    of masking the raster once per zone.
+    """
+
+    def __init__(self, zones, bins=HISTOGRAM_BINS, value_range=(-1.0, 1.0),
+                 stressed_threshold=STRESSED_THRESHOLD, healthy_threshold=HEALTHY_THRESHOLD):
+        self.size = zones + 1
+        self.bins = bins
+        self.value_range = value_range
+        self.stressed_threshold = stressed_threshold
+        self.healthy_threshold = healthy_threshold
+
+        self.count = np.zeros(self.size, dtype=np.int64)
+        self.total = np.zeros(self.size)
+        self.total_sq = np.zeros(self.size)
+        self.min = np.full(self.size, np.inf)
+        self.max = np.full(self.size, -np.inf)
+        self.unhealthy = np.zeros(self.size, dtype=np.int64)
+        self.healthy = np.zeros(self.size, dtype=np.int64)
+        self.histogram = np.zeros((self.size, bins), dtype=np.int64)
+
+    def update(self, labels, values):
+        valid = (labels > 0) & np.isfinite(values)
+        zone = labels[valid].astype(np.intp)
+        if not zone.size:
+            return self
+        value = values[valid].astype(np.float64)
+
+        self.count += np.bincount(zone, minlength=self.size)
+        self.total += np.bincount(zone, weights=value, minlength=self.size)
+        self.total_sq += np.bincount(zone, weights=value * value, minlength=self.size)
+        np.minimum.at(self.min, zone, value)
+        np.maximum.at(self.max, zone, value)
+        self.unhealthy += np.bincount(zone[value < self.stressed_threshold], minlength=self.size)
+        self.healthy += np.bincount(zone[value >= self.healthy_threshold], minlength=self.size)
+
+        low, high = self.value_range
+        bin_index = ((value - low) * (self.bins / (high - low))).astype(np.intp)
+        np.clip(bin_index, 0, self.bins - 1, out=bin_index)
+        self.histogram += np.bincount(
+            zone * self.bins + bin_index, minlength=self.size * self.bins
+        ).reshape(self.size, self.bins)
+        return self
+
+    def zone_accumulator(self, zone):
+        """The zone's totals as a plain NDVIStatsAccumulator (for percentiles and `result`)."""
+        accumulator = NDVIStatsAccumulator(
+            bins=self.bins, value_range=self.value_range,
+            stressed_threshold=self.stressed_threshold, healthy_threshold=self.healthy_threshold,
+        )
+        accumulator.count = int(self.count[zone])
+        accumulator.total = float(self.total[zone])
+        accumulator.total_sq = float(self.total_sq[zone])
+        accumulator.min = float(self.min[zone])
+        accumulator.max = float(self.max[zone])
+        accumulator.unhealthy = int(self.unhealthy[zone])
+        accumulator.healthy = int(self.healthy[zone])
+        accumulator.histogram = self.histogram[zone].copy()
+        return accumulator
+
+    def results(self):
+        return {zone: self.zone_accumulator(zone).result() for zone in range(1, self.size)}
+
+
+def _zone_region(src, geometries):
+    """Pixel window covering every zone, clipped to the raster (None if no overlap)."""
+    bounds = np.array([shape(geometry).bounds for geometry in geometries])
+    window = from_bounds(bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(), bounds[:, 3].max(),
+                         transform=src.transform)
+    window = window.round_offsets(op="floor").round_lengths(op="ceil")
+    try:
+        return window.intersection(Window(0, 0, src.width, src.height))
+    except Exception:
+        return None
+
+
+def compute_zonal_stats(ndvi_path, zones, tile_size=DEFAULT_TILE_SIZE):
+    """Per-zone NDVI statistics for {zone_id: GeoJSON geometry in EPSG:4326}.
+
+    Zones are rasterized window by window into one label mask (pixel
+    centres inside a polygon; where zones overlap, the later one wins) and
+    only windows over the zones' combined extent are read.
+    Returns {zone_id: NDVIStatsAccumulator result}.
+    """
+    zone_ids = list(zones)
+    if not zone_ids:
+        return {}
+    accumulator = ZonalStatsAccumulator(len(zone_ids))
+
+    with rasterio.open(ndvi_path) as src:
+        geometries = [transform_geom("EPSG:4326", src.crs, zones[zone_id]) for zone_id in zone_ids]
+        bounds = np.array([shape(geometry).bounds for geometry in geometries])
+        region = _zone_region(src, geometries)
+
+        if region is not None:
+            for tile in iter_tile_windows(int(region.width), int(region.height), tile_size):
+                window = Window(region.col_off + tile.col_off, region.row_off + tile.row_off, tile.width, tile.height)
+                left, bottom, right, top = rasterio.windows.bounds(window, src.transform)
+                overlapping = np.nonzero(
+                    (bounds[:, 0] <= right) & (bounds[:, 2] >= left) & (bounds[:, 1] <= top) & (bounds[:, 3] >= bottom)
+                )[0]
+                if not overlapping.size:
+                    continue
+
+                labels = rasterize(
+                    ((geometries[index], index + 1) for index in overlapping),
+                    out_shape=(int(window.height), int(window.width)),
+                    transform=src.window_transform(window),
+                    fill=0,
+                    dtype="uint32",
+                )
+                accumulator.update(labels, read_values(src, window=window))
+
+    results = accumulator.results()
+    return {zone_id: results[index + 1] for index, zone_id in enumerate(zone_ids)}
@@ -11,6 +11,7 @@ import { Progress } from "@/components/ui/progress"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { AlertCircle, Calendar, Check, FileImage, Info, Upload, X } from "lucide-react"
 import { cn } from "@/lib/utils"
+import { fetchAllPages } from "@/lib/pagination"
 
 interface AddProjectImagesProps {
   projectId: string
@@ -41,8 +42,7 @@ export default function AddProjectImages({ projectId }: AddProjectImagesProps) {
   useEffect(() => {
     const fetchImages = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:8000/project-images/")
-        const data = await response.json()
+        const data = await fetchAllPages<ProjectImage>("http://127.0.0.1:8000/project-images/")
         setExistingImages(data)
       } catch (err) {
         console.error("Error fetching images:", err)
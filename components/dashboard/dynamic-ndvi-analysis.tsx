@@ -23,6 +23,7 @@ import {
 import { cn } from "@/lib/utils"
 import NDVITimelineSlider from "@/components/dashboard/ndvi-timeline-slider"
 import NDVIStatistics from "@/components/dashboard/ndvi-statistics"
+import { fetchAllPages } from "@/lib/pagination"
 
 interface NDVIImage {
   id: string
@@ -54,8 +55,7 @@ export default function DynamicNDVIAnalysis() {
   useEffect(() => {
     const fetchNDVIData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:8000/ndvi-data")
-        const data = await response.json()
+        const data = await fetchAllPages<NDVIImage>("http://127.0.0.1:8000/ndvi-data")
         setNdviImages(data)
       } catch (error) {
         console.error("Error fetching NDVI data:", error)
@@ -11,6 +11,7 @@ import {
   Calendar,
   RefreshCw,
 } from "lucide-react"
+import { fetchAllPages } from "@/lib/pagination"
 
 interface NDVIViewerProps {
   projectId: string
@@ -32,8 +33,7 @@ export default function NDVIViewer({ projectId }: NDVIViewerProps) {
   useEffect(() => {
     const fetchNDVI = async () => {
       try {
-        const res = await fetch(`http://localhost:8000/projects/${projectId}/ndvi`);
-        const data = await res.json();
+        const data = await fetchAllPages<any>(`http://localhost:8000/projects/${projectId}/ndvi`);
         setNdviImages(data)
       } catch (err) {
         console.error("Failed to fetch NDVI images:", err);
@@ -25,6 +25,7 @@ import {
   Search,
 } from "lucide-react"
 import Link from "next/link"
+import { fetchAllPages } from "@/lib/pagination"
 
 interface Project {
   id: string
@@ -45,8 +46,7 @@ export default function ProjectsList() {
     const fetchProjects = async () => {
       setLoading(true)
       try {
-        const res = await fetch("http://localhost:8000/projects")
-        const data = await res.json()
+        const data = await fetchAllPages<Project>("http://localhost:8000/projects")
         const enriched = data.map((project: any) => ({
           ...project,
           status: "Active", // You can adjust logic here if needed
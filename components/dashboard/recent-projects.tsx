@@ -29,8 +29,9 @@ export default function RecentProjects() {
     const fetchProjects = async () => {
       setLoading(true)
       try {
-        const res = await fetch("http://localhost:8000/projects")
-        const data = await res.json()
+        // The API lists newest first, so the first page of 3 is all this card needs
+        const res = await fetch("http://localhost:8000/projects?limit=3")
+        const { items: data } = await res.json()
 
         // Enrich with placeholder imageCount if needed
         const enriched = data.map((project: any) => ({
@@ -0,0 +1,39 @@
+// Keyset-paginated list endpoints return { items, next_cursor }; next_cursor is null on the last page
+export type Page<T> = {
+  items: T[]
+  next_cursor: string | null
+}
+
+function pageUrl(url: string, cursor: string | null, limit?: number) {
+  const params = new URLSearchParams()
+  if (cursor) params.set("cursor", cursor)
+  if (limit) params.set("limit", String(limit))
+  const query = params.toString()
+  if (!query) return url
+  return `${url}${url.includes("?") ? "&" : "?"}${query}`
+}
+
+export async function fetchPage<T>(
+  url: string,
+  cursor: string | null = null,
+  limit?: number,
+  init?: RequestInit,
+): Promise<Page<T>> {
+  const res = await fetch(pageUrl(url, cursor, limit), init)
+  if (!res.ok) {
+    throw new Error(`Failed to fetch ${url}: ${res.status}`)
+  }
+  return res.json()
+}
+
+// Follows next_cursor until the last page, so lists aren't cut off at the first page
+export async function fetchAllPages<T>(url: string, init?: RequestInit, limit = 200): Promise<T[]> {
+  const items: T[] = []
+  let cursor: string | null = null
+  do {
+    const page: Page<T> = await fetchPage<T>(url, cursor, limit, init)
+    items.push(...page.items)
+    cursor = page.next_cursor
+  } while (cursor)
+  return items
+}
@@ -1,16 +1,22 @@
 from fastapi import FastAPI, UploadFile, File, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from backend.models import UploadedFile
-from sqlalchemy.orm import Session
-from backend.database import SessionLocal, engine, Base
-import boto3
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import engine, Base, get_async_db, pool_metrics, async_engine, async_pool_metrics
 import os
 from uuid import uuid4
 from typing import List
-from io import BytesIO  
 
 from backend.ndvi_routes import router as ndvi_router
 from backend.image_routes import router as project_router
+from backend.job_routes import router as job_router
+from backend.field_routes import router as field_router
+from backend.executors import run_io, shutdown_executors, executor_stats
+from backend.s3_utils import upload_manager
+from backend.jobs import JOB_WORKERS, start_job_workers, stop_job_workers
+from backend.insights import INSIGHT_WORKERS, start_insight_workers, stop_insight_workers
+from backend.mars_client import insights_service
+from backend.tile_server import disk_cache, source_cache, tile_cache
 
 # FastAPI app
 app = FastAPI()
@@ -25,53 +31,64 @@ app.add_middleware(
 
 app.include_router(ndvi_router)
 app.include_router(project_router)
+app.include_router(job_router)
+app.include_router(field_router)
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
-# Dependency for DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+@app.on_event("startup")
+async def start_workers():
+    # JOB_WORKERS=0 leaves processing to standalone `python -m backend.jobs` workers
+    if JOB_WORKERS > 0:
+        start_job_workers(JOB_WORKERS)
+    # INSIGHT_WORKERS=0 leaves AI enrichment to `python -m backend.insights`
+    if INSIGHT_WORKERS > 0:
+        start_insight_workers(INSIGHT_WORKERS)
+
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await stop_job_workers()
+    await stop_insight_workers()
+    shutdown_executors()
+    await async_engine.dispose()
 
 @app.get("/")
 def health_check():
     return {"status": "running"}
 
 
+@app.get("/metrics")
+def metrics():
+    """Per-process counters: DB pool checkouts/waits/overflow (sync and async engines), executor queues, caches."""
+    return {
+        "pid": os.getpid(),
+        "db_pool": pool_metrics.snapshot(),
+        "db_pool_async": async_pool_metrics.snapshot(),
+        "executors": executor_stats(),
+        "tile_cache": tile_cache.stats(),
+        "tile_disk_cache": disk_cache.stats(),
+        "tile_source_cache": source_cache.stats(),
+        "insights": insights_service.stats(),
+    }
+
+
 # Upload endpoint
 @app.post("/upload/")
 async def upload_file(
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_KEY"),
-        region_name=os.getenv("AWS_REGION"),
-    )
-    bucket_name = os.getenv("AWS_BUCKET_NAME")
     uploaded_data = []
 
     for file in files:
-        contents = await file.read()
         filename = f"{uuid4()}_{file.filename}"
 
-        # ✅ Wrap the content in BytesIO so it acts like a file
-        file_obj = BytesIO(contents)
-
-        s3.upload_fileobj(
-            Fileobj=file_obj,
-            Bucket=bucket_name,
-            Key=filename,
-            ExtraArgs={"ContentType": file.content_type},
-        )
-
-        s3_url = f"https://{bucket_name}.s3.amazonaws.com/{filename}"
+        # Stream the spooled request file straight into a multipart upload instead of
+        # reading it into memory; the pooled client runs off the event loop
+        s3_url = await run_io(upload_manager.upload_fileobj, file.file, filename, file.content_type)
 
         # Save metadata in the database
         db_file = UploadedFile(
@@ -86,6 +103,7 @@ async def upload_file(
             "s3_url": s3_url,
         })
 
-    db.commit()
+    # Async session, so the commit doesn't block the event loop
+    await db.commit()
 
     return {"files": uploaded_data}
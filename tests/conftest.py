@@ -0,0 +1,54 @@
+# tests/conftest.py
+"""Shared fixtures: a throwaway SQLite database behind the app's own engines.
+
+The engines are built from DATABASE_URL when backend.database is imported,
+so it is set here first. SQLite has no PostGIS, so geometry columns are
+created as plain text and GeoAlchemy's spatial indexes are skipped; none of
+these tests read geometries back.
+"""
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="ndvi-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["GEOCODER"] = "offline"
+
+import asyncio  # noqa: E402
+
+import pytest  # noqa: E402
+from sqlalchemy import String  # noqa: E402
+
+from backend import models  # noqa: E402,F401  (registers the tables)
+from backend.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine  # noqa: E402
+
+for table in Base.metadata.tables.values():
+    for column in table.columns:
+        if type(column.type).__name__ == "Geometry":
+            column.type = String()
+    table.indexes = {index for index in table.indexes if not index.name.startswith("idx_")}
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def run_async():
+    """Run a coroutine to completion, closing the async pool's connections on the same loop."""
+    def run(coroutine_function):
+        async def main():
+            try:
+                async with AsyncSessionLocal() as session:
+                    return await coroutine_function(session)
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run
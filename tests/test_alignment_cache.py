@@ -0,0 +1,19 @@
+import os
+
+from backend.coregistration import Alignment, AlignmentCache
+
+
+def test_disk_entries_are_capped_like_the_memory_lru(tmp_path):
+    cache = AlignmentCache(directory=str(tmp_path), capacity=2)
+    cache.put("a", Alignment(dy=1.0))
+    cache.put("b", Alignment(dy=2.0))
+    os.utime(cache._path("a"), (1000, 1000))
+    os.utime(cache._path("b"), (2000, 2000))
+
+    # A fresh process reads "a" from disk, which makes "b" the least recently used file
+    reader = AlignmentCache(directory=str(tmp_path), capacity=2)
+    assert reader.get("a") == Alignment(dy=1.0)
+    reader.put("c", Alignment(dy=3.0))
+
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(cache._path(k)) for k in ("a", "c"))
+    assert AlignmentCache(directory=str(tmp_path), capacity=2).get("b") is None
@@ -0,0 +1,22 @@
+import asyncio
+import os
+
+import pytest
+
+from backend.executors import BoundedExecutor, ExecutorBusy, ExecutorRestarted, _process_pool
+
+
+def test_dead_worker_restarts_the_pool():
+    executor = BoundedExecutor("raster", _process_pool, max_workers=1, queue_depth=1)
+
+    async def scenario():
+        with pytest.raises(ExecutorRestarted) as error:
+            await executor.run(os._exit, 1)
+        assert isinstance(error.value, ExecutorBusy)
+        return await executor.run(pow, 2, 5)
+
+    try:
+        assert asyncio.run(scenario()) == 32
+        assert executor.stats()["in_flight"] == 0
+    finally:
+        executor.shutdown()
@@ -0,0 +1,39 @@
+from backend.geocoding import GeocodingService, OfflineGeocoder, normalize_location
+from backend.models import GeocodeCacheEntry
+
+
+def test_normalize_location_ignores_case_and_spacing():
+    assert normalize_location(" Nakuru ,  KENYA ") == normalize_location("nakuru, kenya") == "nakuru, kenya"
+
+
+def test_each_location_is_looked_up_once(db):
+    geocoder = OfflineGeocoder({"Nakuru, Kenya": (-0.3031, 36.08)})
+    service = GeocodingService(geocoder=geocoder)
+
+    first = service.geocode(db, "Nakuru, Kenya")
+    again = service.geocode(db, "  nakuru,KENYA ")
+
+    assert first == again == {"latitude": -0.3031, "longitude": 36.08}
+    assert geocoder.lookups == 1
+
+
+def test_database_cache_survives_the_in_process_cache(db):
+    geocoder = OfflineGeocoder({"Eldoret": (0.5143, 35.2698)})
+    GeocodingService(geocoder=geocoder).geocode(db, "Eldoret")
+
+    # A new process starts with an empty LRU but the same table
+    restarted = GeocodingService(geocoder=geocoder)
+    assert restarted.geocode(db, "ELDORET") == {"latitude": 0.5143, "longitude": 35.2698}
+    assert geocoder.lookups == 1
+    entry = db.query(GeocodeCacheEntry).one()
+    assert (entry.location_key, entry.provider) == ("eldoret", "offline")
+
+
+def test_no_match_is_cached_too(db):
+    geocoder = OfflineGeocoder()
+    service = GeocodingService(geocoder=geocoder)
+
+    assert service.geocode(db, "Atlantis") == {"latitude": None, "longitude": None}
+    service.clear_memory()
+    assert service.geocode(db, "atlantis") == {"latitude": None, "longitude": None}
+    assert geocoder.lookups == 1
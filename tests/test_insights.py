@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from backend import insights
+from backend.models import NDVIInsight, NDVIResult, Project
+
+
+def _result(db):
+    project = Project(name="farm", latitude=-1.2, longitude=36.8)
+    db.add(project)
+    db.commit()
+    result = NDVIResult(filename="a.tif", s3_url="s3://a.jpg", original_url="s3://a.tif", timestamp=datetime.utcnow(),
+                        project_id=project.id)
+    db.add(result)
+    db.commit()
+    return result.id
+
+
+def test_queue_insight_keeps_one_row_per_result(db):
+    result_id = _result(db)
+
+    first = insights.queue_insight(db, result_id, "uploads/a.tif")
+    again = insights.queue_insight(db, result_id, "uploads/a.tif")
+
+    assert first.id == again.id
+    assert db.query(NDVIInsight).count() == 1
+
+
+def test_insights_are_claimed_once_and_reclaimed_after_the_lease(db):
+    insight = insights.queue_insight(db, _result(db), "uploads/a.tif")
+
+    claimed = insights.claim_next_insight(db, "w1")
+    assert (claimed.id, claimed.status, claimed.attempts) == (insight.id, "running", 1)
+    assert insights.claim_next_insight(db, "w2") is None
+
+    claimed.started_at = datetime.utcnow() - timedelta(seconds=insights.INSIGHT_LEASE_SECONDS + 1)
+    db.commit()
+    assert insights.claim_next_insight(db, "w2").attempts == 2
+
+    insights.finish_insight(db, claimed, "succeeded", result={"advice": "irrigate"})
+    assert insights.claim_next_insight(db, "w3") is None
+
+
+def test_failed_insight_is_retried_after_a_backoff(db, monkeypatch):
+    result_id = _result(db)
+    insights.queue_insight(db, result_id, "uploads/a.tif")
+
+    async def unavailable(payload):
+        raise ConnectionError("MARS unavailable")
+
+    monkeypatch.setattr(insights, "run_mars_insights", unavailable)
+    for attempt in range(1, insights.INSIGHT_MAX_ATTEMPTS + 1):
+        insight = insights.claim_next_insight(db, "w1")
+        assert insight.attempts == attempt
+        asyncio.run(insights.run_insight(db, insight))
+        db.expire_all()
+        if attempt < insights.INSIGHT_MAX_ATTEMPTS:
+            assert (insight.status, insight.error) == ("pending", "MARS unavailable")
+            # Not claimable until the backoff has passed
+            assert insights.claim_next_insight(db, "w1") is None
+            insight.retry_at = datetime.utcnow()
+            db.commit()
+
+    assert insight.status == "failed" and insight.retry_at is None
+
+
+def test_waiting_on_a_row_finished_elsewhere_leaves_no_event(db, monkeypatch):
+    result_id = _result(db)
+    insights.queue_insight(db, result_id, "uploads/a.tif")
+    monkeypatch.setattr(insights, "INSIGHT_POLL_INTERVAL", 0.01)
+
+    insight = asyncio.run(insights.wait_for_insight(db, result_id, 0.05))
+
+    assert insight.status == "pending"
+    assert result_id not in insights._finished_events
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from backend import jobs
+from backend.models import ProcessingJob
+
+
+def _enqueue(db, name, age_minutes):
+    job = jobs.enqueue_job(db, 1, name, f"/tmp/{name}")
+    job.created_at = datetime.utcnow() - timedelta(minutes=age_minutes)
+    db.commit()
+    return job.id
+
+
+def test_jobs_are_claimed_oldest_first_and_only_once(db):
+    newer = _enqueue(db, "b.tif", 1)
+    older = _enqueue(db, "a.tif", 5)
+
+    first = jobs.claim_next_job(db, "w1")
+    second = jobs.claim_next_job(db, "w2")
+
+    assert (first.id, first.status, first.worker_id, first.attempts) == (older, "running", "w1", 1)
+    assert (second.id, second.worker_id) == (newer, "w2")
+    assert jobs.claim_next_job(db, "w3") is None
+
+
+def test_finished_jobs_are_not_claimed_again(db):
+    _enqueue(db, "a.tif", 1)
+    job = jobs.claim_next_job(db, "w1")
+    assert jobs.finish_job(db, job.id, "w1", "succeeded", result={"id": 7})
+
+    assert jobs.claim_next_job(db, "w2") is None
+    stored = db.get(ProcessingJob, job.id)
+    assert (stored.status, stored.result_id) == ("succeeded", 7)
+
+
+def test_expired_lease_hands_the_job_to_another_worker(db):
+    _enqueue(db, "a.tif", 1)
+    job = jobs.claim_next_job(db, "crashed")
+    assert jobs.claim_next_job(db, "w2") is None
+
+    job.heartbeat_at = datetime.utcnow() - timedelta(seconds=jobs.JOB_LEASE_SECONDS + 1)
+    db.commit()
+    reclaimed = jobs.claim_next_job(db, "w2")
+
+    assert (reclaimed.id, reclaimed.worker_id, reclaimed.attempts) == (job.id, "w2", 2)
+    # The stale worker can neither renew nor finish the job it lost
+    assert not jobs.renew_lease(db, job.id, "crashed")
+    assert not jobs.finish_job(db, job.id, "crashed", "failed", error="late")
+    db.expire_all()
+    assert (db.get(ProcessingJob, job.id).status, db.get(ProcessingJob, job.id).error) == ("running", None)
+
+
+def test_renewed_lease_keeps_a_long_job(db):
+    _enqueue(db, "a.tif", 1)
+    job = jobs.claim_next_job(db, "w1")
+    job.started_at = job.heartbeat_at = datetime.utcnow() - timedelta(seconds=jobs.JOB_LEASE_SECONDS + 1)
+    db.commit()
+
+    assert jobs.renew_lease(db, job.id, "w1")
+    assert jobs.claim_next_job(db, "w2") is None
+
+
+def test_failed_attempt_is_requeued_with_its_input(db, tmp_path, monkeypatch):
+    input_path = tmp_path / "a.tif"
+    input_path.write_bytes(b"tiff")
+    job_id = jobs.enqueue_job(db, 1, "a.tif", str(input_path)).id
+
+    async def flaky(*args, **kwargs):
+        raise ConnectionError("S3 unavailable")
+
+    monkeypatch.setattr(jobs, "process_uploaded_file", flaky)
+    for attempt in range(1, jobs.JOB_MAX_ATTEMPTS + 1):
+        job = jobs.claim_next_job(db, "w1")
+        assert job.attempts == attempt
+        asyncio.run(jobs.run_job(db, job))
+        db.expire_all()
+        stored = db.get(ProcessingJob, job_id)
+        if attempt < jobs.JOB_MAX_ATTEMPTS:
+            assert (stored.status, stored.error) == ("queued", "S3 unavailable")
+            assert input_path.exists()
+
+    assert stored.status == "failed" and not input_path.exists()
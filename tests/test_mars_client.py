@@ -0,0 +1,24 @@
+import asyncio
+
+from backend.mars_client import InsightsService
+
+
+def test_live_calls_bypass_the_cache():
+    service = InsightsService(cache_ttl=900)
+    runs = []
+
+    async def run(payload):
+        runs.append(payload)
+        return {"weather_data": {"current": len(runs)}}
+
+    service._run = run
+    payload = {"image_key": "uploads/a.tif", "coordinates": {"latitude": -1.2, "longitude": 36.8}}
+
+    async def scenario():
+        cached = await service.get(payload)
+        assert await service.get(payload) == cached
+        assert await service.get(payload, use_cache=False) == {"weather_data": {"current": 2}}
+        return await service.get(payload)
+
+    assert asyncio.run(scenario()) == {"weather_data": {"current": 1}}
+    assert len(runs) == 2 and service.cache_hits == 2
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from backend.cog_writer import read_values
+from backend.ndvi_processor import process_ndvi_pipeline, stream_ndvi_to_tiff
+
+
+@pytest.fixture
+def bordered_raster(tmp_path):
+    """Red/NIR scene whose healthy interior is framed by a 6-pixel nodata border."""
+    rng = np.random.default_rng(3)
+    image = np.zeros((2, 64, 48), dtype="uint16")
+    image[0, 6:-6, 6:-6] = rng.integers(100, 200, size=(52, 36))  # red
+    image[1, 6:-6, 6:-6] = rng.integers(700, 900, size=(52, 36))  # NIR
+    path = tmp_path / "scene.tif"
+    with rasterio.open(path, "w", driver="GTiff", width=48, height=64, count=2, dtype="uint16", nodata=0,
+                       crs="EPSG:4326", transform=from_origin(36.0, -1.0, 0.001, 0.001)) as dst:
+        dst.write(image)
+    return str(path)
+
+
+def test_nodata_border_is_left_out_of_ndvi_and_stats(bordered_raster, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    in_memory = process_ndvi_pipeline(bordered_raster, bordered_raster, 1, 0, output_filename="memory.tif")
+    streamed_path, _, streamed_stats = stream_ndvi_to_tiff(bordered_raster, 1, 0, output_folder=str(tmp_path),
+                                                           filename="streamed.tif", tile_size=16)
+
+    for stats in (in_memory["stats"], streamed_stats):
+        assert stats["count"] == 52 * 36
+        assert stats["healthy_percentage"] == 100
+        assert stats["unhealthy_percentage"] == 0
+        assert stats["min"] > 0.5 and stats["percentiles"]["p2"] > 0.5
+
+    ndvi = in_memory["ndvi"]
+    assert np.isnan(ndvi[:6]).all() and np.isnan(ndvi[:, -6:]).all()
+    assert np.isfinite(ndvi[6:-6, 6:-6]).all()
+    with rasterio.open(streamed_path) as src:
+        np.testing.assert_allclose(read_values(src), ndvi, rtol=1e-5)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from backend.ndvi_stats import HEALTHY_THRESHOLD, STRESSED_THRESHOLD, NDVIStatsAccumulator
+from backend.zonal_stats import ZonalStatsAccumulator, compute_zonal_stats
+
+
+def _flat(result):
+    result = dict(result)
+    return {**result.pop("percentiles"), **result}
+
+
+@pytest.fixture
+def ndvi():
+    rng = np.random.default_rng(7)
+    values = rng.uniform(-0.4, 0.9, size=(120, 90)).astype("float32")
+    values[:5, :5] = np.nan
+    return values
+
+
+def test_tiles_merged_match_a_whole_raster_pass(ndvi):
+    whole = NDVIStatsAccumulator().update(ndvi).result()
+    merged = NDVIStatsAccumulator()
+    for rows in np.array_split(ndvi, 4):
+        merged.merge(NDVIStatsAccumulator().update(rows))
+    merged = merged.result()
+
+    valid = ndvi[np.isfinite(ndvi)].astype(np.float64)
+    for result in (whole, merged):
+        assert result["count"] == valid.size
+        assert result["mean"] == pytest.approx(valid.mean())
+        assert result["std"] == pytest.approx(valid.std(), rel=1e-6)
+        assert (result["min"], result["max"]) == (valid.min(), valid.max())
+        assert result["unhealthy_percentage"] == pytest.approx(100 * np.mean(valid < STRESSED_THRESHOLD))
+        assert result["healthy_percentage"] == pytest.approx(100 * np.mean(valid >= HEALTHY_THRESHOLD))
+        # Histogram percentiles are good to about one bin (2 / 256)
+        assert result["percentiles"]["p50"] == pytest.approx(np.percentile(valid, 50), abs=0.01)
+    assert _flat(merged) == pytest.approx(_flat(whole))
+
+
+def test_nodata_and_empty_input():
+    accumulator = NDVIStatsAccumulator(nodata=-9999).update(np.array([-9999, np.nan, np.inf], dtype="float32"))
+    result = accumulator.result()
+    assert result["count"] == 0 and result["mean"] is None and result["healthy_percentage"] is None
+
+
+def test_health_classes_can_be_left_out(ndvi):
+    result = NDVIStatsAccumulator(health_classes=False).update(ndvi).result()
+    assert "healthy_percentage" not in result and result["count"] > 0
+
+
+def test_zonal_accumulator_matches_masking_each_zone(ndvi):
+    labels = np.zeros(ndvi.shape, dtype="uint32")
+    labels[10:60, 10:40] = 1
+    labels[50:110, 30:80] = 2  # overlaps zone 1; the later zone wins, as in rasterize
+
+    results = ZonalStatsAccumulator(2).update(labels, ndvi).results()
+
+    for zone in (1, 2):
+        expected = NDVIStatsAccumulator().update(ndvi[labels == zone]).result()
+        assert _flat(results[zone]) == pytest.approx(_flat(expected))
+
+
+def test_compute_zonal_stats_reads_only_the_zones(tmp_path, ndvi):
+    path = tmp_path / "ndvi.tif"
+    transform = from_origin(36.0, -1.0, 0.001, 0.001)
+    with rasterio.open(path, "w", driver="GTiff", width=90, height=120, count=1, dtype="float32",
+                       nodata=-9999, crs="EPSG:4326", transform=transform) as dst:
+        dst.write(np.nan_to_num(ndvi, nan=-9999), 1)
+
+    def square(col, row, size):
+        left, top = transform * (col, row)
+        right, bottom = transform * (col + size, row + size)
+        return {"type": "Polygon",
+                "coordinates": [[(left, top), (right, top), (right, bottom), (left, bottom), (left, top)]]}
+
+    results = compute_zonal_stats(str(path), {"corner": square(0, 0, 10), "middle": square(40, 60, 20),
+                                              "outside": square(200, 200, 5)}, tile_size=32)
+
+    corner = ndvi[:10, :10]
+    assert results["corner"]["count"] == np.isfinite(corner).sum() == 75
+    assert results["corner"]["mean"] == pytest.approx(np.nanmean(corner.astype(np.float64)))
+    assert results["middle"]["count"] == 400
+    assert results["middle"]["mean"] == pytest.approx(ndvi[60:80, 40:60].astype(np.float64).mean())
+    assert results["outside"]["count"] == 0
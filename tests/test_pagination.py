@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from backend.models import Project
+from backend.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+    paginate_async,
+    paginate_query,
+)
+
+
+@pytest.fixture
+def projects(db):
+    start = datetime(2026, 1, 1)
+    # Pairs of projects share a created_at, so the id has to break ties
+    rows = [Project(name=f"p{i}", created_at=start + timedelta(hours=i // 2)) for i in range(7)]
+    db.add_all(rows)
+    db.commit()
+    return sorted(rows, key=lambda p: (p.created_at, p.id), reverse=True)
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2026, 3, 4, 5, 6, 7, 890)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+    assert decode_cursor(encode_cursor(timestamp, "a1b2")) == (timestamp, "a1b2")
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", encode_cursor(datetime(2026, 1, 1), 1)[:-3]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_row_once_newest_first(db, projects):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = paginate(db.query(Project), Project.created_at, Project.id, cursor, limit=3)
+        assert len(rows) <= 3
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+
+    assert seen == [project.id for project in projects]
+
+
+def test_last_full_page_has_no_cursor(db, projects):
+    rows, cursor = paginate(db.query(Project), Project.created_at, Project.id, limit=len(projects))
+    assert len(rows) == len(projects)
+    assert cursor is None
+
+
+def test_async_pages_match_sync_pages(db, projects, run_async):
+    async def collect(session):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await paginate_async(session, select(Project), Project.created_at, Project.id, cursor, 2)
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                return seen
+
+    assert run_async(collect) == [project.id for project in projects]
+
+
+def test_bad_cursor_is_a_400_in_routes(db, run_async):
+    async def bad_page(session):
+        return await paginate_query(session, select(Project), Project.created_at, Project.id, "garbage", 10)
+
+    with pytest.raises(HTTPException) as error:
+        run_async(bad_page)
+    assert error.value.status_code == 400
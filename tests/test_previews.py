@@ -0,0 +1,34 @@
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from backend.ndvi_colormap import colorize
+from backend.previews import colorize_ndvi, decimate_array, read_decimated
+
+
+def test_in_memory_decimation_masks_nodata_like_the_file_read(tmp_path):
+    image = np.arange(3 * 16 * 16, dtype="uint16").reshape(3, 16, 16) + 1
+    image[:, :4, :4] = 0
+    path = tmp_path / "rgb.tif"
+    with rasterio.open(path, "w", driver="GTiff", width=16, height=16, count=3, dtype="uint16", nodata=0,
+                       crs="EPSG:4326", transform=from_origin(36.0, -1.0, 0.001, 0.001)) as dst:
+        dst.write(image)
+
+    in_memory = decimate_array(image, 8, nodata=0)
+    from_file = read_decimated(str(path), [0, 1, 2], 8)
+
+    assert in_memory.shape == from_file.shape == (3, 8, 8)
+    np.testing.assert_array_equal(np.isnan(in_memory), np.isnan(from_file))
+    assert np.isnan(in_memory[:, :2, :2]).all()
+    assert not np.isnan(in_memory[:, 2:, 2:]).any()
+
+
+def test_ndvi_preview_colours_use_the_absolute_scale():
+    # A uniformly stressed field must not be stretched into the healthy colours
+    ndvi = np.linspace(0.1, 0.3, 64, dtype="float32").reshape(8, 8)
+    ndvi[0, 0] = np.nan
+    rgb = colorize_ndvi(ndvi)
+
+    np.testing.assert_array_equal(rgb[1:], colorize(ndvi)[1:, :, :3])
+    np.testing.assert_array_equal(rgb[-1, -1], colorize(np.float32([0.3]))[0, :3])
+    assert (rgb[0, 0] == 0).all()
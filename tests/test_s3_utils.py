@@ -0,0 +1,73 @@
+import asyncio
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from backend.executors import BoundedExecutor, _s3_thread_pool
+from backend.ndvi_processor import extract_s3_key_from_url
+from backend.s3_utils import S3UploadManager
+
+ENDPOINT = "http://localhost:9000"
+BUCKET = "ndvi-test"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor("s3", _s3_thread_pool, 2, 8)
+    yield executor
+    executor.shutdown()
+
+
+def test_object_url_uses_configured_endpoint(s3_client, executor, tmp_path):
+    path = tmp_path / "a.tif"
+    path.write_bytes(b"tiff")
+    manager = S3UploadManager(client=s3_client, bucket=BUCKET, executor=executor, endpoint_url=ENDPOINT + "/")
+
+    url = manager.upload_file(str(path), "uploads/a.tif", content_type="image/tiff")
+
+    assert url == f"{ENDPOINT}/{BUCKET}/uploads/a.tif"
+    assert extract_s3_key_from_url(url) == "uploads/a.tif"
+    head = s3_client.head_object(Bucket=BUCKET, Key="uploads/a.tif")
+    assert head["ContentType"] == "image/tiff"
+
+
+def test_object_url_without_endpoint_is_virtual_hosted(s3_client, executor):
+    manager = S3UploadManager(client=s3_client, bucket=BUCKET, executor=executor, endpoint_url=None)
+
+    url = manager.object_url("uploads/a.tif")
+
+    assert url == f"https://{BUCKET}.s3.us-east-1.amazonaws.com/uploads/a.tif"
+    assert extract_s3_key_from_url(url) == "uploads/a.tif"
+
+
+def test_batch_uploads_run_on_the_shared_executor(s3_client, executor, tmp_path):
+    artifacts = {}
+    for i in range(5):
+        path = tmp_path / f"{i}.png"
+        path.write_bytes(bytes([i]) * 10)
+        artifacts[f"previews/{i}.png"] = str(path)
+    manager = S3UploadManager(client=s3_client, bucket=BUCKET, executor=executor, endpoint_url=ENDPOINT)
+
+    urls = manager.upload_many(artifacts)
+    async_urls = asyncio.run(manager.upload_many_async({"previews/async.png": artifacts["previews/0.png"]}))
+
+    assert urls == {key: f"{ENDPOINT}/{BUCKET}/{key}" for key in artifacts}
+    assert async_urls == {"previews/async.png": f"{ENDPOINT}/{BUCKET}/previews/async.png"}
+    keys = {obj["Key"] for obj in s3_client.list_objects_v2(Bucket=BUCKET)["Contents"]}
+    assert keys == set(artifacts) | {"previews/async.png"}
+    assert executor.stats()["in_flight"] == 0
+
+    executor.shutdown()
+    assert executor._executor is None
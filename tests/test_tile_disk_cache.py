@@ -0,0 +1,86 @@
+import asyncio
+import os
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from backend import tile_server
+from backend.tile_server import DiskBudget
+
+
+def _write(budget, path, size, mtime):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (mtime, mtime))
+    budget.added(path, size)
+
+
+def test_sweep_evicts_least_recently_used_files(tmp_path):
+    evicted = []
+    budget = DiskBudget(str(tmp_path), max_bytes=300, low_water=0.75, on_evict=evicted.append)
+    paths = [str(tmp_path / "tiles" / f"{i}.png") for i in range(3)]
+    for i, path in enumerate(paths):
+        _write(budget, path, 100, mtime=1000 + i)
+
+    # Reading the oldest tile makes it the most recently used
+    budget.touch(paths[0])
+    newest = str(tmp_path / "sources" / "a.tif")
+    _write(budget, newest, 100, mtime=2_000_000_000)
+
+    assert evicted == [paths[1], paths[2]]
+    assert os.path.exists(paths[0]) and os.path.exists(newest)
+    assert budget.stats() == {"bytes": 200, "max_bytes": 300, "evictions": 2, "pinned": 0}
+
+
+def test_new_file_over_the_whole_budget_is_kept(tmp_path):
+    budget = DiskBudget(str(tmp_path), max_bytes=50)
+    path = str(tmp_path / "sources" / "big.tif")
+    _write(budget, path, 100, mtime=1000)
+    (tmp_path / "sources" / "partial.tif.download").write_bytes(b"x" * 10)
+    budget.added(path, 0)
+
+    assert os.path.exists(path)
+    assert os.path.exists(tmp_path / "sources" / "partial.tif.download")
+    assert budget.evictions == 0
+
+
+def test_pinned_files_are_not_evicted(tmp_path):
+    budget = DiskBudget(str(tmp_path), max_bytes=150)
+    old, new = str(tmp_path / "old.tif"), str(tmp_path / "new.tif")
+    budget.pin(old)
+    _write(budget, old, 100, mtime=1000)
+    _write(budget, new, 100, mtime=2000)
+    assert os.path.exists(old) and budget.evictions == 0
+
+    budget.unpin(old)
+    budget.added(new, 0)
+    assert not os.path.exists(old) and os.path.exists(new)
+
+
+def test_unreadable_source_is_downloaded_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(tile_server, "source_cache", DiskBudget(str(tmp_path / "sources"), max_bytes=0))
+    downloads = []
+
+    def download(key, path):
+        downloads.append(key)
+        with rasterio.open(path, "w", driver="GTiff", width=4, height=4, count=1, dtype="float32",
+                           crs="EPSG:4326", transform=from_origin(36.0, -1.0, 0.001, 0.001)) as dst:
+            dst.write(np.full((1, 4, 4), 0.5, dtype="float32"))
+
+    monkeypatch.setattr(tile_server, "download_from_s3", download)
+    url = "https://bucket.s3.amazonaws.com/ndvi_cogs/abc/v1/field_ndvi.tif"
+    path = tile_server.local_source(url)
+    with open(path, "wb") as f:
+        f.write(b"truncated")
+
+    def read(paths):
+        async def inner():
+            with rasterio.open(paths[0]) as src:
+                return src.read(1).mean()
+        return inner()
+
+    assert asyncio.run(tile_server.with_local_sources([url], read)) == 0.5
+    assert len(downloads) == 2
+    assert tile_server.source_cache.stats()["pinned"] == 0